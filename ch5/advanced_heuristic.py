@@ -1,9 +1,9 @@
 # advanced_heuristic.py
-from tron_base import TronGame, flood_fill
+from tron_base import TronGame
 # from tron_agents import GreedyAgent
-from copy import deepcopy
 from greedy import GreedyAgent
 from minimax import MinimaxAgent
+from maps import map_graph
 import time
 
 def find_articulation_points(board, start_pos, player_id):
@@ -86,16 +86,22 @@ def find_articulation_points(board, start_pos, player_id):
     
     return components
 
-def advanced_evaluate(board, p1_pos, p2_pos):
+def advanced_evaluate(board, p1_pos, p2_pos, regions=None):
     """
     Advanced evaluation considering:
     1. Space control (like greedy)
     2. Articulation points (cutting off opponent)
     3. Voronoi territory (cells closer to you)
+    A RegionTracker for the board, if given, answers the space term without flood fills.
     """
     # Basic space control
-    p1_space = flood_fill(board, p1_pos, 1)
-    p2_space = flood_fill(board, p2_pos, 2)
+    if regions is not None:
+        p1_space = regions.space_from(p1_pos)
+        p2_space = regions.space_from(p2_pos)
+    else:
+        graph = map_graph(board)
+        p1_space = graph.flood_fill(board, p1_pos, 1)
+        p2_space = graph.flood_fill(board, p2_pos, 2)
     space_diff = p1_space - p2_space
     
     # Articulation bonus: does our position split opponent's space?
@@ -120,101 +126,16 @@ def advanced_evaluate(board, p1_pos, p2_pos):
     # Combined score
     return space_diff + articulation_bonus + voronoi_score * 0.5
 
-class AdvancedMinimaxAgent:
-    """Minimax with articulation-point aware evaluation"""
-    
-    def __init__(self, depth=5):
-        self.depth = depth
-        self.nodes_evaluated = 0
+class AdvancedMinimaxAgent(MinimaxAgent):
+    """
+    Minimax with articulation-point aware evaluation. With evaluator='chambers'
+    leaves are scored by the chamber-tree fill of chambers.py instead, which
+    values the space behind each articulation point in one pass.
+    """
     
     def evaluate_state(self, board, p1_pos, p2_pos):
         """Use advanced evaluation function"""
-        return advanced_evaluate(board, p1_pos, p2_pos)
-    
-    def minimax(self, state, depth, alpha, beta, maximizing_player):
-        """Minimax with alpha-beta pruning"""
-        self.nodes_evaluated += 1
-        if depth == 0 or not state['p1_moves'] or not state['p2_moves']:
-            return self.evaluate_state(state['board'], state['p1_pos'], state['p2_pos'])
-        
-        if maximizing_player:
-            max_eval = float('-inf')
-            for action in state['p1_moves']:
-                new_state = self.simulate_move(state, action, None, 1)
-                eval_score = self.minimax(new_state, depth - 1, alpha, beta, False)
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-            return max_eval
-        else:
-            min_eval = float('inf')
-            for action in state['p2_moves']:
-                new_state = self.simulate_move(state, None, action, 2)
-                eval_score = self.minimax(new_state, depth - 1, alpha, beta, True)
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-            return min_eval
-    
-    def simulate_move(self, state, p1_action, p2_action, player):
-        """Create new state after hypothetical move"""
-        new_state = deepcopy(state)
-        directions = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
-        
-        if player == 1 and p1_action:
-            dy, dx = directions[p1_action]
-            new_pos = (state['p1_pos'][0] + dy, state['p1_pos'][1] + dx)
-            new_state['board'][new_pos] = 1
-            new_state['p1_pos'] = new_pos
-            new_state['p1_moves'] = self.get_valid_moves_from_board(new_state['board'], new_pos)
-        
-        if player == 2 and p2_action:
-            dy, dx = directions[p2_action]
-            new_pos = (state['p2_pos'][0] + dy, state['p2_pos'][1] + dx)
-            new_state['board'][new_pos] = 2
-            new_state['p2_pos'] = new_pos
-            new_state['p2_moves'] = self.get_valid_moves_from_board(new_state['board'], new_pos)
-        
-        return new_state
-    
-    def get_valid_moves_from_board(self, board, pos):
-        """Helper to get valid moves from board state"""
-        moves = []
-        directions = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
-        height, width = board.shape
-        
-        for action, (dy, dx) in directions.items():
-            new_y, new_x = pos[0] + dy, pos[1] + dx
-            if (0 <= new_y < height and 0 <= new_x < width and board[new_y, new_x] == 0):
-                moves.append(action)
-        return moves
-    
-    def get_action(self, state, player):
-        """Select best action using minimax"""
-        self.nodes_evaluated = 0
-        moves = state['p1_moves'] if player == 1 else state['p2_moves']
-        if not moves:
-            return None
-        
-        best_action = moves[0]
-        best_value = float('-inf') if player == 1 else float('inf')
-        
-        for action in moves:
-            new_state = self.simulate_move(state, action if player == 1 else None, 
-                                          action if player == 2 else None, player)
-            value = self.minimax(new_state, self.depth - 1, float('-inf'), float('inf'), 
-                               player == 2)
-            
-            if player == 1 and value > best_value:
-                best_value = value
-                best_action = action
-            elif player == 2 and value < best_value:
-                best_value = value
-                best_action = action
-        
-        return best_action
+        return advanced_evaluate(board, p1_pos, p2_pos, regions=self.regions)
 
 def compare_heuristics(num_games=15, depth=5, board_size=10):
     """Compare standard minimax vs advanced minimax"""
@@ -227,9 +148,11 @@ def compare_heuristics(num_games=15, depth=5, board_size=10):
     
     standard = MinimaxAgent(depth=depth)
     advanced = AdvancedMinimaxAgent(depth=depth)
+    chambers = AdvancedMinimaxAgent(depth=depth, evaluator='chambers')
     greedy = GreedyAgent()
     
     matchups = [
+        ("Chamber Minimax", chambers, "Advanced Minimax", advanced),
         ("Advanced Minimax", advanced, "Standard Minimax", standard),
         ("Advanced Minimax", advanced, "Greedy", greedy),
         ("Standard Minimax", standard, "Greedy", greedy)
@@ -0,0 +1,377 @@
+# agent_server.py - One process serving moves to many games at once
+#
+# Every game normally owns its agents and each search runs on its own. Here
+# an AgentServer owns them instead: games connect over a Unix socket, each
+# connection opens one agent from a registry spec (see registry.py) and asks
+# it for moves. The server keeps every agent in one of its worker processes
+# for the life of the connection (so tree reuse and other per-game state
+# work) and hands each new agent to the worker with the fewest.
+#
+# A worker takes all the move requests that are waiting and runs them
+# together. MCTS searches that share an evaluator advance in lockstep: each
+# step collects the leaves of every search and scores them in one
+# evaluate_batch call, so a worker serving many games keeps its batches full
+# without widening any one search (compare MCTSAgent(batch_size=...)).
+# Other agents simply take their turn.
+#
+# Wire format: frames of HEADER (kind, payload length) and a payload.
+#   OPEN   client -> server   spec as JSON (a registered name or [class path, kwargs])
+#   MOVE   client -> server   player byte + encode_state(state)
+#   REPLY  server -> client   to OPEN: empty; to MOVE: one byte, index into MOVES (NO_MOVE for None)
+#   ERROR  server -> client   the agent's error message
+# A state is STATE_HEADER (height, width, head positions) followed by the
+# board at 2 bits per cell: 106 bytes for a 20x20 game instead of a pickled
+# dict. The move lists are rebuilt from the board.
+#
+# Serve:  python agent_server.py [socket path] [workers]
+# Play:   RemoteAgent('MCTS-200') in place of make_agent('MCTS-200'); with
+#         async_scheduler.run_concurrent_games its get_action_async lets one
+#         process keep hundreds of games in flight.
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from tron_base import valid_moves
+
+DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), 'tron_agents.sock')
+OPEN, MOVE, REPLY, ERROR = 1, 2, 3, 4
+HEADER = struct.Struct('<BI')
+STATE_HEADER = struct.Struct('<6B')
+MOVES = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+NO_MOVE = 255
+
+
+# ------------------------
+# Encoding
+# ------------------------
+
+def encode_state(state):
+    """A game state as bytes: header, then 4 cells per byte"""
+    board = state['board']
+    height, width = board.shape
+    cells = np.zeros(-(-board.size // 4) * 4, dtype=np.uint8)
+    cells[:board.size] = board.ravel()
+    packed = cells[0::4] | cells[1::4] << 2 | cells[2::4] << 4 | cells[3::4] << 6
+    return STATE_HEADER.pack(height, width, *state['p1_pos'], *state['p2_pos']) + packed.tobytes()
+
+
+def decode_state(data):
+    """The state dict encode_state was given, move lists included"""
+    height, width, y1, x1, y2, x2 = STATE_HEADER.unpack_from(data)
+    packed = np.frombuffer(data, dtype=np.uint8, offset=STATE_HEADER.size)
+    cells = np.stack([packed & 3, packed >> 2 & 3, packed >> 4 & 3, packed >> 6], axis=1)
+    board = cells.ravel()[:height * width].reshape(height, width).astype(int)
+    p1_pos, p2_pos = (y1, x1), (y2, x2)
+    return {'board': board, 'p1_pos': p1_pos, 'p2_pos': p2_pos,
+            'p1_moves': valid_moves(board, p1_pos), 'p2_moves': valid_moves(board, p2_pos)}
+
+
+def encode_move(move):
+    return bytes([NO_MOVE if move is None else MOVES.index(move)])
+
+
+def decode_move(data):
+    return None if data[0] == NO_MOVE else MOVES[data[0]]
+
+
+def frame(kind, payload=b''):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+# ------------------------
+# Workers
+# ------------------------
+
+def advance(steps, values):
+    """('leaves', states) while a search wants scores, ('done', move) once it has finished"""
+    try:
+        return 'leaves', (next(steps) if values is None else steps.send(values))
+    except StopIteration as stop:
+        return 'done', stop.value
+
+
+def run_together(evaluator, searches, stats):
+    """
+    Drive several action_steps generators ({session: steps}) that share an
+    evaluator, scoring all their leaves of a step in one call.
+    Yields (session, kind, payload) as each one finishes.
+    """
+    from mcts import evaluate_leaves
+    waiting = {}
+    for session, steps in searches.items():
+        waiting[session] = (steps, None)
+    while waiting:
+        leaves = {}
+        for session, (steps, values) in list(waiting.items()):
+            try:
+                status, result = advance(steps, values)
+            except Exception as e:
+                del waiting[session]
+                yield session, ERROR, repr(e).encode()
+                continue
+            if status == 'done':
+                del waiting[session]
+                yield session, REPLY, encode_move(result)
+            else:
+                leaves[session] = result
+        if not leaves:
+            break
+        states = [state for session_states in leaves.values() for state in session_states]
+        values = evaluate_leaves(evaluator, states)
+        stats['calls'] += 1
+        stats['leaves'] += len(states)
+        start = 0
+        for session, session_states in leaves.items():
+            waiting[session] = (waiting[session][0], values[start:start + len(session_states)])
+            start += len(session_states)
+
+
+def play_moves(agents, moves, stats):
+    """
+    Answer move requests ([(session, payload)]): searches that can share
+    their evaluator calls run together, the rest one after another.
+    Yields (session, kind, payload).
+    """
+    groups = {}
+    for session, payload in moves:
+        agent = agents.get(session)
+        try:
+            player, state = payload[0], decode_state(payload[1:])
+            evaluator = getattr(agent, 'leaf_evaluator', None)
+            if evaluator is not None and hasattr(agent, 'action_steps'):
+                groups.setdefault(id(evaluator), (evaluator, {}))[1][session] = agent.action_steps(state, player)
+                continue
+            yield session, REPLY, encode_move(agent.get_action(state, player))
+        except Exception as e:
+            yield session, ERROR, repr(e).encode()
+    for evaluator, searches in groups.values():
+        yield from run_together(evaluator, searches, stats)
+
+
+def worker_main(requests, results):
+    """Worker process: keep the agents of its sessions and answer their requests"""
+    from registry import make_agent
+    agents = {}
+    stats = {'calls': 0, 'leaves': 0}
+    while True:
+        messages = [requests.get()]
+        while True:
+            try:
+                messages.append(requests.get_nowait())
+            except queue.Empty:
+                break
+        moves = []
+        for message in messages:
+            if message is None:
+                results.put(('stats', stats['calls'], stats['leaves']))
+                return
+            kind, session, payload = message
+            if kind == OPEN:
+                try:
+                    agents[session] = make_agent(json.loads(payload))
+                    results.put((session, REPLY, b''))
+                except Exception as e:
+                    results.put((session, ERROR, repr(e).encode()))
+            elif kind == MOVE:
+                moves.append((session, payload))
+            else:
+                agents.pop(session, None)  # The connection closed
+        for reply in play_moves(agents, moves, stats):
+            results.put(reply)
+
+
+# ------------------------
+# Server
+# ------------------------
+
+class AgentServer:
+    """
+    Serve agents on a Unix socket from `workers` processes (default: one per CPU).
+    run() blocks until SIGTERM/SIGINT or stop().
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, workers=None):
+        self.address = address
+        self.workers = workers or os.cpu_count() or 1
+        self.sessions = {}     # session -> (writer, worker)
+        self.load = []         # Open sessions per worker
+        self.next_session = 0
+        self.batch_calls = self.batch_leaves = 0
+
+    def run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        self.results = multiprocessing.Queue()
+        self.requests = [multiprocessing.Queue() for _ in range(self.workers)]
+        self.processes = [multiprocessing.Process(target=worker_main, args=(requests, self.results),
+                                                  daemon=True)
+                          for requests in self.requests]
+        for process in self.processes:
+            process.start()
+        self.load = [0] * self.workers
+        reader = threading.Thread(target=self.read_results, daemon=True)
+        reader.start()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            self.loop.add_signal_handler(sig, self.stopped.set)
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        server = await asyncio.start_unix_server(self.handle, path=self.address)
+        try:
+            await self.stopped.wait()
+        finally:
+            server.close()
+            # Let each connection's handler see its end and tidy up before the workers stop
+            for writer, worker in list(self.sessions.values()):
+                writer.close()
+            for _ in range(100):
+                if not self.sessions:
+                    break
+                await asyncio.sleep(0.01)
+            for requests in self.requests:
+                requests.put(None)
+            for process in self.processes:
+                process.join(timeout=5)
+            self.results.put(None)
+            reader.join(timeout=5)
+            os.unlink(self.address)
+            if self.batch_calls:
+                print(f"Evaluator calls: {self.batch_calls}, "
+                      f"{self.batch_leaves / self.batch_calls:.1f} leaves per call")
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stopped.set)
+
+    def read_results(self):
+        """Thread: pass the workers' replies to the event loop"""
+        while True:
+            item = self.results.get()
+            if item is None:
+                return
+            if item[0] == 'stats':
+                self.batch_calls += item[1]
+                self.batch_leaves += item[2]
+                continue
+            self.loop.call_soon_threadsafe(self.deliver, *item)
+
+    def deliver(self, session, kind, payload):
+        if session in self.sessions:
+            self.sessions[session][0].write(frame(kind, payload))
+
+    async def handle(self, reader, writer):
+        """One connection: one agent, on the least loaded worker"""
+        session = self.next_session
+        self.next_session += 1
+        worker = self.load.index(min(self.load))
+        self.load[worker] += 1
+        self.sessions[session] = (writer, worker)
+        try:
+            while True:
+                kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+                payload = await reader.readexactly(length)
+                self.requests[worker].put((kind, session, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.requests[worker].put((None, session, b''))
+            del self.sessions[session]
+            self.load[worker] -= 1
+            writer.close()
+
+
+def start_server(address=DEFAULT_ADDRESS, workers=None, timeout=10.0):
+    """Run an AgentServer in a background process; returns it once it accepts connections"""
+    process = multiprocessing.Process(target=AgentServer(address, workers).run)
+    process.start()
+    deadline = time.time() + timeout
+    while not os.path.exists(address):
+        if time.time() > deadline or not process.is_alive():
+            process.terminate()
+            raise RuntimeError(f"Agent server did not start on {address}")
+        time.sleep(0.05)
+    return process
+
+
+# ------------------------
+# Client
+# ------------------------
+
+class RemoteAgent:
+    """
+    An agent played by an AgentServer: spec is a registered name or a
+    (class path, kwargs) pair, as for registry.make_agent. The agent is
+    opened on the first move and kept until close().
+    """
+
+    def __init__(self, spec, address=DEFAULT_ADDRESS):
+        self.spec = spec
+        self.address = address
+        self.sock = None
+        self.stream = None
+
+    def call(self, kind, payload):
+        self.sock.sendall(frame(kind, payload))
+        header = self.recv_exactly(HEADER.size)
+        reply, length = HEADER.unpack(header)
+        data = self.recv_exactly(length)
+        if reply == ERROR:
+            raise RuntimeError(f"Agent server: {data.decode()}")
+        return data
+
+    def recv_exactly(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Agent server closed the connection")
+            data += chunk
+        return data
+
+    def get_action(self, state, player):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(self.address)
+            self.call(OPEN, json.dumps(self.spec).encode())
+        return decode_move(self.call(MOVE, bytes([player]) + encode_state(state)))
+
+    async def call_async(self, kind, payload):
+        reader, writer = self.stream
+        writer.write(frame(kind, payload))
+        reply, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+        data = await reader.readexactly(length)
+        if reply == ERROR:
+            raise RuntimeError(f"Agent server: {data.decode()}")
+        return data
+
+    async def get_action_async(self, state, player):
+        if self.stream is None:
+            self.stream = await asyncio.open_unix_connection(self.address)
+            await self.call_async(OPEN, json.dumps(self.spec).encode())
+        return decode_move(await self.call_async(MOVE, bytes([player]) + encode_state(state)))
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.stream is not None:
+            self.stream[1].close()
+            self.stream = None
+
+
+if __name__ == "__main__":
+    address = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"Serving agents on {address}")
+    AgentServer(address, workers).run()
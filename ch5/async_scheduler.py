@@ -0,0 +1,89 @@
+# async_scheduler.py - Run many TronGame instances concurrently with asyncio
+#
+# Agents that spend their time waiting (OllamaAgent) expose get_action_async and
+# are awaited directly. Every other agent is CPU-bound and its get_action is
+# offloaded to a thread pool, or a process pool with use_processes=True
+# (the agent is then pickled with each call, so it must be picklable).
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from tron_base import TronGame
+
+
+async def agent_action(agent, state, player, executor):
+    """Await an agent's move, natively if it is async and in the executor otherwise"""
+    if hasattr(agent, 'get_action_async'):
+        return await agent.get_action_async(state, player)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, agent.get_action, state, player)
+
+
+async def play_game(agent1, agent2, board_size, max_moves, executor):
+    """Play one game, yielding to other games while either agent thinks"""
+    game = TronGame(width=board_size, height=board_size)
+    state = game.reset()
+    moves = 0
+
+    while not game.game_over and moves < max_moves:
+        # Moves are simultaneous, so both agents can think at the same time
+        a1, a2 = await asyncio.gather(agent_action(agent1, state, 1, executor),
+                                      agent_action(agent2, state, 2, executor))
+        state, reward, done = game.step(a1, a2)
+        moves += 1
+
+    return game.winner, moves
+
+
+async def run_games(make_agents, num_games, board_size=10, max_moves=100,
+                    concurrency=16, executor=None, finish_game=None):
+    """
+    Play num_games games with at most `concurrency` in flight at once.
+    make_agents(game_num) returns the (player 1, player 2) agents for a game;
+    agents that keep per-search state (MCTSAgent) should not be shared
+    between games running at the same time. finish_game(agent1, agent2),
+    if given, is called as each game ends, e.g. to hand its agents to the
+    next game or close them.
+    Returns one result dict per game, in game order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(game_num):
+        async with semaphore:
+            agent1, agent2 = make_agents(game_num)
+            start = time.time()
+            try:
+                winner, moves = await play_game(agent1, agent2, board_size, max_moves, executor)
+            finally:
+                if finish_game is not None:
+                    finish_game(agent1, agent2)
+            return {'winner': winner, 'moves': moves, 'time': time.time() - start}
+
+    return await asyncio.gather(*(run_one(game_num) for game_num in range(num_games)))
+
+
+def run_concurrent_games(make_agents, num_games, board_size=10, max_moves=100,
+                         concurrency=16, use_processes=False, workers=None, finish_game=None):
+    """Synchronous entry point: sets up the CPU pool and runs the event loop"""
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        # Two agents per game may be thinking at once
+        executor = ThreadPoolExecutor(max_workers=workers or 2 * concurrency)
+
+    with executor:
+        return asyncio.run(run_games(make_agents, num_games, board_size, max_moves,
+                                     concurrency, executor, finish_game))
+
+
+if __name__ == "__main__":
+    from greedy import GreedyAgent
+    from tron_base import RandomAgent
+
+    print("\n=== GREEDY vs RANDOM (20 concurrent games, process pool) ===\n")
+    start = time.time()
+    games = run_concurrent_games(lambda game_num: (GreedyAgent(), RandomAgent()), 20,
+                                 board_size=12, concurrency=8, use_processes=True)
+    wins = sum(1 for g in games if g['winner'] == 1)
+    losses = sum(1 for g in games if g['winner'] == 2)
+    print(f"Greedy={wins}, Random={losses}, Draws={len(games) - wins - losses}")
+    print(f"Total time: {time.time() - start:.2f}s")
@@ -0,0 +1,134 @@
+# chambers.py - Chamber-tree evaluation: the space each player can actually fill
+#
+# advanced_evaluate blends reachable space, a count of articulation splits
+# and Manhattan Voronoi, each from its own scan of the board, and none of
+# them asks how much of the space behind a chokepoint can really be used.
+# Here one pass per player answers that:
+#   1. A breadth-first search from each head gives every free cell's
+#      distance to both; a player's territory is the cells it reaches first
+#      (all the cells it reaches, once the walls and trails separate them).
+#   2. A depth-first search of the territory from the head finds its
+#      articulation points (Tarjan low-links). Each one cuts off a chamber:
+#      space that can be entered through it but never left again.
+#   3. Bottom-up over the chamber tree, a chamber is worth its own cells
+#      plus its best sub-chamber, since a player entering a chamber can only
+#      end in one of the chambers hanging off it. Own cells are counted
+#      with the checkerboard-parity bound: a path alternates colours, so
+#      from an entry cell of colour c it visits at most
+#      min(2 n_c, 2 n_other + 1) cells.
+# The score is player 1's fill minus player 2's, in cells like
+# MinimaxAgent's space difference.
+#
+# Use:  AdvancedMinimaxAgent(depth=5, evaluator='chambers'), or any agent
+#       that takes an evaluator (see learned_eval.open_evaluator)
+import numpy as np
+from maps import map_graph
+
+
+def parity_fill(count_entry, count_other):
+    """Longest path through count_entry cells of the entry colour and count_other of the other"""
+    return min(2 * count_entry, 2 * count_other + 1)
+
+
+def distances_from(neighbors, free, start):
+    """Breadth-first distances from start over free cells (start itself need not be free), -1 if unreached"""
+    dist = [-1] * len(free)
+    dist[start] = 0
+    frontier = [start]
+    step = 0
+    while frontier:
+        step += 1
+        nxt = []
+        for cell in frontier:
+            for m in neighbors[cell]:
+                if free[m] and dist[m] < 0:
+                    dist[m] = step
+                    nxt.append(m)
+        frontier = nxt
+    return dist
+
+
+def chamber_fill(neighbors, parity, allowed, head):
+    """
+    Most cells a head at `head` can fill among the `allowed` cells, by the
+    chamber tree: iterative Tarjan DFS, chambers valued as they are finished.
+    """
+    n = len(allowed)
+    disc = [-1] * n
+    low = [0] * n
+    own = [[0, 0] for _ in range(n)]  # Cells of each colour in the chamber so far
+    best = [0] * n                     # Best chamber hanging below, by value
+    disc[head] = low[head] = 0
+    order = 1
+    stack = [(head, iter(neighbors[head]))]
+    while stack:
+        v, it = stack[-1]
+        for u in it:
+            if disc[u] < 0:
+                if not allowed[u]:
+                    continue
+                disc[u] = low[u] = order
+                order += 1
+                own[u][parity[u]] = 1
+                stack.append((u, iter(neighbors[u])))
+                break
+            if disc[u] < low[v]:
+                low[v] = disc[u]
+        else:
+            stack.pop()
+            if not stack:
+                break
+            p = stack[-1][0]
+            if low[v] < low[p]:
+                low[p] = low[v]
+            if low[v] >= disc[p]:
+                # p cuts off v's part of the tree: a chamber entered at v
+                value = parity_fill(own[v][parity[v]], own[v][1 - parity[v]]) + best[v]
+                if value > best[p]:
+                    best[p] = value
+            else:
+                own[p][0] += own[v][0]
+                own[p][1] += own[v][1]
+                if best[v] > best[p]:
+                    best[p] = best[v]
+    # Every neighbour of the head starts its own chamber, so the head's own count is empty
+    return best[head]
+
+
+def chamber_scores(board, p1_pos, p2_pos):
+    """(player 1's fill, player 2's fill)"""
+    graph = map_graph(board)
+    values = board.ravel()[graph.flat].tolist()
+    free = [v == 0 for v in values]
+    neighbors = graph.neighbors
+    h1, h2 = int(graph.cell_of[p1_pos]), int(graph.cell_of[p2_pos])
+    d1 = distances_from(neighbors, free, h1)
+    d2 = distances_from(neighbors, free, h2)
+    mine1 = [False] * graph.n
+    mine2 = [False] * graph.n
+    for cell in range(graph.n):
+        a, b = d1[cell], d2[cell]
+        if a > 0 and (b < 0 or a < b):
+            mine1[cell] = True
+        elif b > 0 and (a < 0 or b < a):
+            mine2[cell] = True
+    fill1 = chamber_fill(neighbors, graph.parity, mine1, h1)
+    fill2 = chamber_fill(neighbors, graph.parity, mine2, h2)
+    return fill1, fill2
+
+
+def chamber_evaluate(board, p1_pos, p2_pos):
+    """Score for player 1: chamber-tree fill of its territory minus player 2's"""
+    fill1, fill2 = chamber_scores(board, p1_pos, p2_pos)
+    return fill1 - fill2
+
+
+class ChamberEvaluator:
+    """chamber_evaluate as an evaluator (evaluate / evaluate_batch)"""
+
+    def evaluate(self, board, p1_pos, p2_pos):
+        return chamber_evaluate(board, p1_pos, p2_pos)
+
+    def evaluate_batch(self, boards, p1_positions, p2_positions):
+        return np.array([chamber_evaluate(board, p1, p2)
+                         for board, p1, p2 in zip(boards, p1_positions, p2_positions)], dtype=float)
@@ -0,0 +1,68 @@
+# eval_cache.py - Memoized leaf evaluations for the minimax agents
+import random
+from collections import OrderedDict
+
+
+class ZobristHasher:
+    """
+    64-bit position hashes that can be updated one cell at a time.
+    Each (cell, owner) pair gets a random key; a board's hash is the XOR of
+    the keys of its occupied cells, so filling a cell is a single XOR.
+    Owners are the board values 1, 2 and WALL (3, see maps.py).
+    """
+
+    tables = {}  # One table per board shape, shared by all agents
+
+    def __init__(self, height, width):
+        shape = (height, width)
+        if shape not in ZobristHasher.tables:
+            rng = random.Random(430)  # Fixed seed so hashes are stable between runs
+            ZobristHasher.tables[shape] = [[rng.getrandbits(64) for _ in range(width)]
+                                           for _ in range(height * 4)]
+        self.height = height
+        self.width = width
+        self.keys = ZobristHasher.tables[shape]
+
+    def cell_key(self, pos, owner):
+        return self.keys[owner * self.height + pos[0]][pos[1]]
+
+    def hash_board(self, board):
+        """Full hash of a board (done once per move, then updated incrementally)"""
+        h = 0
+        ys, xs = board.nonzero()
+        for y, x in zip(ys.tolist(), xs.tolist()):
+            h ^= self.keys[int(board[y, x]) * self.height + y][x]
+        return h
+
+
+class EvalCache:
+    """Bounded LRU map from position keys to evaluation scores"""
+
+    def __init__(self, max_size=200000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)  # Evict least recently used
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,103 @@
+# game_clock.py - Time control for tournament games
+#
+# GameClock gives each player a total time plus an increment per move
+# (Fischer timing). A runner asks it for each move instead of calling
+# get_action directly. An agent with a `clock` attribute is handed the clock
+# for the duration of the call and budgets its own search with MoveBudget;
+# any other agent is just timed. A player who runs out of time forfeits
+# the move, which TronGame treats like a crash.
+import time
+from tron_base import label_regions
+
+DIRECTIONS = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
+
+
+class GameClock:
+    """Remaining time per player, charged for every get_action call"""
+
+    def __init__(self, total=10.0, increment=0.1):
+        self.total = total
+        self.increment = increment
+        self.remaining = {1: total, 2: total}
+        self.flagged = set()
+
+    def move(self, agent, state, player):
+        """The agent's move, or None if it used up its time"""
+        timed = hasattr(agent, 'clock')
+        if timed:
+            agent.clock = self
+        start = time.perf_counter()
+        try:
+            move = agent.get_action(state, player)
+        finally:
+            if timed:
+                agent.clock = None  # Untimed calls stay untimed
+        self.remaining[player] -= time.perf_counter() - start
+        if self.remaining[player] < 0:
+            self.flagged.add(player)
+            return None
+        self.remaining[player] += self.increment
+        return move
+
+
+class MoveBudget:
+    """
+    Time for one move. The target spreads the remaining time over the moves
+    still to come (about half the free space the player can reach), plus the
+    increment. It shrinks with fewer legal moves and when the players are
+    walled off from each other, where the rest is just filling space. Each
+    change of best move between search iterations stretches the soft limit,
+    up to 2.5x. The hard limit is never more than half the remaining time.
+    """
+
+    def __init__(self, clock, state, player):
+        self.start = time.perf_counter()
+        remaining = clock.remaining[player]
+        board = state['board']
+        pos = state['p1_pos'] if player == 1 else state['p2_pos']
+        opp_pos = state['p2_pos'] if player == 1 else state['p1_pos']
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+
+        # Free cells next to each head, labeled by region (0 = empty cells only)
+        height, width = board.shape
+        def free_neighbors(p):
+            cells = [(p[0] + dy, p[1] + dx) for dy, dx in DIRECTIONS.values()]
+            return [c for c in cells if 0 <= c[0] < height and 0 <= c[1] < width and board[c] == 0]
+        mine, theirs = free_neighbors(pos), free_neighbors(opp_pos)
+        labels, sizes = label_regions(board, 0, starts=mine + theirs)
+        my_regions = {labels[c] for c in mine}
+        space = max((sizes[r] for r in my_regions), default=0)
+        contested = any(labels[c] in my_regions for c in theirs)
+
+        moves_to_go = min(max(space // 2, 5), 30)
+        target = remaining / moves_to_go + clock.increment
+        target *= {0: 0.0, 1: 0.0, 2: 0.7}.get(len(moves), 1.0)
+        if not contested:
+            target *= 0.5
+        self.target = target
+        self.hard = min(4 * target, 0.5 * remaining)
+        self.best_move = None
+        self.changes = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def record(self, best_move):
+        """Note the best move after a search iteration"""
+        if self.best_move is not None and best_move != self.best_move:
+            self.changes += 1
+        self.best_move = best_move
+
+    def soft_limit(self):
+        return min(self.target * min(1 + 0.5 * self.changes, 2.5), self.hard)
+
+    def can_deepen(self):
+        """Worth starting another iteration (each costs a few times the last)"""
+        return self.elapsed() < 0.5 * self.soft_limit()
+
+    def done(self):
+        return self.elapsed() >= self.soft_limit()
+
+    def is_set(self):
+        """Hard limit reached; lets a budget stand in for a search's stop event"""
+        return self.elapsed() >= self.hard
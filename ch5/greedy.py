@@ -1,35 +1,63 @@
 # greedy.py - Add to this file
 
 # Import the base game and random agent from Exercise 1
-from tron_base import TronGame, RandomAgent, flood_fill
+from tron_base import TronGame, RandomAgent, label_regions
+import math
 
 class GreedyAgent:
     """Agent that maximizes immediate space control"""
     
     def get_action(self, state, player):
         """Select action leading to most available space"""
+        scores = self.move_scores(state, player)
+        if not scores:
+            return None
+        # Most space first, then farthest from the opponent (heading toward
+        # them on a tie mostly produces head-on draws)
+        return max(scores, key=scores.get)
+    
+    def move_scores(self, state, player):
+        """(space, distance to the opponent) after each legal move"""
         pos = state['p1_pos'] if player == 1 else state['p2_pos']
+        opp_pos = state['p2_pos'] if player == 1 else state['p1_pos']
         moves = state['p1_moves'] if player == 1 else state['p2_moves']
         
         if not moves:
-            return None
+            return {}
         
-        best_action = None
-        best_space = -1
         directions = {'UP': (-1, 0), 'DOWN': (1, 0), 
                      'LEFT': (0, -1), 'RIGHT': (0, 1)}
-        
-        # Evaluate each move
+        targets = {}
         for action in moves:
             dy, dx = directions[action]
-            new_pos = (pos[0] + dy, pos[1] + dx)
-            space = flood_fill(state['board'], new_pos, player)
-            
-            if space > best_space:
-                best_space = space
-                best_action = action
+            targets[action] = (pos[0] + dy, pos[1] + dx)
         
-        return best_action
+        # One labeling pass covers every candidate; candidates in the same
+        # region share its size instead of flood filling it again
+        labels, sizes = label_regions(state['board'], player, starts=list(targets.values()))
+        
+        scores = {}
+        for action in moves:
+            new_pos = targets[action]
+            space = sizes[labels[new_pos]]
+            distance = abs(new_pos[0] - opp_pos[0]) + abs(new_pos[1] - opp_pos[1])
+            scores[action] = (space, distance)
+        return scores
+    
+    def priors(self, state, player, temperature=2.0):
+        """
+        {move: prior} for MCTSAgent's policy, a softmax over the space each
+        move leaves: a move into a pocket a few cells smaller than the best
+        gets almost nothing
+        """
+        scores = self.move_scores(state, player)
+        if not scores:
+            return {}
+        best = max(space for space, distance in scores.values())
+        weights = {move: math.exp((space - best) / temperature)
+                   for move, (space, distance) in scores.items()}
+        total = sum(weights.values())
+        return {move: weight / total for move, weight in weights.items()}
 
 # Tournament - Test the greedy agent
 # Run if executed directly
@@ -1,61 +1,98 @@
 # Import all components from our modules
-from tron_base import TronGame, RandomAgent
-from greedy import GreedyAgent
-from minimax import MinimaxAgent
-from mcts import MCTSAgent
-from advanced_heuristic import AdvancedMinimaxAgent
+from tron_base import TronGame
+from registry import agent_spec, make_agent
+from result_cache import ResultCache, spec_fingerprint
+from game_clock import GameClock
+import random
 import time
 
-# Define all agents using our imported classes
-agents = {
-    'Minimax-5': MinimaxAgent(depth=5),
-    'Minimax-7': MinimaxAgent(depth=7),
-    'MCTS-500': MCTSAgent(simulations=500),
-    'MCTS-200': MCTSAgent(simulations=200),
-    'AdvMinimax-5': AdvancedMinimaxAgent(depth=5),
-    'AdvMinimax-7': AdvancedMinimaxAgent(depth=7),
-    'Greedy': GreedyAgent(),
-    'Random': RandomAgent(),
-}
+# Agents in the tournament, by registry name (see registry.py). Each one is
+# only imported once a game it plays is not in the cache, and is built anew
+# for every game it plays: agents that keep tables or scores between moves
+# would otherwise carry them from game to game, and a replayed game's result
+# would depend on which earlier games came from the cache.
+AGENT_NAMES = ['Minimax-5', 'Minimax-7', 'MCTS-500', 'MCTS-200',
+               'AdvMinimax-5', 'AdvMinimax-7', 'Greedy', 'Random']
 
 # Tournament function
-def run_round_robin_tournament(games_per_matchup=3):
-    """Run round-robin tournament between all agents"""
+def run_round_robin_tournament(games_per_matchup=3, board_size=20, seed=0,
+                               max_moves=100, cache_path='htoh_results.json', time_control=None,
+                               agent_names=AGENT_NAMES):
+    """
+    Run round-robin tournament between the agents in agent_names.
+    Results are cached on disk keyed by each agent's configuration, so
+    re-running only plays the games whose agents (or code) changed.
+    Pass cache_path=None to replay everything.
+    time_control=(total, increment) plays every game on a GameClock: each
+    player gets total seconds plus increment per move, agents that support a
+    clock budget their search from it, and running out of time loses.
+    """
     print("\n=== ROUND-ROBIN TOURNAMENT ===")
-    print("(Each matchup: {} games, 10x10 grid)\n".format(games_per_matchup))
+    print("(Each matchup: {} games, {}x{} grid)\n".format(games_per_matchup, board_size, board_size))
     
-    results = {name: {'wins': 0, 'losses': 0, 'draws': 0, 'time': 0} for name in agents}
+    results = {name: {'wins': 0, 'losses': 0, 'draws': 0, 'time': 0} for name in agent_names}
+    cache = ResultCache(cache_path) if cache_path else None
+    fingerprints = {name: spec_fingerprint(*agent_spec(name)) for name in agent_names}
     
-    agent_names = list(agents.keys())
     for i, name1 in enumerate(agent_names):
         for name2 in agent_names[i+1:]:
             print(f"\n{name1} vs {name2}:")
             
             for game_num in range(games_per_matchup):
-                game = TronGame(width=20, height=20)
-                state = game.reset()
-                moves = 0
+                key = None
+                record = None
+                if cache:
+                    key = cache.game_key(fingerprints[name1], fingerprints[name2],
+                                         board_size, seed, game_num, max_moves, time_control)
+                    record = cache.get(key)
                 
-                start_time = time.time()
-                while not game.game_over and moves < 100:
-                    a1 = agents[name1].get_action(state, 1)
-                    a2 = agents[name2].get_action(state, 2)
-                    state, reward, done = game.step(a1, a2)
-                    moves += 1
-                elapsed = time.time() - start_time
+                if record is None:
+                    random.seed(seed + game_num)
+                    agent1, agent2 = make_agent(name1), make_agent(name2)
+                    game = TronGame(width=board_size, height=board_size)
+                    state = game.reset()
+                    clock = GameClock(*time_control) if time_control else None
+                    moves = 0
+                    
+                    start_time = time.time()
+                    while not game.game_over and moves < max_moves:
+                        if clock:
+                            a1 = clock.move(agent1, state, 1)
+                            a2 = clock.move(agent2, state, 2)
+                        else:
+                            a1 = agent1.get_action(state, 1)
+                            a2 = agent2.get_action(state, 2)
+                        state, reward, done = game.step(a1, a2)
+                        moves += 1
+                    elapsed = time.time() - start_time
+                    for finished in (agent1, agent2):
+                        if hasattr(finished, 'close'):
+                            finished.close()  # Worker processes, thread pools
+                    
+                    record = {'winner': game.winner, 'moves': moves, 'time': elapsed}
+                    if clock and clock.flagged:
+                        record['flagged'] = sorted(clock.flagged)
+                    if cache:
+                        cache.put(key, record)
+                    tag = ""
+                else:
+                    tag = " [cached]"
+                if record.get('flagged'):
+                    tag += " [on time]"
                 
-                if game.winner == 1:
+                winner, moves, elapsed = record['winner'], record['moves'], record['time']
+                if winner == 1:
                     results[name1]['wins'] += 1
                     results[name2]['losses'] += 1
-                    print(f"  Game {game_num + 1}: {name1} wins ({moves} moves, {elapsed:.2f}s)")
-                elif game.winner == 2:
+                    print(f"  Game {game_num + 1}: {name1} wins ({moves} moves, {elapsed:.2f}s){tag}")
+                elif winner == 2:
                     results[name2]['wins'] += 1
                     results[name1]['losses'] += 1
-                    print(f"  Game {game_num + 1}: {name2} wins ({moves} moves, {elapsed:.2f}s)")
+                    print(f"  Game {game_num + 1}: {name2} wins ({moves} moves, {elapsed:.2f}s){tag}")
                 else:
                     results[name1]['draws'] += 1
                     results[name2]['draws'] += 1
-                    print(f"  Game {game_num + 1}: Draw ({moves} moves, {elapsed:.2f}s)")
+                    print(f"  Game {game_num + 1}: Draw ({moves} moves, {elapsed:.2f}s){tag}")
                 
                 results[name1]['time'] += elapsed / 2
                 results[name2]['time'] += elapsed / 2
@@ -74,6 +111,9 @@ def run_round_robin_tournament(games_per_matchup=3):
         avg_time = stats['time'] / total_games if total_games > 0 else 0
         print(f"{name:<15} {stats['wins']:>6} {stats['losses']:>6} {stats['draws']:>6} {win_pct:>5.1f}% {avg_time:>9.3f}s")
     
+    if cache:
+        print(f"\nCache: {cache.hits} games reused, {cache.misses} played ({cache_path})")
+    
     return results
 
 # Test code when run directly
@@ -0,0 +1,57 @@
+# import_budget.py - Keep the agent modules quick to import
+#
+# Runners, worker processes and the tournament import these modules over and
+# over, so importing one should cost little beyond numpy. Each module is
+# imported in a fresh interpreter with -X importtime and checked for:
+#   - heavy optional dependencies (pygame, requests) loaded at import; they
+#     belong behind the feature that needs them (visualize, OllamaClient)
+#   - import time beyond numpy over the budget (ours plus stdlib modules)
+#
+# Run:  python import_budget.py [budget_ms]    (exits 1 if any module fails)
+import os
+import re
+import subprocess
+import sys
+
+MODULES = ['tron_base', 'greedy', 'minimax', 'mcts', 'advanced_heuristic', 'htoh',
+           'registry', 'parallel_search', 'pondering', 'async_scheduler', 'ollamatron',
+           'agent_server', 'shared_state', 'maps', 'chambers']
+HEAVY = ['pygame', 'requests']
+BUDGET_MS = 100  # Measured 5-70ms beyond numpy for each module above
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)')
+
+
+def measure_import(module_name):
+    """(ms beyond numpy, heavy modules loaded) for importing module_name afresh"""
+    check = f"import sys, {module_name}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    # Run beside the modules so it works from any directory (pytest, CI)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', check],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            cumulative[match.group(3)] = int(match.group(2))
+    own = cumulative.get(module_name, 0) - cumulative.get('numpy', 0)
+    return own / 1000, result.stdout.split()
+
+
+def check_imports(modules=MODULES, budget_ms=BUDGET_MS):
+    """Print each module's import cost; True if every one is within budget"""
+    ok = True
+    for module_name in modules:
+        ms, heavy = measure_import(module_name)
+        problems = []
+        if ms > budget_ms:
+            problems.append(f"over {budget_ms}ms")
+        if heavy:
+            problems.append(f"loads {', '.join(heavy)}")
+        ok = ok and not problems
+        print(f"{module_name:<20} {ms:>7.1f}ms  {'; '.join(problems) or 'ok'}")
+    return ok
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    sys.exit(0 if check_imports(budget_ms=budget) else 1)
@@ -0,0 +1,453 @@
+# learned_eval.py - Learned leaf evaluator, trained from self-play records
+#
+# evaluate_state flood fills the board from both heads in Python for every
+# leaf, and advanced_evaluate adds more fills and a double loop on top. Here
+# a position is read with bitboards instead: the free cells are one Python
+# int (bit y * width + x, as in tablebase.py) and a breadth-first search
+# from both heads is a few shifts and ANDs per step. The search yields
+# bit planes per side (cells reached, cells reached first, rings at distance
+# 1-3) that are counted into a handful of features, normalized by board
+# size so one model serves every board:
+#   per side:  space, voronoi (cells reached first), rings 1-3,
+#              fill bound (checkerboard parity limit on moves in its space)
+#   shared:    free cells, separated, head distance, tied cells
+#
+# The model scores a position for player 1:
+#   g(x) = w . x + w2 . tanh(W1 x + b1)        (hidden=0: linear)
+#   value = tanh(g(x) - g(x swapped))          (x swapped: players exchanged)
+# so swapping the players negates the value and mirror positions score 0.
+# Values are in (-1, 1), roughly the expected result for player 1.
+#
+# Evaluators (this one and SpaceEvaluator) share one interface:
+#   evaluate(board, p1_pos, p2_pos)            -> score for player 1
+#   evaluate_batch(boards, p1_positions, p2_positions) -> array of scores
+# MinimaxAgent(evaluator=...) scores its leaves with one, and
+# MCTSAgent(evaluator=...) scores its rollouts' start instead of playing out
+# (a batch of leaves at a time with batch_size). A batch of positions of one
+# board shape is searched together: the boards are laid side by side in one
+# int, so each search step is the same few operations for the whole batch.
+#
+# Train:  python learned_eval.py learned_eval.npz selfplay_data [more dirs...]
+# Use:    MinimaxAgent(depth=5, evaluator='learned_eval.npz'), same for MCTSAgent
+import math
+import sys
+import time
+import numpy as np
+from maps import map_graph
+from chambers import ChamberEvaluator
+
+FEATURES = ['space', 'voronoi', 'ring1', 'ring2', 'ring3', 'fill']
+SHARED = ['free', 'separated', 'distance', 'tied']
+SIDE = len(FEATURES)
+DIRECTIONS = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
+# Below this many positions, batch_features' fixed NumPy cost outweighs its shared search
+BATCH_MIN = 8
+
+
+class BoardBits:
+    """Bitboard geometry of a height x width board"""
+
+    shapes = {}  # (height, width) -> BoardBits
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.cells = height * width
+        full = (1 << self.cells) - 1
+        first_column = sum(1 << (y * width) for y in range(height))
+        # Where a shift by one column may land without wrapping to another row
+        self.not_first = full & ~first_column
+        self.not_last = full & ~(first_column << (width - 1))
+        self.dark = sum(self.bit((y, x)) for y in range(height) for x in range(width)
+                        if (y + x) % 2 == 0)
+
+    @classmethod
+    def of(cls, shape):
+        if shape not in cls.shapes:
+            cls.shapes[shape] = cls(*shape)
+        return cls.shapes[shape]
+
+    def free(self, board):
+        """Mask of the empty cells"""
+        packed = np.packbits(board.ravel() == 0, bitorder='little')
+        return int.from_bytes(packed.tobytes(), 'little')
+
+    def bit(self, pos):
+        return 1 << (int(pos[0]) * self.width + int(pos[1]))
+
+
+def fill_bound(bits, space, head):
+    """Most moves a head could make in space: paths alternate checkerboard colours"""
+    if not space:
+        return 0
+    head_dark = bool(head & bits.dark)
+    first = (space & ~bits.dark if head_dark else space & bits.dark).bit_count()
+    second = space.bit_count() - first
+    return 2 * min(first, second) + (1 if first > second else 0)
+
+
+def position_features(board, p1_pos, p2_pos):
+    """Feature vector of a position, player 1's side first (see FEATURES, SHARED)"""
+    bits = BoardBits.of(board.shape)
+    width, not_first, not_last = bits.width, bits.not_first, bits.not_last
+    free = bits.free(board)
+    a, b = bits.bit(p1_pos), bits.bit(p2_pos)
+    # Free cells each search has not reached yet
+    open_a, open_b = free, free
+    front_a, front_b = a, b
+    first_a = first_b = 0
+    rings_a, rings_b = [0, 0, 0], [0, 0, 0]
+    distance = None
+    step = 0
+    while front_a or front_b:
+        # One step of each search: the open cells next to its front (inlined, it is the hot loop)
+        next_a = (((front_a << 1) & not_first) | ((front_a >> 1) & not_last)
+                  | (front_a << width) | (front_a >> width)) & open_a
+        next_b = (((front_b << 1) & not_first) | ((front_b >> 1) & not_last)
+                  | (front_b << width) | (front_b >> width)) & open_b
+        open_a ^= next_a
+        open_b ^= next_b
+        # Reached now by one side, and not before or now by the other
+        first_a |= next_a & open_b
+        first_b |= next_b & open_a
+        if distance is None and (next_a & ~open_b or next_b & ~open_a):
+            distance = 2 * step + 2 if next_a & next_b else 2 * step + 1
+        if step < 3:
+            rings_a[step] = next_a.bit_count()
+            rings_b[step] = next_b.bit_count()
+        front_a, front_b = next_a, next_b
+        step += 1
+
+    cells = bits.cells
+    space_a, space_b = free ^ open_a, free ^ open_b
+    tied = space_a & space_b & ~(first_a | first_b)
+    separated = distance is None
+    return [space_a.bit_count() / cells, first_a.bit_count() / cells, rings_a[0] / 4, rings_a[1] / 8,
+            rings_a[2] / 12, fill_bound(bits, space_a, a) / cells,
+            space_b.bit_count() / cells, first_b.bit_count() / cells, rings_b[0] / 4, rings_b[1] / 8,
+            rings_b[2] / 12, fill_bound(bits, space_b, b) / cells,
+            free.bit_count() / cells, 1.0 if separated else 0.0,
+            1.0 if separated else min(distance / (bits.height + bits.width), 1.0),
+            tied.bit_count() / cells]
+
+
+def bits_to_int(flags):
+    """Python int with bit i set where flags[i] (a flat bool array)"""
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+
+
+class BatchBits:
+    """
+    Bitboard geometry of n boards laid side by side in one int: board k
+    starts at bit k * block and is followed by occupied spacer bits (at
+    least a row, up to a whole 64-bit word), so one search runs on every
+    board at once without crossing between them, and each board owns whole
+    words for counting.
+    """
+
+    layouts = {}  # (height, width, n) -> BatchBits
+
+    def __init__(self, height, width, n):
+        self.height = height
+        self.width = width
+        self.n = n
+        self.block_words = -(-(height + 1) * width // 64)
+        self.block = 64 * self.block_words
+        self.bytes = 8 * n * self.block_words
+        column = np.arange(self.block) % width
+        row = np.arange(self.block) // width
+        self.not_first = bits_to_int(np.tile(column != 0, n))
+        self.not_last = bits_to_int(np.tile(column != width - 1, n))
+        self.dark_cells = ((row + column) % 2 == 0) & (row < height)
+        self.dark = bits_to_int(np.tile(self.dark_cells, n))
+
+    @classmethod
+    def of(cls, height, width, n):
+        key = (height, width, n)
+        if key not in cls.layouts:
+            cls.layouts[key] = cls(height, width, n)
+        return cls.layouts[key]
+
+    def words(self, masks):
+        """(len(masks), n, block_words) uint64 array of masks"""
+        data = b''.join(mask.to_bytes(self.bytes, 'little') for mask in masks)
+        return np.frombuffer(data, dtype='<u8').reshape(len(masks), self.n, self.block_words)
+
+    def counts(self, masks):
+        """(len(masks), n) array: set bits of each mask in each board"""
+        return np.bitwise_count(self.words(masks)).sum(axis=2)
+
+
+def batch_features(boards, p1_positions, p2_positions):
+    """
+    position_features of many positions of one board shape, as rows of an
+    array. The search steps are shared by every board, so a step for the
+    whole batch costs little more than for one board; counts are taken per
+    board with NumPy.
+    """
+    n = len(boards)
+    height, width = boards[0].shape
+    layout = BatchBits.of(height, width, n)
+    not_first, not_last = layout.not_first, layout.not_last
+    grid = np.zeros((n, layout.block), dtype=bool)
+    grid[:, :height * width] = np.stack(boards).reshape(n, -1) == 0
+    free = bits_to_int(grid.ravel())
+    offsets = np.arange(n) * layout.block
+    heads = np.array([p1_positions, p2_positions], dtype=np.int64)  # (2, n, 2)
+    cells_a = heads[0, :, 0] * width + heads[0, :, 1]
+    cells_b = heads[1, :, 0] * width + heads[1, :, 1]
+    grid[:] = False
+    grid.ravel()[offsets + cells_a] = True
+    a = bits_to_int(grid.ravel())
+    grid[:] = False
+    grid.ravel()[offsets + cells_b] = True
+    b = bits_to_int(grid.ravel())
+
+    open_a, open_b = free, free
+    front_a, front_b = a, b
+    first_a = first_b = 0
+    rings = [0] * 6
+    # Steps where the searches touched on some board; the first per board is resolved after
+    meet_steps, meets, boths = [], [], []
+    step = 0
+    while front_a or front_b:
+        next_a = (((front_a << 1) & not_first) | ((front_a >> 1) & not_last)
+                  | (front_a << width) | (front_a >> width)) & open_a
+        next_b = (((front_b << 1) & not_first) | ((front_b >> 1) & not_last)
+                  | (front_b << width) | (front_b >> width)) & open_b
+        open_a ^= next_a
+        open_b ^= next_b
+        first_a |= next_a & open_b
+        first_b |= next_b & open_a
+        meet = (next_a & ~open_b) | (next_b & ~open_a)
+        if meet:
+            meet_steps.append(step)
+            meets.append(meet)
+            boths.append(next_a & next_b)
+        if step < 3:
+            rings[step], rings[3 + step] = next_a, next_b
+        front_a, front_b = next_a, next_b
+        step += 1
+
+    separated = np.ones(n, dtype=bool)
+    distance = np.zeros(n)
+    if meets:
+        met = layout.words(meets).any(axis=2)  # (steps, n)
+        both = layout.words(boths).any(axis=2)
+        first = met.argmax(axis=0)
+        separated = ~met.any(axis=0)
+        at = np.array(meet_steps)[first]
+        distance = np.where(both[first, np.arange(n)], 2 * at + 2, 2 * at + 1)
+
+    space_a, space_b = free ^ open_a, free ^ open_b
+    dark = layout.dark
+    (count_a, voronoi_a, dark_a, count_b, voronoi_b, dark_b, tied, free_count,
+     ring1_a, ring2_a, ring3_a, ring1_b, ring2_b, ring3_b) = layout.counts(
+        [space_a, first_a, space_a & dark, space_b, first_b, space_b & dark,
+         space_a & space_b & ~(first_a | first_b), free] + rings)
+
+    def fill(total, on_dark, head_cells):
+        """fill_bound of each board's space"""
+        first = np.where(layout.dark_cells[head_cells], total - on_dark, on_dark)
+        second = total - first
+        return 2 * np.minimum(first, second) + (first > second)
+
+    cells = height * width
+    reach = height + width
+    return np.column_stack([
+        count_a / cells, voronoi_a / cells, ring1_a / 4, ring2_a / 8, ring3_a / 12,
+        fill(count_a, dark_a, cells_a) / cells,
+        count_b / cells, voronoi_b / cells, ring1_b / 4, ring2_b / 8, ring3_b / 12,
+        fill(count_b, dark_b, cells_b) / cells,
+        free_count / cells, separated.astype(float),
+        np.where(separated, 1.0, np.minimum(distance / reach, 1.0)), tied / cells])
+
+
+# Feature order with the players exchanged (its own inverse)
+SWAP = list(range(SIDE, 2 * SIDE)) + list(range(SIDE)) + list(range(2 * SIDE, 2 * SIDE + len(SHARED)))
+
+
+def swap_sides(x):
+    """Features with the players exchanged (rows of x)"""
+    return x[..., SWAP]
+
+
+class LearnedEvaluator:
+    """Antisymmetric linear/MLP value model over position_features"""
+
+    loaded = {}  # path -> LearnedEvaluator, shared by every agent in the process
+
+    def __init__(self, w, W1, b1, w2):
+        self.w = w
+        self.W1 = W1
+        self.b1 = b1
+        self.w2 = w2
+        self.prepare()
+
+    def prepare(self):
+        """
+        Fold the swap into the weights for single positions: W1 (x swapped)
+        is W1[:, SWAP] x, so both halves of the value take one product with x
+        """
+        self.linear = self.w - self.w[SWAP]
+        self.hidden = np.vstack([self.W1, self.W1[:, SWAP]])
+        self.bias = np.concatenate([self.b1, self.b1])
+        self.out = np.concatenate([self.w2, -self.w2])
+
+    @classmethod
+    def initial(cls, hidden=16, seed=0):
+        size = 2 * SIDE + len(SHARED)
+        rng = np.random.default_rng(seed)
+        return cls(np.zeros(size), rng.normal(0, 1 / np.sqrt(size), (hidden, size)),
+                   np.zeros(hidden), rng.normal(0, 1 / np.sqrt(max(hidden, 1)), hidden))
+
+    @classmethod
+    def open(cls, path):
+        if path not in cls.loaded:
+            with np.load(path) as data:
+                cls.loaded[path] = cls(data['w'], data['W1'], data['b1'], data['w2'])
+        return cls.loaded[path]
+
+    def save(self, path):
+        np.savez(path, w=self.w, W1=self.W1, b1=self.b1, w2=self.w2)
+
+    def g(self, X):
+        return X @ self.w + np.tanh(X @ self.W1.T + self.b1) @ self.w2
+
+    def value(self, X):
+        """Model output for feature rows X"""
+        return np.tanh(self.g(X) - self.g(swap_sides(X)))
+
+    def evaluate(self, board, p1_pos, p2_pos):
+        x = np.array(position_features(board, p1_pos, p2_pos))
+        return math.tanh(x @ self.linear + np.tanh(self.hidden @ x + self.bias) @ self.out)
+
+    def evaluate_batch(self, boards, p1_positions, p2_positions):
+        if len(boards) >= BATCH_MIN and len({board.shape for board in boards}) == 1:
+            X = batch_features(boards, p1_positions, p2_positions)
+        else:
+            X = np.array([position_features(board, p1, p2)
+                          for board, p1, p2 in zip(boards, p1_positions, p2_positions)])
+        return self.value(X)
+
+    def priors(self, state, player, temperature=0.1):
+        """{move: prior} for MCTSAgent's policy: a softmax over the value after each move"""
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if not moves:
+            return {}
+        pos = state['p1_pos'] if player == 1 else state['p2_pos']
+        boards, p1_positions, p2_positions = [], [], []
+        for move in moves:
+            dy, dx = DIRECTIONS[move]
+            target = (pos[0] + dy, pos[1] + dx)
+            board = state['board'].copy()
+            board[target] = player
+            boards.append(board)
+            p1_positions.append(target if player == 1 else state['p1_pos'])
+            p2_positions.append(target if player == 2 else state['p2_pos'])
+        values = self.evaluate_batch(boards, p1_positions, p2_positions)
+        if player == 2:
+            values = -values
+        weights = np.exp((values - values.max()) / temperature)
+        weights /= weights.sum()
+        return dict(zip(moves, weights.tolist()))
+
+
+class SpaceEvaluator:
+    """MinimaxAgent's own heuristic (difference in reachable space) as an evaluator"""
+
+    def evaluate(self, board, p1_pos, p2_pos):
+        graph = map_graph(board)
+        return graph.flood_fill(board, p1_pos, 1) - graph.flood_fill(board, p2_pos, 2)
+
+    def evaluate_batch(self, boards, p1_positions, p2_positions):
+        return np.array([self.evaluate(board, p1, p2)
+                         for board, p1, p2 in zip(boards, p1_positions, p2_positions)], dtype=float)
+
+
+def open_evaluator(evaluator):
+    """An evaluator object, 'chambers' (see chambers.py), or the LearnedEvaluator saved at a path"""
+    if evaluator == 'chambers':
+        return ChamberEvaluator()
+    if isinstance(evaluator, str):
+        return LearnedEvaluator.open(evaluator)
+    return evaluator
+
+
+def load_training_data(directories):
+    """(features, targets) of every self-play record, targets for player 1"""
+    from selfplay import iter_batches
+    rows, targets = [], []
+    for directory in directories:
+        for batch in iter_batches(directory, 1024):
+            # Player 2's record of the same position is its mirror
+            mine = batch['side'] == 1
+            if not mine.any():
+                continue
+            heads = batch['heads'][mine]
+            rows.append(batch_features(list(batch['board'][mine]), heads[:, 0], heads[:, 1]))
+            targets.append(batch['result'][mine].astype(float))
+    return np.concatenate(rows), np.concatenate(targets)
+
+
+def train_evaluator(directories, path='learned_eval.npz', hidden=16, epochs=200,
+                    lr=0.01, batch_size=256, val_fraction=0.1, seed=0):
+    """
+    Fit a LearnedEvaluator to self-play results (see selfplay.py) by
+    mean squared error with Adam, and save it. Returns the evaluator.
+    """
+    if isinstance(directories, str):
+        directories = [directories]
+    start = time.time()
+    X, y = load_training_data(directories)
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(y))
+    split = int(len(y) * (1 - val_fraction))
+    train, val = order[:split], order[split:]
+    print(f"{len(y)} positions ({time.time() - start:.1f}s to extract features)")
+
+    model = LearnedEvaluator.initial(hidden, seed)
+    params = [model.w, model.W1, model.b1, model.w2]
+    moments = [np.zeros_like(p) for p in params]
+    squares = [np.zeros_like(p) for p in params]
+    beta1, beta2, t = 0.9, 0.999, 0
+
+    def gradients(Xb, yb):
+        """Gradients of the mean squared error for each of params"""
+        Xs = swap_sides(Xb)
+        Ha, Hb = np.tanh(Xb @ model.W1.T + model.b1), np.tanh(Xs @ model.W1.T + model.b1)
+        v = np.tanh(Xb @ model.w + Ha @ model.w2 - Xs @ model.w - Hb @ model.w2)
+        dz = 2 * (v - yb) * (1 - v * v) / len(yb)
+        da = (dz[:, None] * (1 - Ha * Ha)) * model.w2
+        db = (dz[:, None] * (1 - Hb * Hb)) * model.w2
+        return [dz @ (Xb - Xs), da.T @ Xb - db.T @ Xs, da.sum(0) - db.sum(0),
+                dz @ (Ha - Hb)]
+
+    for epoch in range(epochs):
+        rng.shuffle(train)
+        for begin in range(0, len(train), batch_size):
+            rows = train[begin:begin + batch_size]
+            t += 1
+            for p, m, s, grad in zip(params, moments, squares, gradients(X[rows], y[rows])):
+                m *= beta1
+                m += (1 - beta1) * grad
+                s *= beta2
+                s += (1 - beta2) * grad * grad
+                p -= lr * (m / (1 - beta1 ** t)) / (np.sqrt(s / (1 - beta2 ** t)) + 1e-8)
+        if (epoch + 1) % max(epochs // 10, 1) == 0:
+            v = model.value(X[val])
+            decided = y[val] != 0
+            accuracy = (np.sign(v[decided]) == y[val][decided]).mean() if decided.any() else 0
+            print(f"  epoch {epoch + 1}: val mse {((v - y[val]) ** 2).mean():.3f}, "
+                  f"winner right {accuracy:.1%}")
+
+    model.prepare()
+    model.save(path)
+    print(f"Saved {path} ({time.time() - start:.1f}s)")
+    return model
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else 'learned_eval.npz'
+    directories = sys.argv[2:] or ['selfplay_data']
+    train_evaluator(directories, path)
@@ -0,0 +1,309 @@
+# maps.py - Arenas with static walls and spawn points, and their precomputed graph
+#
+# A map file is a text grid, one line per row:
+#   #  wall        .  open cell        1 / 2  spawn of player 1 / 2 (open)
+# TronGame(game_map=...) plays on it: walls are WALL on the board, so every
+# check for an empty cell (== 0) already treats them as blocked.
+#
+# Walls never change during a game, so everything that depends only on them
+# is worked out once per map by MapGraph and shared by every search on it:
+#   - numbering of the open cells (cell_of, cells) and an adjacency table
+#     over them (neighbors, adjacency), with no bounds or wall checks left
+#   - degree of each open cell, dead ends (one way in) and corridors (runs
+#     of two-way cells), and the cul-de-sacs: dead ends with the corridor
+#     leading into them, which a head that enters can only fill and die in
+#   - distances between open cells ignoring trails (a lower bound on the
+#     distance in play): all pairs up to ALL_PAIRS_MAX cells, otherwise
+#     from LANDMARKS landmark cells, computed on first use
+# map_graph(board) finds the graph for a board's walls in a cache, so an
+# evaluator can ask for it at every leaf.
+#
+# Run:  python maps.py [map files...]    (precomputation and agent timings per map)
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+WALL = 3
+ALL_PAIRS_MAX = 1024
+LANDMARKS = 16
+MOVES = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maps')
+
+
+class GameMap:
+    """An arena: walls (bool array, True for a wall) and the two spawn points"""
+
+    def __init__(self, walls, spawns, name=''):
+        self.walls = np.asarray(walls, dtype=bool)
+        self.spawns = [tuple(int(v) for v in spawn) for spawn in spawns]
+        self.name = name
+        self.height, self.width = self.walls.shape
+        for spawn in self.spawns:
+            if not (0 <= spawn[0] < self.height and 0 <= spawn[1] < self.width) or self.walls[spawn]:
+                raise ValueError(f"Spawn {spawn} is not an open cell of map {name!r}")
+
+    @classmethod
+    def empty(cls, width, height):
+        """The open rectangle with corner spawns that TronGame plays by default"""
+        return cls(np.zeros((height, width), dtype=bool), [(1, 1), (height - 2, width - 2)],
+                   f"empty{width}x{height}")
+
+    @classmethod
+    def parse(cls, text, name=''):
+        rows = [line.rstrip() for line in text.splitlines() if line.strip()]
+        if not rows or any(len(row) != len(rows[0]) for row in rows):
+            raise ValueError(f"Map {name!r} must be a rectangle of characters")
+        walls = np.array([[c == '#' for c in row] for row in rows])
+        spawns = []
+        for player in '12':
+            found = [(y, x) for y, row in enumerate(rows) for x, c in enumerate(row) if c == player]
+            if len(found) != 1:
+                raise ValueError(f"Map {name!r} needs exactly one spawn '{player}'")
+            spawns.append(found[0])
+        unknown = {c for row in rows for c in row} - set('#.12')
+        if unknown:
+            raise ValueError(f"Map {name!r} has unknown cells {sorted(unknown)}")
+        return cls(walls, spawns, name)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.parse(f.read(), os.path.splitext(os.path.basename(path))[0])
+
+    def to_text(self):
+        rows = [['#' if wall else '.' for wall in row] for row in self.walls]
+        for player, (y, x) in enumerate(self.spawns, 1):
+            rows[y][x] = str(player)
+        return '\n'.join(''.join(row) for row in rows) + '\n'
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_text())
+
+    def board(self):
+        """A starting board: walls, and each player's trail on its spawn"""
+        board = np.where(self.walls, WALL, 0)
+        for player, spawn in enumerate(self.spawns, 1):
+            board[spawn] = player
+        return board
+
+    def graph(self):
+        return map_graph(self.board())
+
+
+def bfs_distances(adjacency, sources):
+    """Distances (len(sources), n) over the open cells from each source, -1 where unreachable"""
+    n = len(adjacency)
+    # Missing neighbours point at column n, which is never reached
+    padded = np.where(adjacency >= 0, adjacency, n)
+    rows = np.arange(len(sources))
+    dist = np.full((len(sources), n), -1, dtype=np.int16)
+    dist[rows, sources] = 0
+    reached = np.zeros((len(sources), n + 1), dtype=bool)
+    reached[rows, sources] = True
+    frontier = reached.copy()
+    step = 0
+    while True:
+        step += 1
+        nxt = frontier[:, padded[:, 0]]
+        for k in range(1, 4):
+            nxt |= frontier[:, padded[:, k]]
+        nxt &= ~reached[:, :n]
+        if not nxt.any():
+            return dist
+        dist[nxt] = step
+        reached[:, :n] |= nxt
+        frontier[:, :n] = nxt
+
+
+class MapGraph:
+    """The static structure of the open cells of one wall layout (see the top of the file)"""
+
+    def __init__(self, walls):
+        self.height, self.width = walls.shape
+        open_cells = np.flatnonzero(~walls.ravel())
+        self.n = len(open_cells)
+        self.flat = open_cells  # Board index (y * width + x) of each open cell
+        self.cells = [divmod(int(i), self.width) for i in open_cells]
+        cell_of = np.full(walls.shape, -1, dtype=np.int32)
+        cell_of.ravel()[open_cells] = np.arange(self.n)
+        self.cell_of = cell_of
+
+        # adjacency[c, k]: the open cell one step in direction MOVES[k] from c, or -1
+        self.adjacency = np.full((self.n, 4), -1, dtype=np.int32)
+        for k, (dy, dx) in enumerate(DIRECTIONS):
+            ys, xs = np.divmod(open_cells, self.width)
+            ys, xs = ys + dy, xs + dx
+            inside = (ys >= 0) & (ys < self.height) & (xs >= 0) & (xs < self.width)
+            self.adjacency[inside, k] = cell_of[ys[inside], xs[inside]]
+        self.neighbors = [[int(m) for m in row if m >= 0] for row in self.adjacency]
+        self.degree = (self.adjacency >= 0).sum(axis=1)
+        # Checkerboard colour of each open cell; a path alternates colours
+        self.parity = [(y + x) & 1 for y, x in self.cells]
+
+        self.dead_ends = np.flatnonzero(self.degree == 1)
+        self.find_corridors()
+        self.find_cul_de_sacs()
+        self._distances = None
+        self._landmarks = None
+
+    def find_corridors(self):
+        """corridor[c]: id of the run of two-way cells containing c, or -1; corridors: their cells"""
+        self.corridor = np.full(self.n, -1, dtype=np.int32)
+        self.corridors = []
+        for start in np.flatnonzero(self.degree == 2):
+            if self.corridor[start] >= 0:
+                continue
+            run = [int(start)]
+            self.corridor[start] = len(self.corridors)
+            stack = [int(start)]
+            while stack:
+                cell = stack.pop()
+                for m in self.neighbors[cell]:
+                    if self.degree[m] == 2 and self.corridor[m] < 0:
+                        self.corridor[m] = len(self.corridors)
+                        run.append(m)
+                        stack.append(m)
+            self.corridors.append(run)
+
+    def find_cul_de_sacs(self):
+        """cul_de_sac[c]: c is a dead end or on the corridor leading only to one"""
+        self.cul_de_sac = np.zeros(self.n, dtype=bool)
+        for end in self.dead_ends:
+            cell, previous = int(end), -1
+            while True:
+                self.cul_de_sac[cell] = True
+                onward = [m for m in self.neighbors[cell] if m != previous]
+                if len(onward) != 1 or self.degree[onward[0]] != 2:
+                    break
+                previous, cell = cell, onward[0]
+
+    # ------------------------
+    # Distances
+    # ------------------------
+
+    @property
+    def distances(self):
+        """All-pairs distances (n, n), or None on maps over ALL_PAIRS_MAX open cells"""
+        if self._distances is None and self.n <= ALL_PAIRS_MAX:
+            self._distances = bfs_distances(self.adjacency, np.arange(self.n))
+        return self._distances
+
+    @property
+    def landmarks(self):
+        """(landmark cells, their distances (k, n)), chosen farthest-first"""
+        if self._landmarks is None:
+            chosen = []
+            rows = []
+            nearest = bfs_distances(self.adjacency, np.array([0]))[0].astype(np.int32)
+            for _ in range(min(LANDMARKS, self.n)):
+                # Unreachable cells count as farthest, so every component gets one
+                far = int(np.argmax(np.where(nearest < 0, np.iinfo(np.int32).max, nearest)))
+                row = bfs_distances(self.adjacency, np.array([far]))[0]
+                chosen.append(far)
+                rows.append(row)
+                reach = np.where(row < 0, np.iinfo(np.int32).max, row)
+                nearest = reach if len(chosen) == 1 else np.minimum(nearest, reach)
+                nearest[chosen] = 0
+            self._landmarks = (np.array(chosen), np.array(rows))
+        return self._landmarks
+
+    def distance_bound(self, a, b):
+        """
+        Lower bound on the moves from position a to position b: the exact
+        distance around the walls when all pairs are known, else the landmark
+        (triangle inequality) bound. -1 if the walls separate them.
+        """
+        ca, cb = self.cell_of[a], self.cell_of[b]
+        if self.distances is not None:
+            return int(self.distances[ca, cb])
+        cells, rows = self.landmarks
+        da, db = rows[:, ca].astype(np.int32), rows[:, cb].astype(np.int32)
+        if ((da < 0) != (db < 0)).any():
+            return -1
+        both = da >= 0
+        return int(np.abs(da[both] - db[both]).max())
+
+    # ------------------------
+    # Search helpers
+    # ------------------------
+
+    def flood_fill(self, board, start_pos, player_id):
+        """tron_base.flood_fill over the adjacency table: cells passable for player_id reachable from start_pos"""
+        values = board.ravel()[self.flat].tolist()
+        start = int(self.cell_of[start_pos])
+        if start < 0 or values[start] not in (0, player_id):
+            return 0
+        seen = [False] * self.n
+        seen[start] = True
+        stack = [start]
+        neighbors = self.neighbors
+        count = 0
+        while stack:
+            cell = stack.pop()
+            count += 1
+            for m in neighbors[cell]:
+                if not seen[m] and (values[m] == 0 or values[m] == player_id):
+                    seen[m] = True
+                    stack.append(m)
+        return count
+
+
+GRAPHS = {}
+
+
+def map_graph(board):
+    """The MapGraph of a board's walls, built once per wall layout"""
+    key = (board.shape, np.flatnonzero(board.ravel() == WALL).tobytes())
+    graph = GRAPHS.get(key)
+    if graph is None:
+        if len(GRAPHS) >= 64:
+            GRAPHS.clear()  # Crude, like TranspositionTable; maps are few
+        graph = GRAPHS[key] = MapGraph(board == WALL)
+    return graph
+
+
+def map_paths():
+    """The map files shipped in maps/"""
+    return sorted(glob.glob(os.path.join(MAP_DIR, '*.txt')))
+
+
+if __name__ == "__main__":
+    from registry import make_agent
+    from tron_base import TronGame
+
+    paths = sys.argv[1:] or map_paths()
+    # Labels and registry specs; PVS-5 hashes positions, which must cover walls
+    agents = {'Greedy': 'Greedy', 'Minimax-5': 'Minimax-5',
+              'PVS-5': ('minimax.MinimaxAgent', {'depth': 5, 'use_pvs': True, 'tt_size': 100000}),
+              'MCTS-200': 'MCTS-200'}
+    print(f"{'map':<12} {'size':>7} {'open':>5} {'dead':>5} {'corr':>5} {'build':>8} {'dists':>8}"
+          + ''.join(f" {name:>12}" for name in agents))
+    for path in paths:
+        game_map = GameMap.load(path)
+        start = time.perf_counter()
+        graph = MapGraph(game_map.walls)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        if graph.distances is None:
+            graph.landmarks
+        dists = time.perf_counter() - start
+        row = (f"{game_map.name:<12} {game_map.width:>3}x{game_map.height:<3} {graph.n:>5} "
+               f"{len(graph.dead_ends):>5} {len(graph.corridors):>5} {build * 1000:>6.1f}ms {dists * 1000:>6.1f}ms")
+        # Time per move for each agent, playing player 1 against Greedy for 20 moves
+        for name, spec in agents.items():
+            agent, opponent = make_agent(spec), make_agent('Greedy')
+            game = TronGame(game_map=game_map)
+            state = game.reset()
+            moves, spent = 0, 0.0
+            while not game.game_over and moves < 20:
+                start = time.perf_counter()
+                a1 = agent.get_action(state, 1)
+                spent += time.perf_counter() - start
+                state, reward, done = game.step(a1, opponent.get_action(state, 2))
+                moves += 1
+            row += f" {spent / moves * 1000:>9.1f}ms"
+        print(row)
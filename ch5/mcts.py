@@ -2,6 +2,10 @@
 
 from tron_base import TronGame, flood_fill
 from greedy import GreedyAgent
+from opening_book import OpeningBook
+from tablebase import EndgameTablebase
+from game_clock import GameClock, MoveBudget
+from learned_eval import LearnedEvaluator, open_evaluator
 import math
 import random
 from copy import deepcopy
@@ -22,6 +26,8 @@ class MCTSNode:
         self.children = []
         self.visits = 0
         self.value = 0.0
+        # Move -> prior, set when MCTSAgent first expands the node (with a policy or puct)
+        self.priors = None
 
         self.untried_actions = self.get_moves()
 
@@ -40,33 +46,210 @@ class MCTSNode:
             )
         )
 
+    def best_move_puct(self, c_puct, root_player, untried):
+        """
+        PUCT over the children and the untried moves given: value for the
+        player to move here plus exploration weighted by the prior. A move
+        without visits is valued at this node's own mean (first-play
+        urgency), so its prior decides when it is first tried.
+        Returns (child, move); child is None for an untried move.
+        """
+        # Values are from root_player's point of view; the opponent minimizes them
+        sign = 1 if self.player == root_player else -1
+        scale = c_puct * math.sqrt(self.visits)
+        fpu = sign * self.value / self.visits if self.visits else 0.0
+        options = [(child, child.move) for child in self.children]
+        options += [(None, move) for move in untried]
+
+        def score(option):
+            child, move = option
+            visits = child.visits if child is not None else 0
+            q = sign * child.value / visits if visits else fpu
+            prior = self.priors[move]
+            # Ties (all unvisited, or a node not yet visited) go to the likelier move
+            return q + scale * prior / (1 + visits), prior
+
+        return max(options, key=score)
+
+
+def open_policy(policy):
+    """An object with priors(state, player): 'greedy', a LearnedEvaluator path, or the object"""
+    if policy == 'greedy':
+        return GreedyAgent()
+    if isinstance(policy, str):
+        return LearnedEvaluator.open(policy)
+    return policy
+
+
+def evaluate_leaves(evaluator, states):
+    """Scores for player 1 of leaf states, in one evaluate_batch call if there are several"""
+    if len(states) == 1:
+        state = states[0]
+        return [evaluator.evaluate(state['board'], state['p1_pos'], state['p2_pos'])]
+    return evaluator.evaluate_batch([state['board'] for state in states],
+                                    [state['p1_pos'] for state in states],
+                                    [state['p2_pos'] for state in states])
+
 
 class MCTSAgent:
-    def __init__(self, simulations=200):
+    def __init__(self, simulations=200, book=None, tablebase=None, reuse_tree=False, evaluator=None,
+                 policy=None, puct=False, c_puct=1.5, widening=0.0, batch_size=1):
         self.simulations = simulations
+        # Path of an opening book (see opening_book.py) to play from before searching
+        self.book = book
+        # Path of an endgame tablebase (see tablebase.py) to play from once it covers the position
+        self.tablebase = tablebase
+        # Set by GameClock.move during a timed move: simulations then run until
+        # the move's time budget is used instead of stopping at `simulations`
+        self.clock = None
+        # With reuse_tree, the subtree for the position that was actually
+        # reached (our move plus the opponent's reply) becomes the next root,
+        # keeping its visits; ponder() grows it on the opponent's time
+        self.reuse_tree = reuse_tree
+        self.last_root = None
+        self.last_move = None
+        self.reused_visits = 0
+        # Visits of each root move in the last search ({} if the move was not searched)
+        self.root_visits = {}
+        # With evaluator (an object with evaluate(board, p1_pos, p2_pos), or
+        # the path of a LearnedEvaluator, see learned_eval.py), a new leaf is
+        # scored by it instead of by a random playout
+        self.evaluator = evaluator
+        self.leaf_evaluator = open_evaluator(evaluator) if evaluator is not None else None
+        # With policy ('greedy', the path of a LearnedEvaluator, or an object
+        # with priors(state, player) -> {move: prior}), each node expands its
+        # moves most likely first. puct selects by PUCT (priors are uniform
+        # without a policy) instead of UCB1, among all legal moves: an
+        # unexpanded move is scored from its prior and its parent's value, so
+        # unlikely moves may never be tried. With widening, a node with n
+        # visits has at most 1 + widening * sqrt(n) children, so the rest are
+        # not even candidates until it has been visited enough
+        self.policy = policy
+        self.move_policy = open_policy(policy) if policy is not None else None
+        self.puct = puct
+        self.c_puct = c_puct
+        self.widening = widening
+        # With an evaluator and batch_size > 1, each step selects up to
+        # batch_size leaves (virtual loss steers later selections away from
+        # the earlier ones' paths) and scores them in one evaluate_batch call.
+        # batch_fill is the share of the last search's batch slots that were
+        # scored: terminal leaves are backed up without scoring, and a
+        # selection that lands on a leaf already in the batch ends it early
+        self.batch_size = batch_size
+        self.batch_fill = 0.0
 
     def search(self, root_state, player):
+        return self.run_steps(self.search_steps(root_state, player))
+
+    def run_steps(self, steps):
+        """
+        Drive a search_steps or action_steps generator, scoring the leaf
+        states it yields with our evaluator; returns its move. Several can
+        be driven together to score their leaves in one call (agent_server.py).
+        """
+        try:
+            states = next(steps)
+            while True:
+                states = steps.send(evaluate_leaves(self.leaf_evaluator, states))
+        except StopIteration as stop:
+            return stop.value
+
+    def search_steps(self, root_state, player):
+        """
+        The search as a generator: with an evaluator, it yields lists of
+        leaf states and is sent their scores for player 1; it returns the move
+        """
         self.root_player = player
-        root = MCTSNode(copy.deepcopy(root_state), player)
+        root = self.reused_root(root_state, player) if self.reuse_tree else None
+        self.reused_visits = root.visits if root else 0
+        if root is None:
+            root = MCTSNode(copy.deepcopy(root_state), player)
 
         if self.is_terminal(root_state):
             return None
 
-        for _ in range(self.simulations):
+        budget = MoveBudget(self.clock, root_state, player) if self.clock is not None else None
+        self.batch_slots = self.batch_scored = 0
+        count = next_check = 0
+        while budget is not None or count < self.simulations:
+            if budget is not None and count >= next_check:
+                next_check = count + 32
+                if root.children:
+                    # The most visited move so far; changes buy more time
+                    budget.record(max(root.children, key=lambda c: c.visits).move)
+                if budget.done():
+                    break
+            if self.leaf_evaluator is not None:
+                size = self.batch_size if budget is not None else min(self.batch_size, self.simulations - count)
+                count += yield from self.simulate_batch(root, size)
+                continue
             node = self.select(root)
             result = self.simulate(node.state, node.player)
             self.backpropagate(node, result)
+            count += 1
+        self.batch_fill = self.batch_scored / self.batch_slots if self.batch_slots else 0.0
 
         if not root.children:
             moves = root_state['p1_moves'] if player == 1 else root_state['p2_moves']
             return random.choice(moves) if moves else None
 
-        return max(root.children, key=lambda c: c.visits).move
+        self.root_visits = {child.move: child.visits for child in root.children}
+        move = max(root.children, key=lambda c: c.visits).move
+        if self.reuse_tree:
+            self.last_root, self.last_move = root, move
+        return move
+
+    def reused_root(self, state, player):
+        """The node of the last tree matching this position, detached, or None"""
+        if self.last_root is None or self.last_root.player != player:
+            return None
+        for child in self.last_root.children:
+            if child.move != self.last_move:
+                continue
+            for grandchild in child.children:
+                s = grandchild.state
+                if (s['p1_pos'] == state['p1_pos'] and s['p2_pos'] == state['p2_pos']
+                        and 'loser' not in s and (s['board'] == state['board']).all()):
+                    grandchild.parent = None
+                    return grandchild
+        return None
+
+    def ponder(self, state, player, move, stop_event):
+        """Keep simulating under our move until stop_event is set (see pondering.py)"""
+        root = self.last_root
+        if (root is None or self.last_move != move or root.player != player
+                or not (root.state['board'] == state['board']).all()):
+            return  # The move came from the book, tablebase or was forced: no tree
+        child = next((c for c in root.children if c.move == move), None)
+        if child is None or self.is_terminal(child.state) is not None:
+            return
+        count = 0
+        while count % 16 or not stop_event.is_set():
+            node = self.select(child)
+            result = self.simulate(node.state, node.player)
+            self.backpropagate(node, result)
+            count += 1
 
 
 
     def get_action(self, state, player):
-        return self.search(state, player)
+        return self.run_steps(self.action_steps(state, player))
+
+    def action_steps(self, state, player):
+        """get_action as a generator, like search_steps"""
+        self.root_visits = {}
+        if self.book:
+            move = OpeningBook.open(self.book).probe(state, player)
+            if move:
+                return move
+        if self.tablebase:
+            move = EndgameTablebase.open(self.tablebase).probe(state, player)
+            if move:
+                return move
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if self.clock is not None and len(moves) == 1:
+            return moves[0]  # Forced: save the time for moves that matter
+        return (yield from self.search_steps(state, player))
 
 
     # ------------------------
@@ -80,8 +263,25 @@ class MCTSAgent:
             if terminal_value is not None:
                 return node
 
-            # If node has moves to expand, expand one
-            if not node.is_fully_expanded():
+            if self.puct:
+                # Every legal move competes by PUCT, unexpanded ones on their
+                # prior; a chosen one becomes a child only then
+                if node.priors is None:
+                    self.set_priors(node)
+                untried = node.untried_actions
+                allowed = self.children_allowed(node) - len(node.children)
+                if allowed < len(untried):
+                    untried = untried[len(untried) - max(int(allowed), 0):]
+                if not node.children and not untried:
+                    return node  # No moves: treat as terminal
+                child, move = node.best_move_puct(self.c_puct, self.root_player, untried)
+                if child is None:
+                    return self.expand(node, move)
+                node = child
+                continue
+
+            # If node has moves to expand (and room for another child), expand one
+            if not node.is_fully_expanded() and len(node.children) < self.children_allowed(node):
                 return self.expand(node)
 
             # Node fully expanded: go to best child if it exists
@@ -93,8 +293,33 @@ class MCTSAgent:
 
 
 
-    def expand(self, node):
-        move = node.untried_actions.pop()
+    def children_allowed(self, node):
+        """Progressive widening: how many children the node may have so far"""
+        if not self.widening:
+            return math.inf
+        return 1 + int(self.widening * math.sqrt(node.visits))
+
+    def move_priors(self, node):
+        """Prior of each of the node's moves, from the policy or uniform"""
+        moves = node.get_moves()
+        priors = self.move_policy.priors(node.state, node.player) if self.move_policy else {}
+        if not priors:
+            return {move: 1 / len(moves) for move in moves}
+        return {move: priors.get(move, 0.0) for move in moves}
+
+    def set_priors(self, node):
+        node.priors = self.move_priors(node)
+        # pop() takes from the end, so the most likely move is expanded first
+        node.untried_actions.sort(key=node.priors.get)
+
+    def expand(self, node, move=None):
+        """Add the child for move (by default the next untried one) and return it"""
+        if node.priors is None and (self.move_policy is not None or self.puct):
+            self.set_priors(node)
+        if move is None:
+            move = node.untried_actions.pop()
+        else:
+            node.untried_actions.remove(move)
         next_state = copy.deepcopy(node.state)
         self.apply_move(next_state, move, node.player)
 
@@ -113,6 +338,13 @@ class MCTSAgent:
     # ------------------------
 
     def simulate(self, state, player, max_depth=200):
+        if self.leaf_evaluator is not None:
+            terminal_value = self.is_terminal(state)
+            if terminal_value is not None:
+                return terminal_value
+            value = self.leaf_evaluator.evaluate(state['board'], state['p1_pos'], state['p2_pos'])
+            return value if self.root_player == 1 else -value
+
         current_state = copy.deepcopy(state)
         current_player = player
         depth = 0
@@ -135,6 +367,51 @@ class MCTSAgent:
 
         return 0  # Timeout = draw
 
+    def simulate_batch(self, root, size):
+        """
+        Make up to size simulations: select leaves, back up the terminal ones
+        at once and yield the rest to be scored together. Returns the number
+        of simulations made.
+        """
+        leaves = []
+        terminal = 0
+        for _ in range(size):
+            node = self.select(root)
+            result = self.is_terminal(node.state)
+            if result is not None:
+                self.backpropagate(node, result)
+                terminal += 1
+            elif node in leaves:
+                break  # The virtual losses were not enough to find another leaf
+            else:
+                self.add_virtual_loss(node, 1)
+                leaves.append(node)
+        for node in leaves:
+            self.add_virtual_loss(node, -1)
+
+        if leaves:
+            values = yield [node.state for node in leaves]
+            for node, value in zip(leaves, values):
+                self.backpropagate(node, float(value) if self.root_player == 1 else -float(value))
+        self.batch_slots += size
+        self.batch_scored += len(leaves)
+        return terminal + len(leaves)
+
+    def add_virtual_loss(self, node, amount):
+        """
+        Count amount visits, each lost by the player choosing the move, on
+        the path from the root to node (a negative amount takes them back)
+        """
+        while node.parent is not None:
+            node.visits += amount
+            # Values are for the root player; PUCT reads them for the mover
+            if self.puct and node.parent.player != self.root_player:
+                node.value += amount
+            else:
+                node.value -= amount
+            node = node.parent
+        node.visits += amount
+
 
     # ------------------------
     # Backpropagation
@@ -210,15 +487,19 @@ if __name__ == "__main__":
     mcts = MCTSAgent(simulations=500)
     greedy = GreedyAgent()
     results = {'mcts': 0, 'greedy': 0, 'draw': 0}
+    # e.g. (10.0, 0.1): 10s per player per game plus 0.1s per move, spent by MCTS
+    # where it matters instead of 500 simulations on every move
+    time_control = None
 
     for game_num in range(5):
         game = TronGame(width=10, height=10)
         state = game.reset()
+        clock = GameClock(*time_control) if time_control else None
         moves = 0
         
         while not game.game_over and moves < 100:
-            a1 = mcts.get_action(state, 1)
-            a2 = greedy.get_action(state, 2)
+            a1 = clock.move(mcts, state, 1) if clock else mcts.get_action(state, 1)
+            a2 = clock.move(greedy, state, 2) if clock else greedy.get_action(state, 2)
             state, reward, done = game.step(a1, a2)
             moves += 1
         
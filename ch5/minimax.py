@@ -1,37 +1,138 @@
 # minimax.py - Add to this file
 # Import base game and agents from previous exercises
-from tron_base import TronGame, flood_fill
+from tron_base import TronGame
 from greedy import GreedyAgent
+from regions import RegionTracker
+from maps import map_graph
+from eval_cache import EvalCache, ZobristHasher
+from symmetry import SymmetricHasher
+from opening_book import OpeningBook
+from tablebase import EndgameTablebase
+from game_clock import GameClock, MoveBudget
+from learned_eval import open_evaluator
+from transposition import TranspositionTable, position_key, EXACT, LOWER, UPPER
 from copy import deepcopy
 
+# Scores are floats (advanced_evaluate uses halves), so a "null" window is this wide
+NULL_WINDOW = 1e-6
+MOVE_TABLE_MAX = 1 << 18  # Best-move entries kept between moves without a TT
+
+class SearchAborted(Exception):
+    """Raised inside a search when its stop event is set"""
+
 # Minimax agent implementation
 class MinimaxAgent:
     """Agent using minimax with alpha-beta pruning"""
     
-    def __init__(self, depth=5):
+    def __init__(self, depth=5, track_regions=False, cache_size=0, use_pvs=False,
+                 iterative=False, aspiration=4, tt_size=0, canonical_cache=False, book=None,
+                 tablebase=None, opponent_model=None, model_confidence=0.9, evaluator=None):
         self.depth = depth
         self.nodes_evaluated = 0
+        # use_pvs switches get_action to principal variation search with an
+        # aspiration window of +/- aspiration around the previous score; with
+        # iterative it deepens 2 plies at a time up to depth (same parity, so
+        # each iteration's score is a fair guess for the next) when no earlier
+        # search has stored a best move for the position
+        self.use_pvs = use_pvs
+        self.iterative = iterative
+        self.aspiration = aspiration
+        self.move_table = {}
+        self.last_score = None
+        # PVS can keep bounds and best moves in a transposition table; a
+        # parallel search swaps in a shared one (see parallel_search.py)
+        self.tt_size = tt_size
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.stop_event = None
+        # Set by GameClock.move during a timed move: the search then deepens
+        # toward depth only while the move's time budget lasts
+        self.clock = None
+        self.depth_reached = 0
+        # Best moves found by ponder() for the positions our last move can
+        # lead to, keyed by position_id: (depth searched, move)
+        self.pondered = {}
+        self.ponder_hits = 0
+        # Path of an opening book (see opening_book.py) to play from before searching
+        self.book = book
+        # Path of an endgame tablebase (see tablebase.py); positions it covers
+        # are played from the table instead of searched
+        self.tablebase = tablebase
+        # With opponent_model (an agent such as GreedyAgent, or anything with
+        # get_action), the opponent's plies search only the move it predicts,
+        # so the search goes deeper for the same nodes. A model with
+        # policy(state, player) -> {move: probability} is trusted only when its
+        # top move has at least model_confidence; other plies search every reply
+        self.opponent_model = opponent_model
+        self.model_confidence = model_confidence
+        self.root_player = None
+        # With track_regions, space is read from a RegionTracker that the search
+        # updates move by move instead of flood filling the board at every leaf
+        self.track_regions = track_regions
+        self.regions = None
+        # With cache_size, leaf scores are memoized by position hash; the cache
+        # lives on the agent so later moves of the game reuse it
+        self.cache_size = cache_size
+        self.cache = EvalCache(cache_size) if cache_size else None
+        self.hasher = None
+        # With canonical_cache, symmetric positions (reflections, rotations and
+        # player swaps) share one cache entry
+        self.canonical_cache = canonical_cache
+        self.sym_hasher = None
+        # With evaluator (an object with evaluate(board, p1_pos, p2_pos),
+        # 'chambers' for the chamber-tree fill of chambers.py, or the path
+        # of a LearnedEvaluator, see learned_eval.py), leaves are
+        # scored by it instead of evaluate_state. Learned values lie in
+        # (-1, 1), so with use_pvs pass an aspiration to match (e.g. 0.1)
+        self.evaluator = evaluator
+        self.leaf_evaluator = open_evaluator(evaluator) if evaluator is not None else None
     
     def evaluate_state(self, board, p1_pos, p2_pos):
         """Heuristic: difference in reachable space"""
-        p1_space = flood_fill(board, p1_pos, 1)
-        p2_space = flood_fill(board, p2_pos, 2)
+        if self.regions is not None:
+            return self.regions.space_from(p1_pos) - self.regions.space_from(p2_pos)
+        graph = map_graph(board)  # The map's adjacency, built once per map
+        p1_space = graph.flood_fill(board, p1_pos, 1)
+        p2_space = graph.flood_fill(board, p2_pos, 2)
         return p1_space - p2_space
     
+    def evaluate_leaf(self, board, p1_pos, p2_pos):
+        """The agent's evaluator if it has one, else evaluate_state"""
+        if self.leaf_evaluator is not None:
+            return self.leaf_evaluator.evaluate(board, p1_pos, p2_pos)
+        return self.evaluate_state(board, p1_pos, p2_pos)
+    
+    def evaluate_cached(self, state):
+        """evaluate_leaf, memoized when the agent has a cache"""
+        if self.cache is None or 'hash' not in state:
+            return self.evaluate_leaf(state['board'], state['p1_pos'], state['p2_pos'])
+        sign = 1
+        if 'sym' in state:
+            # Stored from the canonical image's point of view; a player swap negates it
+            key, swapped = self.sym_hasher.canonical(state['sym'], state['p1_pos'], state['p2_pos'])
+            sign = -1 if swapped else 1
+        else:
+            key = (state['hash'], state['p1_pos'], state['p2_pos'])
+        value = self.cache.get(key)
+        if value is None:
+            value = sign * self.evaluate_leaf(state['board'], state['p1_pos'], state['p2_pos'])
+            self.cache.put(key, value)
+        return sign * value
+    
     def minimax(self, state, depth, alpha, beta, maximizing_player):
         """Minimax with alpha-beta pruning"""
         self.nodes_evaluated += 1
         
         # Terminal conditions
         if depth == 0 or not state['p1_moves'] or not state['p2_moves']:
-            return self.evaluate_state(state['board'], state['p1_pos'], state['p2_pos'])
+            return self.evaluate_cached(state)
         
         if maximizing_player:
             max_eval = float('-inf')
-            for action in state['p1_moves']:
+            for action in self.search_moves(state, 1):
                 # Simulate move
                 new_state = self.simulate_move(state, action, None, 1)
                 eval_score = self.minimax(new_state, depth - 1, alpha, beta, False)
+                self.undo_move()
                 max_eval = max(max_eval, eval_score)
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
@@ -39,9 +140,10 @@ class MinimaxAgent:
             return max_eval
         else:
             min_eval = float('inf')
-            for action in state['p2_moves']:
+            for action in self.search_moves(state, 2):
                 new_state = self.simulate_move(state, None, action, 2)
                 eval_score = self.minimax(new_state, depth - 1, alpha, beta, True)
+                self.undo_move()
                 min_eval = min(min_eval, eval_score)
                 beta = min(beta, eval_score)
                 if beta <= alpha:
@@ -51,6 +153,10 @@ class MinimaxAgent:
     def simulate_move(self, state, p1_action, p2_action, player):
         """Create new state after hypothetical move"""
         new_state = deepcopy(state)
+        if self.opponent_model is not None:
+            new_state.pop('reply', None)
+            if player == self.root_player:
+                new_state['predicted'] = self.predicted_reply(state)
         directions = {'UP': (-1, 0), 'DOWN': (1, 0), 
                      'LEFT': (0, -1), 'RIGHT': (0, 1)}
         
@@ -59,6 +165,12 @@ class MinimaxAgent:
             new_pos = (state['p1_pos'][0] + dy, state['p1_pos'][1] + dx)
             new_state['board'][new_pos] = 1
             new_state['p1_pos'] = new_pos
+            if self.regions is not None:
+                self.regions.occupy(new_pos)
+            if 'hash' in new_state:
+                new_state['hash'] ^= self.hasher.cell_key(new_pos, 1)
+            if 'sym' in new_state:
+                new_state['sym'] = self.sym_hasher.update(new_state['sym'], new_pos, 1)
             new_state['p1_moves'] = self.get_valid_moves_from_board(new_state['board'], new_pos)
         
         if player == 2 and p2_action:
@@ -66,10 +178,48 @@ class MinimaxAgent:
             new_pos = (state['p2_pos'][0] + dy, state['p2_pos'][1] + dx)
             new_state['board'][new_pos] = 2
             new_state['p2_pos'] = new_pos
+            if self.regions is not None:
+                self.regions.occupy(new_pos)
+            if 'hash' in new_state:
+                new_state['hash'] ^= self.hasher.cell_key(new_pos, 2)
+            if 'sym' in new_state:
+                new_state['sym'] = self.sym_hasher.update(new_state['sym'], new_pos, 2)
             new_state['p2_moves'] = self.get_valid_moves_from_board(new_state['board'], new_pos)
         
         return new_state
     
+    def predicted_reply(self, state):
+        """Opponent model's move in a position where we are to move, or None if it is unsure"""
+        # The real game is simultaneous, so the opponent decides on the board
+        # before our move; one prediction serves all of our moves from here
+        if 'reply' in state:
+            return state['reply']
+        opponent = 3 - self.root_player
+        policy = getattr(self.opponent_model, 'policy', None)
+        if policy is None:
+            reply = self.opponent_model.get_action(state, opponent)
+        else:
+            probabilities = policy(state, opponent)
+            reply = max(probabilities, key=probabilities.get) if probabilities else None
+            if reply is not None and probabilities[reply] < self.model_confidence:
+                reply = None
+        state['reply'] = reply
+        return reply
+    
+    def search_moves(self, state, player):
+        """Moves to search for player: just the predicted one on confident opponent plies"""
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if self.opponent_model is not None and player != self.root_player:
+            predicted = state.get('predicted')
+            if predicted in moves:
+                return [predicted]
+        return moves
+    
+    def undo_move(self):
+        """Roll back the region update made by the matching simulate_move"""
+        if self.regions is not None:
+            self.regions.undo()
+    
     def get_valid_moves_from_board(self, board, pos):
         """Helper to get valid moves from board state"""
         moves = []
@@ -91,6 +241,51 @@ class MinimaxAgent:
         if not moves:
             return None
         
+        self.root_player = player
+        if self.opponent_model is not None:
+            state = dict(state)  # Predictions are memoized in the state dict
+        
+        if self.book:
+            move = OpeningBook.open(self.book).probe(state, player)
+            if move:
+                return move
+        
+        if self.tablebase:
+            move = EndgameTablebase.open(self.tablebase).probe(state, player)
+            if move:
+                return move
+        
+        if self.clock is not None and len(moves) == 1:
+            return moves[0]  # Forced: save the time for moves that matter
+        
+        if self.pondered:
+            found = self.pondered.pop(self.position_id(state, player), None)
+            if found is not None and found[0] >= self.depth:
+                self.ponder_hits += 1
+                return found[1]  # Already searched to full depth on the opponent's time
+        
+        if self.track_regions:
+            # Reuse last move's tracker: only the cells filled since then are applied
+            if self.regions is None or self.regions.size != state['board'].size:
+                self.regions = RegionTracker(state['board'])
+            else:
+                self.regions.sync(state['board'])
+        
+        if self.cache is not None or self.use_pvs or self.clock is not None:
+            height, width = state['board'].shape
+            if self.hasher is None or (self.hasher.height, self.hasher.width) != (height, width):
+                self.hasher = ZobristHasher(height, width)
+            state = dict(state, hash=self.hasher.hash_board(state['board']))
+            if self.cache is not None and self.canonical_cache:
+                if self.sym_hasher is None or (self.sym_hasher.height, self.sym_hasher.width) != (height, width):
+                    self.sym_hasher = SymmetricHasher(height, width)
+                state['sym'] = self.sym_hasher.hash_all(state['board'])
+        
+        if self.clock is not None:
+            return self.timed_search(state, player)
+        if self.use_pvs:
+            return self.pvs_search(state, player)
+        
         best_action = moves[0]
         best_value = float('-inf') if player == 1 else float('inf')
         
@@ -99,6 +294,7 @@ class MinimaxAgent:
                                           action if player == 2 else None, player)
             value = self.minimax(new_state, self.depth - 1, float('-inf'), float('inf'), 
                                player == 2)
+            self.undo_move()
             
             if player == 1 and value > best_value:
                 best_value = value
@@ -109,9 +305,252 @@ class MinimaxAgent:
         
         return best_action
 
+    # ------------------------
+    # Pondering (see pondering.py)
+    # ------------------------
+    
+    def position_id(self, state, player):
+        return (state['board'].tobytes(), state['p1_pos'], state['p2_pos'], player)
+    
+    def next_position(self, state, player, move, reply):
+        """State after our move and the opponent's reply as TronGame.step plays them, or None if either crashes"""
+        directions = {'UP': (-1, 0), 'DOWN': (1, 0), 
+                     'LEFT': (0, -1), 'RIGHT': (0, 1)}
+        board = state['board'].copy()
+        height, width = board.shape
+        actions = {player: move, 3 - player: reply}
+        heads = {}
+        for p, pos in ((1, state['p1_pos']), (2, state['p2_pos'])):
+            dy, dx = directions[actions[p]]
+            heads[p] = (pos[0] + dy, pos[1] + dx)
+            if not (0 <= heads[p][0] < height and 0 <= heads[p][1] < width and board[heads[p]] == 0):
+                return None
+        board[heads[1]] = 1
+        board[heads[2]] = 2
+        return {'board': board, 'p1_pos': heads[1], 'p2_pos': heads[2],
+                'p1_moves': self.get_valid_moves_from_board(board, heads[1]),
+                'p2_moves': self.get_valid_moves_from_board(board, heads[2])}
+    
+    def ponder(self, state, player, move, stop_event):
+        """
+        Search every position our move can lead to (one per opponent reply,
+        the predicted one first) a ply deeper each round until stop_event is
+        set. Results land in the transposition table and self.pondered.
+        """
+        replies = list(state['p2_moves'] if player == 1 else state['p1_moves'])
+        if self.opponent_model is not None:
+            self.root_player = player
+            predicted = self.predicted_reply(dict(state))
+            if predicted in replies:
+                replies.remove(predicted)
+                replies.insert(0, predicted)
+        positions = [p for p in (self.next_position(state, player, move, r) for r in replies) if p]
+        
+        saved = (self.depth, self.stop_event, self.last_score)
+        self.stop_event = stop_event
+        self.pondered = {}
+        try:
+            for depth in range(1, saved[0] + 1):
+                for next_state in positions:
+                    if stop_event.is_set():
+                        return
+                    self.depth = depth
+                    found = self.get_action(next_state, player)
+                    if found is not None:
+                        self.pondered[self.position_id(next_state, player)] = (depth, found)
+        except SearchAborted:
+            self.regions = None  # Its undo history is mid-search; rebuild next move
+        finally:
+            self.depth, self.stop_event, self.last_score = saved
+    
+    # ------------------------
+    # Principal variation search (negamax form)
+    # ------------------------
+    
+    def pvs_search(self, state, player):
+        """PVS to self.depth, windowed around the previous score; returns best move"""
+        best_action = self.first_root_move(state, player)
+        
+        # Our last move was searched to the same depth one turn earlier, so its
+        # score is the first guess; a stale guess only costs a re-search
+        score = None
+        if self.last_score is not None and self.last_score[0] == player:
+            score = self.last_score[1]
+        
+        if self.iterative and self.table_move(state, player) is None:
+            depths = range(2 - self.depth % 2, self.depth + 1, 2)
+        else:
+            # The tables hold an earlier search of this position (usually the
+            # last move's, two plies deeper in its tree), which orders moves
+            # better than shallow iterations would; measured, they only added nodes
+            depths = [self.depth]
+        
+        for depth in depths:
+            score, best_action = self.aspiration_root(state, player, depth, score, best_action)
+        
+        self.last_score = (player, score)
+        return best_action
+    
+    def timed_search(self, state, player):
+        """Iterative deepening PVS until this move's share of the clock is used"""
+        best_action = self.first_root_move(state, player)
+        budget = MoveBudget(self.clock, state, player)
+        scores = {}
+        outer_stop = self.stop_event
+        self.stop_event = budget  # Aborts the search at the hard limit
+        try:
+            # One ply at a time for finer control; odd and even depths score
+            # differently, so each window is centred on the score two plies back
+            max_depth = min(self.depth, int((state['board'] == 0).sum()) + 1)
+            for depth in range(1, max_depth + 1):
+                if depth > 1 and not budget.can_deepen():
+                    break
+                scores[depth], best_action = self.aspiration_root(
+                    state, player, depth, scores.get(depth - 2), best_action)
+                budget.record(best_action)
+        except SearchAborted:
+            self.regions = None  # Its undo history is mid-search; rebuild next move
+        finally:
+            self.stop_event = outer_stop
+        
+        self.depth_reached = max(scores, default=0)
+        if scores:
+            self.last_score = (player, scores[self.depth_reached])
+        return best_action
+    
+    def first_root_move(self, state, player):
+        """
+        Root move to search first: the best move stored for this position,
+        which the previous move's search usually reached, else the first legal
+        one. The move table is kept from move to move (cleared when full),
+        like the TT, so its entries keep ordering the next searches.
+        """
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if len(self.move_table) >= MOVE_TABLE_MAX:
+            self.move_table = {}
+        move = self.table_move(state, player)
+        return move if move in moves else moves[0]
+    
+    def table_move(self, state, player):
+        """Best move stored for a search state (TT or move table), or None"""
+        if self.tt is not None:
+            entry = self.tt.probe(position_key(state, player))
+            return entry[3] if entry is not None else None
+        return self.move_table.get((state['hash'], state['p1_pos'], state['p2_pos'], player))
+    
+    def aspiration_root(self, state, player, depth, guess, first_action):
+        """pvs_root in a window around guess (full window if None), widened on failure"""
+        if guess is None:
+            alpha, beta = float('-inf'), float('inf')
+        else:
+            alpha, beta = guess - self.aspiration, guess + self.aspiration
+        
+        while True:
+            score, action = self.pvs_root(state, player, depth, alpha, beta, first_action)
+            if score <= alpha:
+                alpha = float('-inf')  # Failed low: re-search with the window opened below
+            elif score >= beta:
+                beta = float('inf')  # Failed high: open it above
+            else:
+                return score, action
+    
+    def pvs_root(self, state, player, depth, alpha, beta, first_action):
+        """Search every root move, previous best first, passing alpha between them"""
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        ordered = [first_action] + [m for m in moves if m != first_action]
+        best_score = float('-inf')
+        best_action = first_action
+        
+        for i, action in enumerate(ordered):
+            score = self.pvs_child(state, action, player, depth, alpha, beta, i == 0)
+            if score > best_score:
+                best_score, best_action = score, action
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        
+        return best_score, best_action
+    
+    def pvs_child(self, state, action, player, depth, alpha, beta, full_window):
+        """Score one move for the side to move: null window first unless full_window"""
+        child = self.simulate_move(state, action if player == 1 else None,
+                                   action if player == 2 else None, player)
+        if full_window:
+            score = -self.pvs(child, depth - 1, -beta, -alpha, 3 - player)
+        else:
+            score = -self.pvs(child, depth - 1, -alpha - NULL_WINDOW, -alpha, 3 - player)
+            if alpha < score < beta:
+                # It beat the first move after all; find its exact score
+                score = -self.pvs(child, depth - 1, -beta, -score, 3 - player)
+        self.undo_move()
+        return score
+    
+    def pvs(self, state, depth, alpha, beta, player):
+        """Fail-soft PVS; scores are from the point of view of player (to move)"""
+        self.nodes_evaluated += 1
+        if (self.stop_event is not None and self.nodes_evaluated % 64 == 0
+                and self.stop_event.is_set()):
+            raise SearchAborted()
+        
+        if depth == 0 or not state['p1_moves'] or not state['p2_moves']:
+            value = self.evaluate_cached(state)
+            return value if player == 1 else -value
+        
+        moves = self.search_moves(state, player)
+        if self.tt is not None:
+            key = position_key(state, player)
+            entry = self.tt.probe(key)
+            table_move = None
+            if entry is not None:
+                entry_depth, flag, entry_score, table_move = entry
+                if entry_depth >= depth:
+                    if flag == EXACT:
+                        return entry_score
+                    if flag == LOWER and entry_score >= beta:
+                        return entry_score
+                    if flag == UPPER and entry_score <= alpha:
+                        return entry_score
+        else:
+            key = (state['hash'], state['p1_pos'], state['p2_pos'], player)
+            table_move = self.move_table.get(key)
+        if table_move in moves:
+            moves = [table_move] + [m for m in moves if m != table_move]
+        
+        alpha_start = alpha
+        best_score = float('-inf')
+        best_action = None
+        for i, action in enumerate(moves):
+            score = self.pvs_child(state, action, player, depth, alpha, beta, i == 0)
+            if score > best_score:
+                best_score, best_action = score, action
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        
+        # Remember the best (or refuting) move to try first when this node is
+        # searched again. When every move failed low their scores are only
+        # bounds, so the move already stored (if any) is the better guess
+        if best_score <= alpha_start and table_move in moves:
+            best_action = table_move
+        if self.tt is not None:
+            if best_score <= alpha_start:
+                flag = UPPER
+            elif best_score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, flag, best_score, best_action)
+        else:
+            self.move_table[key] = best_action
+        return best_score
+
 # Tournament and visualization functions
-def run_minimax_tournament(num_games=5, depth=5):
-    """Run tournament between minimax and greedy agents"""
+def run_minimax_tournament(num_games=5, depth=5, time_control=None):
+    """
+    Run tournament between minimax and greedy agents.
+    With time_control=(total, increment), games are played on a GameClock
+    and minimax searches as deep as its budget allows instead of to depth.
+    """
     print("\n=== MINIMAX (depth={}) vs GREEDY ({} games) ===\n".format(depth, num_games))
     
     minimax = MinimaxAgent(depth=depth)
@@ -121,11 +560,12 @@ def run_minimax_tournament(num_games=5, depth=5):
     for game_num in range(num_games):
         game = TronGame(width=10, height=10)  # Smaller for speed
         state = game.reset()
+        clock = GameClock(*time_control) if time_control else None
         moves = 0
         
         while not game.game_over and moves < 100:
-            a1 = minimax.get_action(state, 1)
-            a2 = greedy.get_action(state, 2)
+            a1 = clock.move(minimax, state, 1) if clock else minimax.get_action(state, 1)
+            a2 = clock.move(greedy, state, 2) if clock else greedy.get_action(state, 2)
             state, reward, done = game.step(a1, a2)
             moves += 1
         
@@ -240,7 +680,5 @@ def run_comparison(num_games=20, board_size=12, depths=[2, 3, 4, 5]):
 
 if __name__ == "__main__":
     results = run_comparison(num_games=20, board_size=12, depths=[2, 3, 4, 5])
-
-if __name__ == "__main__":
     run_minimax_tournament(5, depth=5)
     visualize_minimax_game(depth=5)
\ No newline at end of file
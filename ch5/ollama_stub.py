@@ -0,0 +1,91 @@
+# ollama_stub.py - Local Ollama-compatible stand-in server for testing OllamaAgent
+# Run it with: python ollama_stub.py 11435
+# then point an agent at it: OllamaAgent(url="http://127.0.0.1:11435/api/generate")
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate by 'thinking' for a while, then naming a legal move"""
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        self.server.requests_served += 1
+
+        words = self.build_reply(request.get('prompt', ''))
+        if request.get('stream', True):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for word in words:
+                    time.sleep(self.server.token_delay)
+                    self.write_chunk({'model': request.get('model'), 'response': word, 'done': False})
+                self.write_chunk({'model': request.get('model'), 'response': '', 'done': True})
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                # Client stopped reading once it found its move
+                self.close_connection = True
+        else:
+            time.sleep(self.server.token_delay * len(words))
+            body = json.dumps({'model': request.get('model'), 'response': ''.join(words),
+                               'done': True}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def build_reply(self, prompt):
+        """Some filler tokens followed by a move from the prompt's move list"""
+        match = re.search(r'Your available moves: (.*)', prompt)
+        moves = [m.strip() for m in match.group(1).split(',')] if match else []
+        move = random.choice(moves) if moves else 'UP'
+        filler = ['Let', ' me', ' think', ' about', ' the', ' open', ' space', '.']
+        tail = [' That', ' keeps', ' the', ' most', ' room', ' free', '.'] * self.server.tail_tokens
+        return filler[:self.server.think_tokens] + [' I', ' choose', ' ' + move, '.'] + tail
+
+    def write_chunk(self, obj):
+        data = (json.dumps(obj) + '\n').encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+
+def start_stub_server(port=0, token_delay=0.01, think_tokens=8, tail_tokens=5):
+    """Start the stand-in server on a background thread. Returns (server, url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    server.token_delay = token_delay
+    server.think_tokens = think_tokens
+    server.tail_tokens = tail_tokens
+    server.requests_served = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+    return server, url
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 11435
+    server, url = start_stub_server(port)
+    print(f"Ollama stand-in listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,16 +1,218 @@
 # ollamatron.py - Add to this file
 from tron_base import TronGame, flood_fill
 from greedy import GreedyAgent
-import requests
+import asyncio
 import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+DEFAULT_URL = "http://ollama.cs.wallawalla.edu:11434/api/generate"
+MOVE_PATTERN = re.compile(r'\b(UP|DOWN|LEFT|RIGHT)\b')
+
+def extract_move(text, moves, final=True):
+    """
+    Return the first legal move named in the text, or None.
+    While streaming (final=False) a word touching the end of the text may
+    still be growing ("UP" -> "UPPER"), so it is not trusted yet.
+    """
+    for match in MOVE_PATTERN.finditer(text.upper()):
+        if not final and match.end() == len(text):
+            break
+        if match.group(1) in moves:
+            return match.group(1)
+    return None
+
+class CancelEvent(threading.Event):
+    """
+    Event that abandons a streamed request when set. set() also shuts down
+    the connection the request is reading from, so a read blocked waiting
+    for the next line ends at once instead of holding a thread until the
+    model sends one.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.response = None
+    
+    def set(self):
+        super().set()
+        response = self.response
+        # urllib3 keeps the live connection on the raw response while it streams
+        connection = getattr(getattr(response, 'raw', None), '_connection', None)
+        sock = getattr(connection, 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # Already closed
+
+
+class OllamaClient:
+    """
+    Pooled keep-alive HTTP client for the Ollama generate API.
+    One client can be shared by many agents and games, including from
+    several threads at once (each request takes its own pooled connection).
+    """
+    
+    def __init__(self, url=DEFAULT_URL, pool_size=32, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        # requests is only imported once a client is made, so importing this
+        # module (e.g. for OllamaAgent's helpers) stays cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests_sent = 0
+        self.early_stops = 0
+    
+    def generate(self, model, prompt, temperature=0.3, moves=None, cancel=None):
+        """
+        Stream a completion. If moves is given, stop reading as soon as a
+        legal move appears and return it; otherwise return the full text.
+        Setting the cancel event (a CancelEvent, or any threading.Event to
+        only check between lines) abandons the request and returns None.
+        """
+        self.requests_sent += 1
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {"temperature": temperature}
+        }
+        text = ""
+        with self.session.post(self.url, json=payload, stream=True,
+                               timeout=self.timeout) as response:
+            response.raise_for_status()
+            if isinstance(cancel, CancelEvent):
+                cancel.response = response
+            if cancel is not None and cancel.is_set():
+                return None
+            try:
+                for line in response.iter_lines():
+                    if cancel is not None and cancel.is_set():
+                        return None
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    text += chunk.get('response', '')
+                    if chunk.get('done'):
+                        break
+                    if moves and extract_move(text, moves, final=False):
+                        # Closing the response mid-stream drops the rest of the generation
+                        self.early_stops += 1
+                        return extract_move(text, moves, final=False)
+            except Exception:
+                if cancel is not None and cancel.is_set():
+                    return None  # The read was cut short by the cancel
+                raise
+        
+        return extract_move(text, moves) if moves else text
+    
+    def close(self):
+        self.session.close()
+
+class ResponseCache:
+    """
+    LRU cache of LLM answers keyed by (model, prompt, temperature).
+    With a path, entries are loaded from and saved to a JSON file so
+    repeated games and replays skip the network entirely.
+    """
+    
+    def __init__(self, max_size=10000, path=None, save_every=50):
+        self.max_size = max_size
+        self.path = path
+        self.save_every = save_every
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.unsaved = 0
+        self.lock = threading.Lock()  # Shared by agents playing concurrent games
+        self.save_lock = threading.Lock()  # One writer at a time; held apart so get/put never wait on disk
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for model, prompt, temperature, answer in json.load(f):
+                    self.entries[(model, prompt, temperature)] = answer
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def get(self, model, prompt, temperature):
+        key = (model, prompt, temperature)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, model, prompt, temperature, answer):
+        with self.lock:
+            self.entries[(model, prompt, temperature)] = answer
+            self.entries.move_to_end((model, prompt, temperature))
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)  # Evict least recently used
+            self.unsaved += 1
+            should_save = self.path and self.unsaved >= self.save_every
+        if should_save:
+            self.save()
+    
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def save(self):
+        """Write entries to disk (oldest first so LRU order survives a reload)"""
+        if not self.path:
+            return
+        with self.save_lock:
+            with self.lock:
+                rows = [list(key) + [answer] for key, answer in self.entries.items()]
+                self.unsaved = 0
+            # A temp file of our own in the same directory, so os.replace stays
+            # atomic and other processes saving the same cache cannot clash
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                            suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(rows, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
 
 # LLM Agent implementation
 class OllamaAgent:
     """Agent using LLM reasoning via Ollama"""
     
-    def __init__(self, model="deepseek-r1:1.5b"):
+    def __init__(self, model="deepseek-r1:1.5b", url=DEFAULT_URL, client=None,
+                 cache=None, temperature=0.3, deadline=10.0, fallback=None, max_workers=8):
         self.model = model
-        self.url = "http://ollama.cs.wallawalla.edu:11434/api/generate"
+        self.url = url
+        self.temperature = temperature
+        # Pass the same client to several agents to share its connection pool;
+        # close() only closes a client the agent made itself
+        self.owns_client = client is None
+        self.client = client if client is not None else OllamaClient(url)
+        self.cache = cache
+        # Hard per-move time limit in seconds; the fallback (greedy unless another
+        # agent such as a shallow MinimaxAgent is given) runs alongside the request
+        self.deadline = deadline
+        self.fallback = fallback
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # The fallback gets its own thread, so it never queues behind LLM requests
+        # that timed out but are still waiting on the server
+        self.fallback_executor = ThreadPoolExecutor(max_workers=1)
+        self.fallback_future = None
+        self.path_counts = {'cache': 0, 'llm': 0, 'fallback': 0, 'first_move': 0}
     
     def state_to_text(self, state, player):
         """Convert game state to text description"""
@@ -44,35 +246,110 @@ class OllamaAgent:
         if not my_moves:
             return None
         
+        start = time.time()
         prompt = self.state_to_text(state, player)
+        cached = self.cached_move(prompt, my_moves)
+        if cached:
+            return cached
         
-        try:
-            response = requests.post(
-                self.url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": 0.3
-                },
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                text = result.get('response', '').upper()
-                
-                # Extract first valid move from response
-                for move in ['UP', 'DOWN', 'LEFT', 'RIGHT']:
-                    if move in text and move in my_moves:
-                        return move
-            
-            # Fallback to greedy if LLM fails
-            return self.greedy_fallback(state, player)
+        # Start the LLM request and the fallback together, then take whichever
+        # valid answer is ready when the deadline hits (the LLM's if both are)
+        llm_future, fallback_future, cancel = self.start_move(state, player, prompt, my_moves)
+        wait([llm_future], timeout=self.time_left(start))
+        cancel.set()
+        if not self.has_answer(llm_future, my_moves):
+            # The LLM failed or ran out of time; give the fallback what time is left
+            wait([fallback_future], timeout=self.time_left(start))
+        return self.pick_move(llm_future, fallback_future, my_moves)
+    
+    async def get_action_async(self, state, player):
+        """Same as get_action, but awaits the request so other games can run meanwhile"""
+        my_moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if not my_moves:
+            return None
+        
+        start = time.time()
+        prompt = self.state_to_text(state, player)
+        cached = self.cached_move(prompt, my_moves)
+        if cached:
+            return cached
         
+        llm_future, fallback_future, cancel = self.start_move(state, player, prompt, my_moves)
+        await asyncio.wait([asyncio.wrap_future(llm_future)], timeout=self.time_left(start))
+        cancel.set()
+        if not self.has_answer(llm_future, my_moves):
+            await asyncio.wait([asyncio.wrap_future(fallback_future)], timeout=self.time_left(start))
+        return self.pick_move(llm_future, fallback_future, my_moves)
+    
+    def cached_move(self, prompt, my_moves):
+        if self.cache is None:
+            return None
+        move = self.cache.get(self.model, prompt, self.temperature)
+        if move in my_moves:
+            self.path_counts['cache'] += 1
+            return move
+        return None
+    
+    def start_move(self, state, player, prompt, my_moves):
+        """Submit the LLM request and the fallback search; returns both futures and a cancel event"""
+        cancel = CancelEvent()
+        llm_future = self.executor.submit(self.query_llm, prompt, my_moves, cancel)
+        if self.fallback_future is not None and not self.fallback_future.done():
+            # The fallback agent is still searching a move that ran out of time;
+            # rather than start a second search on it, answer greedily right away
+            fallback_future = Future()
+            fallback_future.set_result(self.greedy_fallback(state, player))
+        else:
+            fallback_future = self.fallback_executor.submit(self.fallback_action, state, player)
+            self.fallback_future = fallback_future
+        return llm_future, fallback_future, cancel
+    
+    def has_answer(self, future, my_moves):
+        return future.done() and future.exception() is None and future.result() in my_moves
+    
+    def pick_move(self, llm_future, fallback_future, my_moves):
+        """Prefer the LLM's move, then the fallback's, then any legal move"""
+        if self.has_answer(llm_future, my_moves):
+            self.path_counts['llm'] += 1
+            return llm_future.result()
+        if self.has_answer(fallback_future, my_moves):
+            self.path_counts['fallback'] += 1
+            return fallback_future.result()
+        self.path_counts['first_move'] += 1
+        return my_moves[0]
+    
+    def time_left(self, start):
+        """Seconds until the move deadline (None means wait indefinitely)"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - (time.time() - start), 0)
+    
+    def query_llm(self, prompt, my_moves, cancel):
+        """Ask the model for a move; returns None on any failure"""
+        try:
+            move = self.client.generate(self.model, prompt, temperature=self.temperature,
+                                        moves=my_moves, cancel=cancel)
         except Exception as e:
             print(f"  [LLM Error: {e}]")
-            return self.greedy_fallback(state, player)
+            return None
+        if move and self.cache is not None:
+            try:
+                self.cache.put(self.model, prompt, self.temperature, move)
+            except OSError as e:
+                print(f"  [Cache save failed: {e}]")  # The answer is still good
+        return move
+    
+    def close(self):
+        """Stop the agent's threads, dropping queued work, and close its own client"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.fallback_executor.shutdown(wait=False, cancel_futures=True)
+        if self.owns_client:
+            self.client.close()
+    
+    def fallback_action(self, state, player):
+        if self.fallback is not None:
+            return self.fallback.get_action(state, player)
+        return self.greedy_fallback(state, player)
     
     def greedy_fallback(self, state, player):
         """Fallback greedy action"""
@@ -92,41 +369,75 @@ class OllamaAgent:
         return best_action
 
 # Tournament and visualization functions
-def run_ollama_tournament(num_games=3, model="llama3.2"):
-    """Run tournament between LLM and greedy agents"""
+def run_ollama_tournament(num_games=3, model="llama3.2", url=DEFAULT_URL, cache_path=None,
+                          concurrency=1):
+    """
+    Run tournament between LLM and greedy agents.
+    With concurrency > 1 the games run at the same time on the asyncio
+    scheduler, sharing one HTTP client and response cache.
+    """
     print("\n=== OLLAMA-LLM vs GREEDY ({} games) ===\n".format(num_games))
     print("(Note: This may take 30-60 seconds due to LLM inference time)\n")
         
-    ollama = OllamaAgent(model=model)
+    cache = ResponseCache(path=cache_path)
+    ollama = OllamaAgent(model=model, url=url, cache=cache)
     greedy = GreedyAgent()
     results = {'ollama': 0, 'greedy': 0, 'draw': 0}
     
-    for game_num in range(num_games):
-        game = TronGame(width=10, height=10)
-        state = game.reset()
-        moves = 0
+    if concurrency > 1:
+        from async_scheduler import run_concurrent_games
+        # Games in flight each hold an agent (own thread pool, shared client);
+        # a finished game hands its agent on, so at most `concurrency` are made
+        llm_agents, idle = [], []
         
-        print(f"Game {game_num + 1} starting...")
-        while not game.game_over and moves < 50:
-            a1 = ollama.get_action(state, 1)
-            a2 = greedy.get_action(state, 2)
-            state, reward, done = game.step(a1, a2)
-            moves += 1
+        def make_agents(game_num):
+            if not idle:
+                llm_agents.append(OllamaAgent(model=model, url=url, client=ollama.client, cache=cache))
+                idle.append(llm_agents[-1])
+            return idle.pop(), greedy
         
-        winner_name = "LLM" if game.winner == 1 else ("Greedy" if game.winner == 2 else "Draw")
-        if game.winner == 1:
+        games = run_concurrent_games(make_agents, num_games, board_size=10, max_moves=50,
+                                     concurrency=concurrency,
+                                     finish_game=lambda llm_agent, _: idle.append(llm_agent))
+        for llm_agent in llm_agents:
+            for path, count in llm_agent.path_counts.items():
+                ollama.path_counts[path] += count
+            llm_agent.close()
+    else:
+        games = []
+        for game_num in range(num_games):
+            game = TronGame(width=10, height=10)
+            state = game.reset()
+            moves = 0
+            
+            print(f"Game {game_num + 1} starting...")
+            while not game.game_over and moves < 50:
+                a1 = ollama.get_action(state, 1)
+                a2 = greedy.get_action(state, 2)
+                state, reward, done = game.step(a1, a2)
+                moves += 1
+            games.append({'winner': game.winner, 'moves': moves})
+    
+    for game_num, result in enumerate(games):
+        winner_name = "LLM" if result['winner'] == 1 else ("Greedy" if result['winner'] == 2 else "Draw")
+        if result['winner'] == 1:
             results['ollama'] += 1
-        elif game.winner == 2:
+        elif result['winner'] == 2:
             results['greedy'] += 1
         else:
             results['draw'] += 1
         
-        print(f"  Winner = {winner_name}, Moves = {moves}\n")
+        print(f"Game {game_num + 1}: Winner = {winner_name}, Moves = {result['moves']}")
     
-    print(f"Results: LLM={results['ollama']}, Greedy={results['greedy']}, Draws={results['draw']}")
+    print(f"\nResults: LLM={results['ollama']}, Greedy={results['greedy']}, Draws={results['draw']}")
+    print(f"Requests: {ollama.client.requests_sent}, stopped early: {ollama.client.early_stops}")
+    print(f"Cache: {cache.hits} hits, {cache.misses} misses ({cache.hit_rate() * 100:.1f}% hit rate)")
+    print(f"Move sources: {ollama.path_counts}")
+    cache.save()
+    ollama.close()
     return results
 
-def visualize_ollama_game(model="llama3.2"):
+def visualize_ollama_game(model="llama3.2", url=DEFAULT_URL):
     """Run one visualized game between LLM and greedy (optional)"""
     print("\n" + "="*60)
     print("Watch LLM vs Greedy with visualization (optional)")
@@ -134,7 +445,7 @@ def visualize_ollama_game(model="llama3.2"):
     
     # from tron_agents import GreedyAgent, OllamaAgent
     
-    ollama = OllamaAgent(model=model)
+    ollama = OllamaAgent(model=model, url=url)
     greedy = GreedyAgent()
     game_viz = TronGame(width=10, height=10, visualize=True, cell_size=50)
     state = game_viz.reset()
@@ -149,6 +460,7 @@ def visualize_ollama_game(model="llama3.2"):
     winner = "LLM" if game_viz.winner == 1 else ("Greedy" if game_viz.winner == 2 else "Draw")
     print(f"Visualized game: {winner} wins!")
     game_viz.close()
+    ollama.close()
 
 # Test code when run directly
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+# opening_book.py - Precomputed opening moves for the standard start position
+#
+# TronGame.reset always starts the players at (1, 1) and (h-2, w-2), so the
+# first few turns on a given board size are the same every game. This tool
+# searches every position reachable in the first few turns once, deeply,
+# and stores the best move for each side in a sorted array that agents can
+# memory-map and probe in O(log n).
+#
+# Build:  python opening_book.py 10 3 9    (board size, turns, search depth)
+# Use:    MinimaxAgent(depth=5, book='book_10x10.npy'), same for MCTSAgent
+import os
+import sys
+import time
+import numpy as np
+from tron_base import TronGame
+from symmetry import BoardSymmetry
+
+MOVES = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+BOOK_DTYPE = np.dtype([('key', '<u8'), ('move', 'u1'), ('depth', 'u1'), ('score', '<f4')])
+MASK64 = (1 << 64) - 1
+
+
+def book_path(width, height, directory='.'):
+    return os.path.join(directory, f"book_{height}x{width}.npy")
+
+
+class OpeningBook:
+    """Read-only view of a book file (memory-mapped, so loading is instant)"""
+
+    loaded = {}  # path -> OpeningBook, shared by every agent in the process
+
+    def __init__(self, path):
+        self.path = path
+        entries = np.load(path, mmap_mode='r')
+        # Trailer row (sorts last): the most occupied cells of any book position.
+        # Books written before it was added have none and are probed every move
+        self.max_occupied = None
+        if len(entries) and int(entries[-1]['key']) == MASK64:
+            self.max_occupied = int(entries[-1]['score'])
+            entries = entries[:-1]
+        self.entries = entries
+        self.keys = self.entries['key']
+        self.symmetry = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, path):
+        if path not in cls.loaded:
+            cls.loaded[path] = cls(path)
+        return cls.loaded[path]
+
+    def probe(self, state, player):
+        """Book move for player in this state, or None if the position is not in the book"""
+        board = state['board']
+        if self.max_occupied is not None and np.count_nonzero(board) > self.max_occupied:
+            return None  # Past the book's last turn: skip canonicalizing
+        if self.symmetry is None or (self.symmetry.height, self.symmetry.width) != board.shape:
+            self.symmetry = BoardSymmetry(*board.shape)
+        key, canon = self.symmetry.canonical_key(board, state['p1_pos'], state['p2_pos'], player)
+        index = int(np.searchsorted(self.keys, key))
+        if index == len(self.keys) or int(self.keys[index]) != key:
+            self.misses += 1
+            return None
+        move = self.symmetry.inverse_move(MOVES[self.entries[index]['move']], canon['op'])
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if move not in moves:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return move
+
+
+def opening_positions(width, height, turns):
+    """States reachable from reset in up to `turns` simultaneous moves, one per symmetry class"""
+    symmetry = BoardSymmetry(height, width)
+    game = TronGame(width=width, height=height)
+    frontier = [game.reset()]
+    seen = set()
+    positions = []
+    for turn in range(turns + 1):
+        next_frontier = []
+        for state in frontier:
+            # A position and its player-swapped twin share a class, with sides exchanged
+            key = min(symmetry.canonical_key(state['board'], state['p1_pos'], state['p2_pos'], side)[0]
+                      for side in (1, 2))
+            if key in seen:
+                continue
+            seen.add(key)
+            positions.append(state)
+            if turn == turns:
+                continue
+            for m1 in state['p1_moves']:
+                for m2 in state['p2_moves']:
+                    game.board = state['board'].copy()
+                    game.p1_pos, game.p2_pos = state['p1_pos'], state['p2_pos']
+                    game.game_over = False
+                    next_state, reward, done = game.step(m1, m2)
+                    if not done and next_state['p1_pos'] != next_state['p2_pos']:
+                        next_frontier.append(next_state)
+        frontier = next_frontier
+    return positions
+
+
+def build_book(width=10, height=10, turns=3, depth=9, path=None, agent=None):
+    """Search every opening position for both sides and write the book file"""
+    from advanced_heuristic import AdvancedMinimaxAgent
+    if agent is None:
+        agent = AdvancedMinimaxAgent(depth=depth, use_pvs=True, iterative=True, tt_size=1 << 18)
+    path = path or book_path(width, height)
+    symmetry = BoardSymmetry(height, width)
+    positions = opening_positions(width, height, turns)
+    print(f"Building {path}: {len(positions)} positions, depth {agent.depth}")
+
+    rows = {}
+    start = time.time()
+    for i, state in enumerate(positions):
+        for player in (1, 2):
+            key, canon = symmetry.canonical_key(state['board'], state['p1_pos'], state['p2_pos'], player)
+            if key in rows:
+                continue  # A symmetric twin was already searched
+            move = agent.get_action(state, player)
+            if move is None:
+                continue
+            score = agent.last_score[1] if agent.last_score else 0.0
+            canonical_move = symmetry.transform_move(move, canon['op'])
+            rows[key] = (key, MOVES.index(canonical_move), agent.depth, score)
+        if (i + 1) % 50 == 0:
+            print(f"  {i + 1}/{len(positions)} positions ({time.time() - start:.1f}s)")
+
+    rows = sorted(rows.values())
+    # Trailer row (sorts last): lets probe give up on later positions without canonicalizing
+    max_occupied = max(int(np.count_nonzero(state['board'])) for state in positions)
+    rows.append((MASK64, 0, 0, max_occupied))
+    np.save(path, np.array(rows, dtype=BOOK_DTYPE))
+    print(f"Wrote {len(rows) - 1} entries to {path} ({time.time() - start:.1f}s)")
+    return path
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 9
+    build_book(size, size, turns, depth)
@@ -0,0 +1,150 @@
+# parallel_search.py - Lazy SMP: several processes search the same root
+#
+# Every worker runs an iterative-deepening PVS of the current position with
+# its own copy of the agent, all sharing one transposition table in shared
+# memory. Workers start at staggered depths and rotate their root move order,
+# so they fill the table with different parts of the tree and each one's
+# deeper iterations find the others' results already there. The main
+# process keeps the deepest completed iteration reported by any worker.
+import multiprocessing
+import time
+from multiprocessing.connection import wait
+from minimax import MinimaxAgent, SearchAborted
+from transposition import SharedTranspositionTable
+
+
+def worker_main(conn, agent_class, agent_kwargs, tt, stop_event, worker_id):
+    """Worker process: search each position it is sent until told to stop"""
+    agent = agent_class(**agent_kwargs)
+    agent.use_pvs = True
+    agent.iterative = False  # The loop below does the deepening
+    agent.tt = tt
+    agent.stop_event = stop_event
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        job, state, player, max_depth = message
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        # Rotate root moves so workers start down different branches
+        shift = worker_id % len(moves)
+        state = dict(state)
+        if player == 1:
+            state['p1_moves'] = moves[shift:] + moves[:shift]
+        else:
+            state['p2_moves'] = moves[shift:] + moves[:shift]
+
+        for depth in range(1 + worker_id % 2, max_depth + 1):
+            agent.depth = depth
+            try:
+                move = agent.get_action(state, player)
+            except SearchAborted:
+                agent.regions = None  # Its undo history is mid-search; rebuild next time
+                break
+            conn.send((job, depth, move, agent.nodes_evaluated))
+            if stop_event.is_set():
+                break
+        conn.send((job, None, None, 0))
+
+
+class LazySMPAgent:
+    """
+    Parallel minimax: workers processes search each position for time_limit
+    seconds (or until all reach max_depth) and the deepest result wins.
+    agent_class is MinimaxAgent or AdvancedMinimaxAgent; agent_kwargs go to it.
+    Call close() when done to stop the workers and free the shared table.
+    """
+
+    def __init__(self, agent_class=MinimaxAgent, workers=4, time_limit=1.0, max_depth=30,
+                 tt_entries=1 << 20, **agent_kwargs):
+        self.agent_class = agent_class
+        self.workers = workers
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.tt_entries = tt_entries
+        self.agent_kwargs = agent_kwargs
+        self.nodes_evaluated = 0
+        self.depth_reached = 0
+        self.job = 0
+        self.processes = []
+
+    def start(self):
+        self.tt = SharedTranspositionTable(self.tt_entries)
+        self.stop_event = multiprocessing.Event()
+        self.conns = []
+        for worker_id in range(self.workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=worker_main,
+                args=(child_conn, self.agent_class, self.agent_kwargs, self.tt,
+                      self.stop_event, worker_id),
+                daemon=True)
+            process.start()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+
+    def get_action(self, state, player):
+        """Search with all workers and return the deepest completed result"""
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        if not moves:
+            return None
+        if not self.processes:
+            self.start()
+
+        self.job += 1
+        self.stop_event.clear()
+        for conn in self.conns:
+            conn.send((self.job, state, player, self.max_depth))
+
+        best_depth, best_move = 0, moves[0]
+        self.nodes_evaluated = 0
+        deadline = time.time() + self.time_limit
+        running = set(self.conns)
+        while running:
+            remaining = deadline - time.time()
+            if remaining <= 0 and not self.stop_event.is_set():
+                self.stop_event.set()
+            # After the stop signal, keep reading until every worker reports done
+            for conn in wait(list(running), timeout=None if self.stop_event.is_set() else remaining):
+                job, depth, move, nodes = conn.recv()
+                if job != self.job:
+                    continue
+                if depth is None:
+                    running.discard(conn)
+                    continue
+                self.nodes_evaluated += nodes
+                if depth > best_depth:
+                    best_depth, best_move = depth, move
+
+        self.depth_reached = best_depth
+        return best_move
+
+    def close(self):
+        if not self.processes:
+            return
+        for conn in self.conns:
+            conn.send(None)
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes = []
+        self.tt.close()
+
+
+if __name__ == "__main__":
+    from tron_base import TronGame
+    from greedy import GreedyAgent
+
+    print("\n=== Depth reached in 0.5s per move: 1 vs 4 workers (12x12) ===\n")
+    for workers in (1, 4):
+        agent = LazySMPAgent(MinimaxAgent, workers=workers, time_limit=0.5)
+        greedy = GreedyAgent()
+        game = TronGame(width=12, height=12)
+        state = game.reset()
+        depths = []
+        while not game.game_over and len(depths) < 10:
+            a1 = agent.get_action(state, 1)
+            depths.append(agent.depth_reached)
+            state, reward, done = game.step(a1, greedy.get_action(state, 2))
+        agent.close()
+        print(f"Workers={workers}: depths {depths}, avg {sum(depths) / len(depths):.1f}")
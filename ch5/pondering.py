@@ -0,0 +1,120 @@
+# pondering.py - Search on the opponent's time
+#
+# TronGame moves are simultaneous, but the runners ask for them one after
+# the other, so each agent sits idle while the other one thinks.
+# PonderingAgent runs an agent in a background process (or thread) that,
+# once it has answered, keeps searching until the next request arrives:
+#   - MCTSAgent keeps growing the subtree under the move it played and
+#     reuses the node for the position actually reached as its next root
+#   - MinimaxAgent (and AdvancedMinimaxAgent) searches the position each
+#     opponent reply leads to into its transposition table, and answers at
+#     once if the real position was already searched to full depth
+# A process gets its own core; a thread shares the interpreter lock with
+# whatever the main process runs, so it only helps while that is waiting
+# (an LLM agent on the network, a remote opponent).
+import multiprocessing
+import threading
+from minimax import MinimaxAgent
+from mcts import MCTSAgent
+from transposition import TranspositionTable
+
+
+class RequestPending:
+    """Stop event for ponder(): set as soon as the next request is waiting"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def is_set(self):
+        return self.conn.poll()
+
+
+def ponder_main(conn, agent_class, agent_kwargs):
+    """Answer each request, then ponder until the next one"""
+    agent = agent_class(**agent_kwargs)
+    # Pondering reaches the next move through the TT or the tree
+    if isinstance(agent, MinimaxAgent):
+        agent.use_pvs = True
+        if agent.tt is None:
+            agent.tt = TranspositionTable(1 << 20)
+    elif isinstance(agent, MCTSAgent):
+        agent.reuse_tree = True
+    stop_event = RequestPending(conn)
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        state, player, clock = message
+        agent.clock = clock
+        move = agent.get_action(state, player)
+        agent.clock = None
+        stats = {name: getattr(agent, name) for name in PonderingAgent.STATS if hasattr(agent, name)}
+        conn.send((move, stats))
+        if move is not None:
+            agent.ponder(state, player, move, stop_event)
+
+
+class PonderingAgent:
+    """
+    Runs agent_class(**agent_kwargs) in the background so it can think on
+    the opponent's time. Works with GameClock like the agent it wraps.
+    Call close() when done to stop the background worker.
+    """
+
+    STATS = ('nodes_evaluated', 'depth_reached', 'ponder_hits', 'reused_visits')
+
+    def __init__(self, agent_class=MCTSAgent, use_thread=False, **agent_kwargs):
+        self.agent_class = agent_class
+        self.use_thread = use_thread
+        self.agent_kwargs = agent_kwargs
+        self.clock = None
+        self.stats = {}
+        self.worker = None
+
+    def start(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        if self.use_thread:
+            self.worker = threading.Thread(
+                target=ponder_main, args=(child_conn, self.agent_class, self.agent_kwargs),
+                daemon=True)
+        else:
+            self.worker = multiprocessing.Process(
+                target=ponder_main, args=(child_conn, self.agent_class, self.agent_kwargs),
+                daemon=True)
+        self.worker.start()
+
+    def get_action(self, state, player):
+        if self.worker is None:
+            self.start()
+        self.conn.send((state, player, self.clock))
+        move, self.stats = self.conn.recv()
+        return move
+
+    def close(self):
+        if self.worker is None:
+            return
+        self.conn.send(None)
+        self.worker.join(timeout=5)
+        self.worker = None
+
+
+if __name__ == "__main__":
+    from tron_base import TronGame
+
+    print("\n=== MCTS-200 with and without pondering vs Minimax-6 (10x10) ===\n")
+    for ponder in (False, True):
+        agent = PonderingAgent(MCTSAgent, simulations=200) if ponder else MCTSAgent(simulations=200, reuse_tree=True)
+        opponent = MinimaxAgent(depth=6)
+        reused = []
+        for game_num in range(4):
+            game = TronGame(width=10, height=10)
+            state = game.reset()
+            while not game.game_over:
+                a1 = agent.get_action(state, 1)
+                reused.append(agent.stats['reused_visits'] if ponder else agent.reused_visits)
+                a2 = opponent.get_action(state, 2)
+                state, reward, done = game.step(a1, a2)
+        if ponder:
+            agent.close()
+        print(f"Pondering={ponder}: visits already at the root, avg {sum(reused) / len(reused):.0f} per move")
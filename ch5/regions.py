@@ -0,0 +1,248 @@
+# regions.py - Incremental (decremental) connectivity of the free cells
+#
+# Trails only ever fill cells, so regions of free space can only shrink or
+# split. RegionTracker keeps a region id and size for every free cell and
+# updates them when a cell is occupied, touching only what could change:
+#   - a cell whose free neighbours stay connected around it just shrinks its region
+#   - otherwise the pieces are searched in lockstep and only the smaller ones
+#     are relabeled, so each cell is relabeled O(log n) times per game
+# Every occupy() can be rolled back with undo(), which is what search needs.
+
+
+class RegionTracker:
+    """Region ids and sizes of the free (zero) cells of a board"""
+
+    def __init__(self, board):
+        self.height, self.width = board.shape
+        self.size = self.height * self.width
+        self.neighbors = []
+        self.ring = []
+        for y in range(self.height):
+            for x in range(self.width):
+                self.neighbors.append([self.index(y + dy, x + dx)
+                                       for dy, dx in [(-1, 0), (1, 0), (0, -1), (0, 1)]
+                                       if self.inside(y + dy, x + dx)])
+                # The 8 surrounding cells in circular order (None off the board);
+                # consecutive entries are 4-adjacent to each other
+                self.ring.append([self.index(y + dy, x + dx) if self.inside(y + dy, x + dx) else None
+                                  for dy, dx in [(-1, 0), (-1, 1), (0, 1), (1, 1),
+                                                 (1, 0), (1, -1), (0, -1), (-1, -1)]])
+        self.rebuild(board)
+
+    def index(self, y, x):
+        return y * self.width + x
+
+    def inside(self, y, x):
+        return 0 <= y < self.height and 0 <= x < self.width
+
+    def rebuild(self, board):
+        """Label every region from scratch (one pass over the board)"""
+        flat = board.ravel().tolist()
+        self.labels = [-1] * self.size
+        self.sizes = {}
+        self.next_id = 0
+        self.history = []
+        for start in range(self.size):
+            if flat[start] != 0 or self.labels[start] != -1:
+                continue
+            region = self.next_id
+            self.next_id += 1
+            self.labels[start] = region
+            stack = [start]
+            count = 0
+            while stack:
+                cell = stack.pop()
+                count += 1
+                for n in self.neighbors[cell]:
+                    if flat[n] == 0 and self.labels[n] == -1:
+                        self.labels[n] = region
+                        stack.append(n)
+            self.sizes[region] = count
+
+    def copy(self):
+        """Independent tracker for a search copy of the game (history not shared)"""
+        other = RegionTracker.__new__(RegionTracker)
+        other.__dict__.update(self.__dict__)
+        other.labels = self.labels[:]
+        other.sizes = dict(self.sizes)
+        other.history = []
+        return other
+
+    # ------------------------
+    # Queries
+    # ------------------------
+
+    def region_size(self, pos):
+        """Size of the region containing a free cell (0 for an occupied cell)"""
+        region = self.labels[self.index(*pos)]
+        return self.sizes[region] if region >= 0 else 0
+
+    def space_from(self, pos):
+        """Free cells reachable from a head at pos (sum over its neighbouring regions)"""
+        seen = []
+        total = 0
+        for n in self.neighbors[self.index(*pos)]:
+            region = self.labels[n]
+            if region >= 0 and region not in seen:
+                seen.append(region)
+                total += self.sizes[region]
+        return total
+
+    def same_region(self, pos1, pos2):
+        """True if some free neighbour of pos1 shares a region with one of pos2"""
+        regions1 = {self.labels[n] for n in self.neighbors[self.index(*pos1)]} - {-1}
+        regions2 = {self.labels[n] for n in self.neighbors[self.index(*pos2)]} - {-1}
+        return bool(regions1 & regions2)
+
+    # ------------------------
+    # Updates
+    # ------------------------
+
+    def occupy(self, pos):
+        """Mark a free cell as filled, splitting its region if needed"""
+        cell = self.index(*pos)
+        region = self.labels[cell]
+        if region < 0:
+            self.history.append(None)  # Already filled; keep undo() symmetric
+            return
+
+        self.labels[cell] = -1
+        self.sizes[region] -= 1
+        if self.sizes[region] == 0:
+            del self.sizes[region]
+
+        starts = self.local_groups(cell)
+        split = self.split(region, starts) if len(starts) > 1 else []
+        self.history.append((cell, region, split))
+
+    def undo(self):
+        """Roll back the most recent occupy()"""
+        record = self.history.pop()
+        if record is None:
+            return
+        cell, region, split = record
+        for new_region, cells in split:
+            for c in cells:
+                self.labels[c] = region
+            self.sizes[region] = self.sizes.get(region, 0) + len(cells)
+            del self.sizes[new_region]
+        self.labels[cell] = region
+        self.sizes[region] = self.sizes.get(region, 0) + 1
+
+    def sync(self, board):
+        """
+        Catch up with a board that has had cells filled since the last call.
+        Rebuilds instead if any cell was freed (a new game). Returns True on rebuild.
+        """
+        flat = board.ravel().tolist()
+        if len(flat) != self.size:
+            raise ValueError("board shape changed; create a new RegionTracker")
+        labels = self.labels
+        if any(value == 0 and labels[i] < 0 for i, value in enumerate(flat)):
+            self.rebuild(board)
+            return True
+        for i, value in enumerate(flat):
+            if value != 0 and labels[i] >= 0:
+                self.occupy(divmod(i, self.width))
+        self.history = []
+        return False
+
+    def local_groups(self, cell):
+        """
+        One free neighbour per group of neighbours that are connected through
+        the surrounding ring of cells. Neighbours in different groups may or
+        may not still be connected further away.
+        """
+        ring = self.ring[cell]
+        free = [c is not None and self.labels[c] >= 0 for c in ring]
+        if all(free):
+            return [ring[0]]
+
+        # Walk the ring starting just after a blocked cell; each run of free
+        # cells is locally connected, and contributes its first orthogonal cell
+        first_blocked = free.index(False)
+        groups = []
+        run_has_orthogonal = False
+        for k in range(1, 9):
+            i = (first_blocked + k) % 8
+            if not free[i]:
+                run_has_orthogonal = False
+                continue
+            if i % 2 == 0 and not run_has_orthogonal:
+                groups.append(ring[i])
+                run_has_orthogonal = True
+        return groups
+
+    def split(self, region, starts):
+        """
+        Search outward from each start in lockstep. Searches that meet merge;
+        each one that runs out of cells is a separate piece and gets a new id.
+        The last piece still growing keeps the old id, so work is bounded by
+        the size of the smaller pieces.
+        """
+        labels = self.labels
+        owner = {}
+        parent = list(range(len(starts)))
+        frontier = {}
+        cells = {}
+        for k, start in enumerate(starts):
+            owner[start] = k
+            frontier[k] = [start]
+            cells[k] = [start]
+
+        def find(k):
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        pieces = []
+        active = set(range(len(starts)))
+        while len(active) > 1:
+            for k in list(active):
+                if k not in active:
+                    continue
+                queue = frontier[k]
+                if not queue:
+                    active.discard(k)
+                    pieces.append(cells.pop(k))
+                    del frontier[k]
+                    if len(active) == 1:
+                        break
+                    continue
+                cell = queue.pop()
+                for n in self.neighbors[cell]:
+                    if labels[n] != region:
+                        continue
+                    j = owner.get(n)
+                    if j is None:
+                        owner[n] = k
+                        queue.append(n)
+                        cells[k].append(n)
+                        continue
+                    j = find(j)
+                    if j != k:
+                        # Two searches met: they are one piece, keep the bigger one's lists
+                        if len(cells[j]) < len(cells[k]):
+                            j, k = k, j
+                        parent[k] = j
+                        cells[j].extend(cells.pop(k))
+                        frontier[j].extend(frontier.pop(k))
+                        active.discard(k)
+                        queue = frontier[j]
+                        if len(active) == 1:
+                            break
+                        k = j
+                if len(active) == 1:
+                    break
+
+        split = []
+        for piece in pieces:
+            new_region = self.next_id
+            self.next_id += 1
+            for c in piece:
+                labels[c] = new_region
+            self.sizes[new_region] = len(piece)
+            self.sizes[region] -= len(piece)
+            split.append((new_region, piece))
+        return split
@@ -0,0 +1,48 @@
+# registry.py - Agents by name, built on demand
+#
+# A spec names an agent class by module path ('minimax.MinimaxAgent') and
+# gives its constructor arguments. Nothing is imported or constructed until
+# an agent is asked for, so a runner only pays for the agents it plays, and
+# a spec (unlike an agent) is cheap to send to a worker process.
+#
+#   make_agent('Minimax-5')                                  # by name
+#   make_agent(('mcts.MCTSAgent', {'simulations': 50}))      # by spec
+#   register('Minimax-3', 'minimax.MinimaxAgent', depth=3)   # new name
+import importlib
+
+AGENTS = {
+    'Minimax-5': ('minimax.MinimaxAgent', {'depth': 5}),
+    'Minimax-7': ('minimax.MinimaxAgent', {'depth': 7}),
+    'MCTS-500': ('mcts.MCTSAgent', {'simulations': 500}),
+    'MCTS-200': ('mcts.MCTSAgent', {'simulations': 200}),
+    'MCTS-PUCT-100': ('mcts.MCTSAgent', {'simulations': 100, 'puct': True, 'policy': 'greedy'}),
+    'AdvMinimax-5': ('advanced_heuristic.AdvancedMinimaxAgent', {'depth': 5}),
+    'AdvMinimax-7': ('advanced_heuristic.AdvancedMinimaxAgent', {'depth': 7}),
+    'AdvMinimax-Chambers-5': ('advanced_heuristic.AdvancedMinimaxAgent', {'depth': 5, 'evaluator': 'chambers'}),
+    'Greedy': ('greedy.GreedyAgent', {}),
+    'Random': ('tron_base.RandomAgent', {}),
+    'Ollama': ('ollamatron.OllamaAgent', {}),
+}
+
+
+def register(name, class_path, **kwargs):
+    """Add (or replace) a named spec"""
+    AGENTS[name] = (class_path, kwargs)
+
+
+def load_class(class_path):
+    """The class named by 'module.Class', importing its module if needed"""
+    module_name, class_name = class_path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def agent_spec(name_or_spec):
+    """(class, kwargs) for a registered name or a (class path, kwargs) pair"""
+    class_path, kwargs = AGENTS[name_or_spec] if isinstance(name_or_spec, str) else name_or_spec
+    return load_class(class_path), dict(kwargs)
+
+
+def make_agent(name_or_spec):
+    """A new agent from a registered name or a (class path, kwargs) pair"""
+    cls, kwargs = agent_spec(name_or_spec)
+    return cls(**kwargs)
@@ -0,0 +1,179 @@
+# result_cache.py - On-disk cache of tournament game results
+import ast
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sys
+import types
+
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORTS = {}  # (path, mtime) -> local_imports, since parsing a module costs milliseconds
+
+
+def module_path(module_name):
+    """Source file of a module: the loaded one, else a local file of that name"""
+    path = getattr(sys.modules.get(module_name), '__file__', None)
+    if not path:
+        path = os.path.join(LOCAL_DIR, module_name + '.py')
+    return path if os.path.exists(path) else None
+
+
+def source_hash(module_name):
+    """Hash the source file of a module (used as its code version)"""
+    path = module_path(module_name)
+    if path is None:
+        return 'unknown'
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def local_imports(module_name):
+    """Local modules (files in LOCAL_DIR) imported anywhere in a module's source, lazy imports included"""
+    path = module_path(module_name)
+    if path is None:
+        return set()
+    key = (path, os.stat(path).st_mtime_ns)
+    if key in IMPORTS:
+        return IMPORTS[key]
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    IMPORTS[key] = {name for name in names if os.path.exists(os.path.join(LOCAL_DIR, name + '.py'))}
+    return IMPORTS[key]
+
+
+def code_version(module_name):
+    """
+    source_hash of a module and of every local module it imports,
+    transitively: an agent's play depends on its search, evaluators and
+    caches as much as on the file that defines it
+    """
+    # The game rules live in tron_base, so changes there invalidate everything
+    seen = set()
+    stack = [module_name, 'tron_base']
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        stack.extend(local_imports(name) - seen)
+    return [[name, source_hash(name)] for name in sorted(seen)]
+
+
+def config_fingerprint(cls, params):
+    """Hash a class, its constructor parameters (name -> repr) and its code version"""
+    config = {
+        'class': f"{cls.__module__}.{cls.__qualname__}",
+        'params': params,
+        'code': code_version(cls.__module__),
+    }
+    blob = json.dumps(config, sort_keys=True).encode()
+    return hashlib.sha1(blob).hexdigest()
+
+
+def param_repr(value):
+    """
+    repr of a constructor parameter that is the same in every run. Plain
+    values keep their repr; classes and functions become their qualified
+    names, bound methods and partials are spelled out from their parts,
+    and objects whose repr is the default (which shows a memory address),
+    such as an opponent model or an evaluator instance, become their class
+    plus agent_fingerprint.
+    """
+    if isinstance(value, dict):
+        return '{' + ', '.join(f"{param_repr(k)}: {param_repr(v)}" for k, v in value.items()) + '}'
+    if isinstance(value, list):
+        return '[' + ', '.join(param_repr(v) for v in value) + ']'
+    if isinstance(value, tuple):
+        return '(' + ', '.join(param_repr(v) for v in value) + (',)' if len(value) == 1 else ')')
+    if isinstance(value, types.MethodType):
+        return f"{param_repr(value.__self__)}.{value.__func__.__name__}"
+    if isinstance(value, functools.partial):
+        return (f"functools.partial({param_repr(value.func)}, {param_repr(value.args)}, "
+                f"{param_repr(value.keywords)})")
+    if isinstance(value, types.BuiltinMethodType) and not isinstance(value.__self__, types.ModuleType):
+        return f"{param_repr(value.__self__)}.{value.__name__}"
+    if isinstance(value, (type, types.FunctionType, types.BuiltinFunctionType)):
+        return f"{value.__module__}.{value.__qualname__}"
+    if type(value).__repr__ is object.__repr__:
+        cls = type(value)
+        return f"{cls.__module__}.{cls.__qualname__}:{agent_fingerprint(value)}"
+    return repr(value)
+
+
+def agent_fingerprint(agent):
+    """
+    Hash an agent's configuration: class, constructor parameters and code version.
+    Constructor parameters are read back from attributes of the same name,
+    so counters like nodes_evaluated do not change the fingerprint.
+    """
+    cls = type(agent)
+    params = {}
+    signature = inspect.signature(cls.__init__)
+    for name in signature.parameters:
+        if name == 'self' or not hasattr(agent, name):
+            continue
+        params[name] = param_repr(getattr(agent, name))
+    return config_fingerprint(cls, params)
+
+
+def spec_fingerprint(cls, kwargs):
+    """
+    agent_fingerprint of cls(**kwargs) without building the agent: defaults
+    fill in the unspecified parameters. Matches agent_fingerprint for agents
+    that keep every constructor parameter as an attribute of the same name.
+    """
+    bound = inspect.signature(cls).bind(**kwargs)
+    bound.apply_defaults()
+    params = {name: param_repr(value) for name, value in bound.arguments.items()}
+    return config_fingerprint(cls, params)
+
+
+class ResultCache:
+    """JSON file mapping game keys to recorded results"""
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                self.results = json.load(f)
+
+    def game_key(self, fingerprint1, fingerprint2, board_size, seed, game_num, max_moves,
+                 time_control=None):
+        """Key for one game of a pairing (player order matters)"""
+        parts = [fingerprint1, fingerprint2, str(board_size), str(seed),
+                 str(game_num), str(max_moves)]
+        if time_control:
+            parts.append(str(tuple(time_control)))  # Untimed keys stay as they were
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def get(self, key):
+        """Return the stored result dict, or None if the game was never played"""
+        record = self.results.get(key)
+        if record is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return record
+
+    def put(self, key, record):
+        """Store a result and write the cache to disk"""
+        self.results[key] = record
+        self.save()
+
+    def save(self):
+        """Write atomically so an interrupted run never corrupts the cache"""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.results, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,222 @@
+# selfplay.py - Training records from self-play
+#
+# Plays games between registered agents (see registry.py) across a process
+# pool and writes one record per move to compressed .npz shards:
+#   board   int8 (n, h, w)    board before the move (0 empty, 1/2 trails)
+#   heads   int16 (n, 2, 2)   p1_pos, p2_pos (int8 would wrap on boards over 128)
+#   side    int8 (n,)         player who moved
+#   move    int8 (n,)         index into MOVES
+#   visits  float32 (n, 4)    search distribution over MOVES: MCTS root
+#                             visits, or the move played (one-hot) for
+#                             agents that do not report visits
+#   result  int8 (n,)         final result for side: 1 win, 0 draw, -1 loss
+# Each worker plays a whole shard and writes it itself, so no game data
+# passes through the main process, which only keeps manifest.json (the
+# run's settings and finished shards). Running again on the same directory
+# plays only the shards the manifest does not list yet, so an interrupted
+# run resumes and a finished one can be extended with more games.
+#
+# Run:   python selfplay.py selfplay_data 200 MCTS-200 Greedy
+# Read:  for batch in iter_batches('selfplay_data', 256): ...
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from tron_base import TronGame
+from registry import make_agent
+
+MOVES = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+MANIFEST = 'manifest.json'
+
+
+def visit_distribution(agent, move):
+    """The agent's search distribution over MOVES for the move it just made"""
+    visits = np.zeros(len(MOVES), dtype=np.float32)
+    root_visits = getattr(agent, 'root_visits', None)
+    if root_visits:
+        for m, n in root_visits.items():
+            visits[MOVES.index(m)] = n
+        return visits / visits.sum()
+    visits[MOVES.index(move)] = 1.0
+    return visits
+
+
+def play_game(agent1, agent2, board_size, max_moves):
+    """(records dict of lists, winner) for one game"""
+    game = TronGame(width=board_size, height=board_size)
+    state = game.reset()
+    records = {'board': [], 'heads': [], 'side': [], 'move': [], 'visits': []}
+    moves = 0
+    while not game.game_over and moves < max_moves:
+        actions = []
+        for side, agent in ((1, agent1), (2, agent2)):
+            move = agent.get_action(state, side)
+            actions.append(move)
+            if move is None:
+                continue  # A crash teaches nothing about which move to play
+            records['board'].append(state['board'].astype(np.int8))
+            records['heads'].append((state['p1_pos'], state['p2_pos']))
+            records['side'].append(side)
+            records['move'].append(MOVES.index(move))
+            records['visits'].append(visit_distribution(agent, move))
+        state, reward, done = game.step(*actions)
+        moves += 1
+    return records, game.winner or 0  # Unfinished games count as draws
+
+
+def write_shard(path, arrays):
+    """np.savez_compressed, atomically (a killed worker leaves no half shard)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def play_shard(directory, shard, specs, board_size, max_moves, games, seed):
+    """Worker: play one shard's games, write its file and return its manifest entry"""
+    agents = [make_agent(spec) for spec in specs]
+    columns = {'board': [], 'heads': [], 'side': [], 'move': [], 'visits': [], 'result': []}
+    wins = [0, 0]
+    for game_num in range(games):
+        random.seed(seed + shard * games + game_num)
+        # The agents swap seats every game
+        first = game_num % 2
+        records, winner = play_game(agents[first], agents[1 - first], board_size, max_moves)
+        for name, values in records.items():
+            columns[name].extend(values)
+        columns['result'].extend(0 if winner == 0 else (1 if side == winner else -1)
+                                 for side in records['side'])
+        if winner:
+            wins[first if winner == 1 else 1 - first] += 1
+
+    arrays = {
+        'board': np.array(columns['board'], dtype=np.int8).reshape(-1, board_size, board_size),
+        'heads': np.array(columns['heads'], dtype=np.int16).reshape(-1, 2, 2),
+        'side': np.array(columns['side'], dtype=np.int8),
+        'move': np.array(columns['move'], dtype=np.int8),
+        'visits': np.array(columns['visits'], dtype=np.float32).reshape(-1, len(MOVES)),
+        'result': np.array(columns['result'], dtype=np.int8),
+    }
+    name = f"shard_{shard:05d}.npz"
+    write_shard(os.path.join(directory, name), arrays)
+    return name, {'games': games, 'records': len(arrays['side']), 'wins': wins}
+
+
+def load_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(directory, manifest):
+    """Write atomically, like ResultCache.save"""
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def generate_selfplay(directory, num_games, agents=('MCTS-200', 'MCTS-200'), board_size=12,
+                      max_moves=200, games_per_shard=20, workers=None, seed=0):
+    """
+    Play num_games games (rounded up to whole shards) between two registered
+    agents (names or specs, see registry.py) and write them to directory.
+    Shards already in the directory's manifest are kept. Resuming with other
+    settings raises ValueError, since the shards would not be comparable.
+    Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    config = {'agents': [list(a) if not isinstance(a, str) else a for a in agents],
+              'board_size': board_size, 'max_moves': max_moves,
+              'games_per_shard': games_per_shard, 'seed': seed}
+    manifest = load_manifest(directory) or {'config': config, 'shards': {}}
+    if manifest['config'] != config:
+        raise ValueError(f"{directory} holds self-play from other settings: {manifest['config']}")
+
+    num_shards = -(-num_games // games_per_shard)
+    done = manifest['shards']
+    pending = [s for s in range(num_shards) if f"shard_{s:05d}.npz" not in done]
+    print(f"Self-play {agents[0]} vs {agents[1]}: {len(done)} shards done, {len(pending)} to play")
+
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_shard, directory, shard, agents, board_size,
+                                   max_moves, games_per_shard, seed)
+                   for shard in pending]
+        for future in as_completed(futures):
+            name, entry = future.result()
+            done[name] = entry
+            save_manifest(directory, manifest)  # Progress survives an interrupted run
+            print(f"  {name}: {entry['records']} records, wins {entry['wins']} "
+                  f"({len(done)}/{num_shards}, {time.time() - start:.1f}s)")
+    if not pending:
+        save_manifest(directory, manifest)
+    return manifest
+
+
+def shard_paths(directory):
+    """Paths of the finished shards, in order"""
+    manifest = load_manifest(directory)
+    if manifest is None:
+        return []
+    return [os.path.join(directory, name) for name in sorted(manifest['shards'])]
+
+
+def iter_records(directory, shuffle=False, seed=0):
+    """
+    Every record as a dict of arrays, one shard in memory at a time.
+    With shuffle, shard order and the records within each shard are shuffled.
+    """
+    rng = np.random.default_rng(seed)
+    paths = shard_paths(directory)
+    if shuffle:
+        rng.shuffle(paths)
+    for path in paths:
+        with np.load(path) as shard:
+            arrays = {name: shard[name] for name in shard.files}
+        order = rng.permutation(len(arrays['side'])) if shuffle else range(len(arrays['side']))
+        for i in order:
+            yield {name: values[i] for name, values in arrays.items()}
+
+
+def iter_batches(directory, batch_size=256, shuffle=False, seed=0):
+    """
+    Records in batches: dicts of arrays with batch_size rows (the last may
+    be shorter). Batches run across shard boundaries; at most one shard
+    and one batch are held in memory.
+    """
+    rng = np.random.default_rng(seed)
+    paths = shard_paths(directory)
+    if shuffle:
+        rng.shuffle(paths)
+    carry = None
+    for path in paths:
+        with np.load(path) as shard:
+            arrays = {name: shard[name] for name in shard.files}
+        if shuffle:
+            order = rng.permutation(len(arrays['side']))
+            arrays = {name: values[order] for name, values in arrays.items()}
+        if carry is not None:
+            arrays = {name: np.concatenate([carry[name], values]) for name, values in arrays.items()}
+        count = len(arrays['side'])
+        full = count - count % batch_size
+        for start in range(0, full, batch_size):
+            yield {name: values[start:start + batch_size] for name, values in arrays.items()}
+        carry = {name: values[full:] for name, values in arrays.items()}
+    if carry is not None and len(carry['side']):
+        yield carry
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'selfplay_data'
+    num_games = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    agent1 = sys.argv[3] if len(sys.argv) > 3 else 'MCTS-200'
+    agent2 = sys.argv[4] if len(sys.argv) > 4 else agent1
+    manifest = generate_selfplay(directory, num_games, (agent1, agent2))
+    records = sum(entry['records'] for entry in manifest['shards'].values())
+    print(f"{len(manifest['shards'])} shards, {records} records in {directory}")
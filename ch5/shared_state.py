@@ -0,0 +1,219 @@
+# shared_state.py - Game states passed to other processes through shared memory
+#
+# Sending a get_state() dict to a worker pickles its board and move lists on
+# every move and unpickles them on the other side. A SharedState is instead
+# one multiprocessing.shared_memory block that both sides map:
+#   header  int64 [HEADER_FIELDS]   sequence number, move counter, player to
+#                                   move, head positions, the worker's reply
+#   board   int64 (height, width)   the board, as TronGame keeps it
+# publish() writes a state into the block (the board with one copy, the rest
+# as a few ints) and wakes the worker; wait_state() gives the worker a state
+# dict whose board is a view of the block, so nothing is copied on its side.
+# The sides take turns (publish, reply, publish...), so the block never
+# changes while the worker is reading it. The notifications are two
+# semaphores, one in each direction. The worker's reply carries the
+# sequence number of the state it read, so a reply that arrives after
+# wait_reply gave up is never taken for the answer to a later state.
+#
+# ProcessAgent runs any registered agent (see registry.py) in its own
+# process this way:
+#   agent = ProcessAgent('Minimax-5')
+#   agent.get_action(state, 1)
+#   agent.close()
+import multiprocessing
+from multiprocessing import shared_memory
+import time
+import numpy as np
+from tron_base import valid_moves
+
+HEADER_FIELDS = ['seq', 'move_count', 'player', 'p1_y', 'p1_x', 'p2_y', 'p2_x', 'reply_seq', 'reply']
+SEQ, MOVE_COUNT, PLAYER, P1_Y, P1_X, P2_Y, P2_X, REPLY_SEQ, REPLY = range(len(HEADER_FIELDS))
+MOVES = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+NO_MOVE, FAILED, STOP = -1, -2, -3
+
+
+class SharedState:
+    """
+    A state slot in shared memory for boards of one shape, with its two
+    notifications. Pass it to the worker process as an argument: pickling
+    sends only the block's name and the semaphores.
+    """
+
+    def __init__(self, height, width, name=None, ready=None, done=None):
+        self.height = height
+        self.width = width
+        nbytes = (len(HEADER_FIELDS) + height * width) * 8
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.ready = multiprocessing.Semaphore(0)
+            self.done = multiprocessing.Semaphore(0)
+        else:
+            try:
+                # Python 3.13+: attaching must not register the block for cleanup
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+            self.ready, self.done = ready, done
+        self.header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=self.shm.buf)
+        self.board = np.ndarray((height, width), dtype=np.int64, buffer=self.shm.buf,
+                                offset=self.header.nbytes)
+        if self.owner:
+            self.header[:] = 0
+            self.header[REPLY] = NO_MOVE
+
+    def __getstate__(self):
+        return {'height': self.height, 'width': self.width, 'name': self.shm.name,
+                'ready': self.ready, 'done': self.done}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    # ------------------------
+    # Publishing side
+    # ------------------------
+
+    def publish(self, state, player, move_count=None):
+        """
+        Write state into the block and wake the worker; returns its sequence
+        number. move_count defaults to the length of player 1's trail less one.
+        """
+        board = state['board']
+        if board.shape != self.board.shape:
+            raise ValueError(f"Board {board.shape} does not fit a {self.board.shape} SharedState")
+        self.board[:] = board
+        header = self.header
+        if move_count is None:
+            move_count = int(np.count_nonzero(board == 1)) - 1
+        header[MOVE_COUNT] = move_count
+        header[PLAYER] = player
+        header[P1_Y], header[P1_X] = state['p1_pos']
+        header[P2_Y], header[P2_X] = state['p2_pos']
+        header[SEQ] += 1
+        self.ready.release()
+        return int(header[SEQ])
+
+    def wait_reply(self, timeout=None):
+        """
+        The worker's move for the last published state (None if it has none).
+        Late replies to earlier states are skipped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.done.acquire(timeout=left):
+                raise TimeoutError("No reply from the worker")
+            reply_seq, code = int(self.header[REPLY_SEQ]), int(self.header[REPLY])
+            if reply_seq == self.header[SEQ]:
+                break
+        if code == FAILED:
+            raise RuntimeError("The worker's agent failed (see its traceback)")
+        return None if code == NO_MOVE else MOVES[code]
+
+    def stop(self):
+        """Tell the worker to exit"""
+        self.header[PLAYER] = STOP
+        self.ready.release()
+
+    # ------------------------
+    # Worker side
+    # ------------------------
+
+    def wait_state(self):
+        """
+        Block until a state is published; (state, player, seq), or None once
+        told to stop. Pass seq back to reply().
+        """
+        self.ready.acquire()
+        header = self.header
+        player = int(header[PLAYER])
+        if player == STOP:
+            return None
+        seq = int(header[SEQ])
+        p1_pos = (int(header[P1_Y]), int(header[P1_X]))
+        p2_pos = (int(header[P2_Y]), int(header[P2_X]))
+        # The board is the block itself: copy it to keep it past the reply
+        state = {'board': self.board, 'p1_pos': p1_pos, 'p2_pos': p2_pos,
+                 'p1_moves': valid_moves(self.board, p1_pos),
+                 'p2_moves': valid_moves(self.board, p2_pos)}
+        return state, player, seq
+
+    def reply(self, move, seq):
+        """Answer the state read as seq (move, None, or FAILED) and wake the publisher"""
+        self.header[REPLY] = FAILED if move is FAILED else (NO_MOVE if move is None else MOVES.index(move))
+        self.header[REPLY_SEQ] = seq
+        self.done.release()
+
+    def close(self):
+        """Detach; the creating process also frees the block"""
+        self.header = self.board = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def worker_main(channel, spec):
+    """Worker process: answer each published state with the agent's move"""
+    import traceback
+    from registry import make_agent
+    agent = make_agent(spec)
+    while True:
+        request = channel.wait_state()
+        if request is None:
+            break
+        state, player, seq = request
+        try:
+            move = agent.get_action(state, player)
+        except Exception:
+            traceback.print_exc()
+            move = FAILED
+        channel.reply(move, seq)
+    # No close(): a forked worker holds the creator's object, which would free the block
+
+
+class ProcessAgent:
+    """
+    A registered agent (a name or (class path, kwargs) pair, as for
+    registry.make_agent) running in its own process, fed through a
+    SharedState. The process starts on the first move, and again if the
+    board size changes; call close() when done. A move that times out
+    stops the worker: it may still be reading the block, so the next move
+    starts a new one rather than publishing over it.
+    """
+
+    def __init__(self, spec, timeout=None):
+        self.spec = spec
+        self.timeout = timeout
+        self.channel = None
+        self.process = None
+
+    def start(self, height, width):
+        self.close()
+        self.channel = SharedState(height, width)
+        self.process = multiprocessing.Process(target=worker_main, args=(self.channel, self.spec),
+                                               daemon=True)
+        self.process.start()
+
+    def get_action(self, state, player):
+        if self.channel is None or state['board'].shape != self.channel.board.shape:
+            self.start(*state['board'].shape)
+        self.channel.publish(state, player)
+        try:
+            return self.channel.wait_reply(self.timeout)
+        except TimeoutError:
+            self.process.terminate()
+            self.process.join()
+            self.channel.close()
+            self.channel = self.process = None
+            raise
+
+    def close(self):
+        if self.process is None:
+            return
+        self.channel.stop()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.channel.close()
+        self.channel = self.process = None
@@ -0,0 +1,142 @@
+# symmetry.py - Board symmetries for position-keyed storage
+#
+# A Tron position keeps its value under any reflection or rotation of the
+# board (8 for square boards, 4 otherwise), and under swapping the players,
+# which negates scores and hands the move to the other side. Mapping every
+# position to one canonical representative lets caches, books and tables
+# store each symmetry class once.
+#
+# Two tools:
+#   BoardSymmetry.canonicalize - exact canonical form of a full position
+#                                (used by the opening book)
+#   SymmetricHasher            - Zobrist hashes of every transformed board,
+#                                updated per move in O(#symmetries), giving
+#                                canonical cache keys during search
+import hashlib
+import numpy as np
+from eval_cache import ZobristHasher
+from maps import WALL
+
+DIRECTIONS = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
+MOVE_OF = {delta: move for move, delta in DIRECTIONS.items()}
+MASK64 = (1 << 64) - 1
+
+# Each op maps a delta (dy, dx) linearly; positions get the same map plus an offset.
+# Names follow numpy: op 0 identity, 1 rot180, 2 flipud, 3 fliplr,
+# then square-only: 4 transpose, 5 anti-transpose, 6 rot90 (clockwise), 7 rot270
+LINEAR = [
+    lambda dy, dx: (dy, dx),
+    lambda dy, dx: (-dy, -dx),
+    lambda dy, dx: (-dy, dx),
+    lambda dy, dx: (dy, -dx),
+    lambda dy, dx: (dx, dy),
+    lambda dy, dx: (-dx, -dy),
+    lambda dy, dx: (dx, -dy),
+    lambda dy, dx: (-dx, dy),
+]
+INVERSE = [0, 1, 2, 3, 4, 5, 7, 6]
+
+
+class BoardSymmetry:
+    """The symmetry group of an empty height x width board"""
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.ops = list(range(8)) if height == width else list(range(4))
+
+    def transform_pos(self, pos, op):
+        y, x = pos
+        h, w = self.height - 1, self.width - 1
+        return [(y, x), (h - y, w - x), (h - y, x), (y, w - x),
+                (x, y), (w - x, h - y), (x, h - y), (w - x, y)][op]
+
+    def transform_move(self, move, op):
+        """Direction in the transformed board for a move in the original"""
+        return MOVE_OF[LINEAR[op](*DIRECTIONS[move])]
+
+    def inverse_move(self, move, op):
+        """Direction in the original board for a move in the transformed one"""
+        return MOVE_OF[LINEAR[INVERSE[op]](*DIRECTIONS[move])]
+
+    def transform_board(self, board, op, swapped=False):
+        b = [lambda a: a, lambda a: a[::-1, ::-1], lambda a: a[::-1, :], lambda a: a[:, ::-1],
+             lambda a: a.T, lambda a: a[::-1, ::-1].T, lambda a: a[::-1, :].T,
+             lambda a: a[:, ::-1].T][op](board)
+        if swapped:
+            b = np.where(b == 1, 2, np.where(b == 2, 1, b))
+        return np.ascontiguousarray(b)
+
+    def canonicalize(self, board, p1_pos, p2_pos, side):
+        """
+        Canonical form of a position with `side` to move. Returns a dict with
+        the transformed board, heads and side plus the op and swapped flag
+        needed to map moves back with inverse_move. If swapped, scores of the
+        canonical position are from the other player's point of view.
+        """
+        best = None
+        small = board.astype(np.int8)
+        for op in self.ops:
+            for swapped in (False, True):
+                b = self.transform_board(small, op, swapped)
+                t1, t2 = self.transform_pos(p1_pos, op), self.transform_pos(p2_pos, op)
+                if swapped:
+                    t1, t2 = t2, t1
+                s = 3 - side if swapped else side
+                candidate = (b.tobytes(), t1, t2, s)
+                if best is None or candidate < best[0]:
+                    best = (candidate, b, op, swapped)
+        (data, t1, t2, s), b, op, swapped = best
+        return {'board': b, 'p1_pos': t1, 'p2_pos': t2, 'side': s,
+                'op': op, 'swapped': swapped}
+
+    def canonical_key(self, board, p1_pos, p2_pos, side):
+        """Stable 64-bit key of the canonical form, plus the canonical dict"""
+        canon = self.canonicalize(board, p1_pos, p2_pos, side)
+        blob = canon['board'].tobytes() + bytes(
+            [*canon['p1_pos'], *canon['p2_pos'], canon['side']])
+        key = int.from_bytes(hashlib.blake2b(blob, digest_size=8).digest(), 'little')
+        return key, canon
+
+
+class SymmetricHasher(BoardSymmetry):
+    """
+    Keeps one Zobrist hash per (op, swapped) image of the board. Filling a
+    cell XORs one key into each, so canonical keys stay cheap during search.
+    """
+
+    def __init__(self, height, width):
+        super().__init__(height, width)
+        self.zobrist = ZobristHasher(height, width)
+        self.images = [(op, swapped) for op in self.ops for swapped in (False, True)]
+
+    def hash_all(self, board):
+        """Hashes of every image of a board (once per move, at the root)"""
+        hashes = [0] * len(self.images)
+        ys, xs = board.nonzero()
+        for y, x in zip(ys.tolist(), xs.tolist()):
+            hashes = self.update(hashes, (y, x), int(board[y, x]))
+        return tuple(hashes)
+
+    def update(self, hashes, pos, owner):
+        """Hashes after `owner` fills the cell at pos"""
+        keys = self.zobrist
+        swap = owner if owner == WALL else 3 - owner  # Walls belong to neither player
+        return tuple(h ^ keys.cell_key(self.transform_pos(pos, op), swap if swapped else owner)
+                     for h, (op, swapped) in zip(hashes, self.images))
+
+    def canonical(self, hashes, p1_pos, p2_pos, side=0):
+        """
+        (key, swapped) for the smallest image key. Pass side=0 when the value
+        stored does not depend on who moves (leaf evaluations).
+        """
+        best = None
+        for h, (op, swapped) in zip(hashes, self.images):
+            t1, t2 = self.transform_pos(p1_pos, op), self.transform_pos(p2_pos, op)
+            if swapped:
+                t1, t2 = t2, t1
+            s = (3 - side if swapped else side) if side else 0
+            key = hash((h, t1, t2, s)) & MASK64
+            if best is None or key < best[0]:
+                best = (key, swapped)
+        return best
@@ -0,0 +1,315 @@
+# tablebase.py - Solved endgames for small boards
+#
+# Late in a game on a small board (6x6 in compare_heuristics) only a handful
+# of free cells are still reachable, and every such position can be solved
+# exactly once, offline. Positions are generated by free-cell count, 0 up to
+# max_free. Each count is solved from the smaller ones a move leads to
+# (retrograde order), giving win/draw/loss and the number of steps to the end.
+#
+# What a position is, for the table:
+#   - F, the free cells either player can still reach (others never matter)
+#   - S1 and S2, the free neighbours of each head (where the heads used to
+#     be no longer matters once they move, so heads with the same S are equal)
+# Positions are stored once per board symmetry, from the point of view of
+# the side probing ("me"). Values are security levels: what "me" can force
+# even if the opponent reacts to my move each step. A table win is a win
+# against any opponent. Moves into the same cell follow TronGame.step
+# (both heads land there and the game goes on).
+#
+# Build:  python tablebase.py 6 7     (board size, max free cells; ~5 min)
+# Use:    MinimaxAgent(depth=4, tablebase='tablebase_6x6.npy'), same for MCTSAgent
+import bisect
+import os
+import sys
+import time
+import numpy as np
+from symmetry import BoardSymmetry, DIRECTIONS
+
+TABLE_DTYPE = np.dtype([('key', '<u8'), ('score', '<i2'), ('move', 'u1')])
+MASK64 = (1 << 64) - 1
+WIN, DRAW, LOSS = 1, 0, -1
+
+
+def tablebase_path(width, height, directory='.'):
+    return os.path.join(directory, f"tablebase_{height}x{width}.npy")
+
+
+def encode(result, distance):
+    """One int per value, ordered loss < draw < win; faster wins and slower losses score higher"""
+    if result == WIN:
+        return 1000 - distance
+    if result == LOSS:
+        return -1000 + distance
+    return distance  # Longer draws leave the opponent more time to go wrong
+
+
+def decode(score):
+    """(result, distance) of an encoded score"""
+    if score > 500:
+        return WIN, 1000 - score
+    if score < -500:
+        return LOSS, score + 1000
+    return DRAW, score
+
+
+def one_step_earlier(score):
+    return score - 1 if score > 500 else score + 1
+
+
+class CellMasks:
+    """
+    Bitmask geometry of a height x width board: cell i is bit i (i = y * width + x).
+    Holds neighbour masks and the symmetry permutations used to canonicalize.
+    """
+
+    def __init__(self, height, width):
+        if height * width > 52:
+            raise ValueError("tablebase keys fit boards of at most 52 cells")
+        self.height = height
+        self.width = width
+        self.cells = height * width
+        self.full = (1 << self.cells) - 1
+        self.neighbors = []
+        for y in range(height):
+            for x in range(width):
+                mask = 0
+                for dy, dx in DIRECTIONS.values():
+                    ny, nx = y + dy, x + dx
+                    if 0 <= ny < height and 0 <= nx < width:
+                        mask |= 1 << (ny * width + nx)
+                self.neighbors.append(mask)
+
+        symmetry = BoardSymmetry(height, width)
+        self.ops = symmetry.ops
+        self.perms = []
+        for op in self.ops:
+            self.perms.append([self.index(symmetry.transform_pos(divmod(i, width), op))
+                               for i in range(self.cells)])
+        # Per op, the image of every byte of a mask, so a transform is a few lookups
+        self.byte_maps = []
+        for perm in self.perms:
+            maps = []
+            for start in range(0, self.cells, 8):
+                maps.append([sum(1 << perm[start + bit] for bit in range(8)
+                                 if value >> bit & 1 and start + bit < self.cells)
+                             for value in range(256)])
+            self.byte_maps.append(maps)
+
+    def index(self, pos):
+        return pos[0] * self.width + pos[1]
+
+    def transform(self, mask, op_index):
+        image = 0
+        for byte, table in enumerate(self.byte_maps[op_index]):
+            image |= table[(mask >> (8 * byte)) & 0xFF]
+        return image
+
+    def spread(self, mask):
+        """mask plus every cell next to it"""
+        out = mask
+        while mask:
+            low = mask & -mask
+            out |= self.neighbors[low.bit_length() - 1]
+            mask ^= low
+        return out
+
+    def reachable(self, free, seeds):
+        """Cells of free connected (through free) to the cells in seeds"""
+        reached = seeds & free
+        while True:
+            grown = self.spread(reached) & free
+            if grown == reached:
+                return reached
+            reached = grown
+
+    def head_for(self, free, s):
+        """Lowest non-free cell whose free neighbours are exactly s, or None"""
+        if s == 0:
+            return 0 if self.spread(free) != self.full else None
+        low = s & -s
+        candidates = self.neighbors[low.bit_length() - 1] & ~free
+        while candidates:
+            bit = candidates & -candidates
+            head = bit.bit_length() - 1
+            if self.neighbors[head] & free == s:
+                return head
+            candidates ^= bit
+        return None
+
+    def canonical(self, free, s1, s2):
+        """(packed canonical position, op index) over the board symmetries"""
+        best = None
+        shift = self.cells
+        for op_index in range(len(self.ops)):
+            packed = (self.transform(free, op_index) | self.transform(s1, op_index) << shift
+                      | self.transform(s2, op_index) << (2 * shift))
+            if best is None or packed < best[0]:
+                best = (packed, op_index)
+        return best
+
+    def unpack(self, packed):
+        return (packed & self.full, (packed >> self.cells) & self.full,
+                packed >> (2 * self.cells))
+
+    def file_key(self, packed):
+        """64-bit key: F plus the lowest head cell standing for each of S1 and S2"""
+        free, s1, s2 = self.unpack(packed)
+        return (free | self.head_for(free, s1) << self.cells
+                | self.head_for(free, s2) << (self.cells + 6))
+
+
+def child_position(masks, free, m, o):
+    """(free, s1, s2) after I move to cell m and the opponent to cell o"""
+    free &= ~(1 << m) & ~(1 << o)
+    s1 = masks.neighbors[m] & free
+    s2 = masks.neighbors[o] & free
+    return masks.reachable(free, s1 | s2), s1, s2
+
+
+def terminal_score(s1, s2):
+    """Score of a position where someone cannot move, or None"""
+    if s1 and s2:
+        return None
+    if not s1 and not s2:
+        return encode(DRAW, 1)
+    return encode(LOSS, 1) if not s1 else encode(WIN, 1)
+
+
+def bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def solve(masks, free, s1, s2, values):
+    """Best (score, my move cell) from already solved smaller positions"""
+    best_score, best_move = None, None
+    for m in bits(s1):
+        worst = None
+        for o in bits(s2):
+            child = child_position(masks, free, m, o)
+            score = terminal_score(child[1], child[2])
+            if score is None:
+                score = values[masks.canonical(*child)[0]][0]
+            score = one_step_earlier(score)
+            if worst is None or score < worst:
+                worst = score
+        if best_score is None or worst > best_score:
+            best_score, best_move = worst, m
+    return best_score, best_move
+
+
+def grow(masks, layer):
+    """Every position with one more free cell, from positions with n free cells"""
+    next_layer = set()
+    for packed in layer:
+        free, s1, s2 = masks.unpack(packed)
+        touching = masks.spread(free)
+        for c in range(masks.cells):
+            bit = 1 << c
+            if free & bit:
+                continue
+            bigger = free | bit
+            options1 = [s for s in (s1, s1 | bit) if masks.head_for(bigger, s) is not None]
+            options2 = [s for s in (s2, s2 | bit) if masks.head_for(bigger, s) is not None]
+            for new1 in options1:
+                for new2 in options2:
+                    # The new cell must be reachable by someone
+                    if touching & bit or (new1 | new2) & bit:
+                        next_layer.add(masks.canonical(bigger, new1, new2)[0])
+    return next_layer
+
+
+def build_tablebase(width=6, height=6, max_free=7, path=None):
+    """Solve every position with up to max_free reachable free cells and write the table"""
+    path = path or tablebase_path(width, height)
+    masks = CellMasks(height, width)
+    values = {}
+    layer = {0}  # No free cells: both heads are stuck
+    start = time.time()
+    for n in range(1, max_free + 1):
+        layer = grow(masks, layer)
+        solved = 0
+        for packed in layer:
+            free, s1, s2 = masks.unpack(packed)
+            if s1 and s2:
+                values[packed] = solve(masks, free, s1, s2, values)
+                solved += 1
+        print(f"  {n} free cells: {solved} positions ({time.time() - start:.1f}s)")
+
+    rows = [(masks.file_key(packed), score, move) for packed, (score, move) in values.items()]
+    rows.sort()
+    # Trailer row (sorts last): board shape and max_free, checked when probing
+    rows.append((MASK64, (height << 8) | width, max_free))
+    np.save(path, np.array(rows, dtype=TABLE_DTYPE))
+    print(f"Wrote {len(rows) - 1} positions to {path} ({time.time() - start:.1f}s)")
+    return path
+
+
+class EndgameTablebase:
+    """Read-only view of a tablebase file (memory-mapped, so loading is instant)"""
+
+    loaded = {}  # path -> EndgameTablebase, shared by every agent in the process
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = np.load(path, mmap_mode='r')
+        self.keys = self.entries['key']
+        shape, max_free = int(self.entries[-1]['score']), int(self.entries[-1]['move'])
+        self.height, self.width = shape >> 8, shape & 0xFF
+        self.max_free = max_free
+        self.masks = CellMasks(self.height, self.width)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, path):
+        if path not in cls.loaded:
+            cls.loaded[path] = cls(path)
+        return cls.loaded[path]
+
+    def lookup(self, state, player):
+        """(result, distance, move) for player in this state, or None if not in the table"""
+        board = state['board']
+        if board.shape != (self.height, self.width):
+            return None
+        masks = self.masks
+        free = sum(1 << int(i) for i in np.flatnonzero(board.ravel() == 0))
+        mine = state['p1_pos'] if player == 1 else state['p2_pos']
+        theirs = state['p2_pos'] if player == 1 else state['p1_pos']
+        s1 = masks.neighbors[masks.index(mine)] & free
+        s2 = masks.neighbors[masks.index(theirs)] & free
+        if not s1 or not s2:
+            return None
+        free = masks.reachable(free, s1 | s2)
+        if free.bit_count() > self.max_free:
+            return None
+
+        packed, op_index = masks.canonical(free, s1, s2)
+        key = masks.file_key(packed)
+        # bisect reads ~log2(n) keys; np.searchsorted would copy the strided key column
+        index = bisect.bisect_left(self.keys, key)
+        if int(self.keys[index]) != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = self.entries[index]
+        # The stored move is a canonical cell; map it back and step toward it
+        target = masks.perms[op_index].index(int(entry['move']))
+        dy = target // self.width - mine[0]
+        dx = target % self.width - mine[1]
+        move = next(m for m, delta in DIRECTIONS.items() if delta == (dy, dx))
+        result, distance = decode(int(entry['score']))
+        return result, distance, move
+
+    def probe(self, state, player):
+        """Table move for player in this state, or None if the position is not in the table"""
+        found = self.lookup(state, player)
+        return found[2] if found else None
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    max_free = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    build_tablebase(size, size, max_free)
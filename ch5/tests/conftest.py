@@ -0,0 +1,7 @@
+# conftest.py - Lets the tests import the flat modules of ch5 (run: python -m pytest tests)
+import os
+import sys
+
+CH5 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if CH5 not in sys.path:
+    sys.path.insert(0, CH5)
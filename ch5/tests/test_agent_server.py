@@ -0,0 +1,89 @@
+# test_agent_server.py - State encoding and agent sessions over the socket
+import asyncio
+import os
+import random
+import numpy as np
+import pytest
+from tron_base import TronGame
+from greedy import GreedyAgent
+from maps import MAP_DIR
+from agent_server import (RemoteAgent, decode_move, decode_state, encode_move, encode_state,
+                          start_server)
+
+
+def random_states(game, seed, count=20):
+    rng = random.Random(seed)
+    state = game.reset()
+    states = [state]
+    while not game.game_over and len(states) < count:
+        state, reward, done = game.step(rng.choice(state['p1_moves'] or ['UP']),
+                                        rng.choice(state['p2_moves'] or ['UP']))
+        states.append(state)
+    return states
+
+
+@pytest.mark.parametrize('game', [TronGame(5, 7), TronGame(20, 20),
+                                  TronGame(game_map=os.path.join(MAP_DIR, 'pillars.txt'))],
+                         ids=['5x7', '20x20', 'pillars'])
+def test_state_round_trip(game):
+    """Odd cell counts and WALL cells (value 3) survive 2-bit packing"""
+    for state in random_states(game, seed=0):
+        decoded = decode_state(encode_state(state))
+        assert np.array_equal(decoded['board'], state['board'])
+        assert decoded['p1_pos'] == tuple(state['p1_pos'])
+        assert decoded['p2_pos'] == tuple(state['p2_pos'])
+        assert sorted(decoded['p1_moves']) == sorted(state['p1_moves'])
+        assert sorted(decoded['p2_moves']) == sorted(state['p2_moves'])
+    assert len(encode_state(TronGame(20, 20).reset())) == 106
+
+
+def test_move_round_trip():
+    for move in ['UP', 'DOWN', 'LEFT', 'RIGHT', None]:
+        assert decode_move(encode_move(move)) == move
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    address = str(tmp_path_factory.mktemp('server') / 'agents.sock')
+    process = start_server(address, workers=1)
+    yield address
+    process.terminate()
+    process.join(timeout=10)
+
+
+def test_remote_agent_plays_like_local(server):
+    remote = RemoteAgent('Greedy', address=server)
+    try:
+        for state in random_states(TronGame(10, 10), seed=1):
+            for player in (1, 2):
+                assert remote.get_action(state, player) == GreedyAgent().get_action(state, player)
+    finally:
+        remote.close()
+
+
+def test_bad_spec_is_reported(server):
+    remote = RemoteAgent(['no_such_module.Agent', {}], address=server)
+    try:
+        with pytest.raises(RuntimeError, match='Agent server'):
+            remote.get_action(TronGame(8, 8).reset(), 1)
+    finally:
+        remote.close()
+
+
+def test_sessions_share_evaluator_batches(server):
+    """Concurrent MCTS sessions on one worker each get their own legal move"""
+    spec = ['mcts.MCTSAgent', {'simulations': 30, 'evaluator': 'chambers', 'batch_size': 4}]
+    agents = [RemoteAgent(spec, address=server) for _ in range(3)]
+    states = random_states(TronGame(8, 8), seed=2, count=3)
+
+    async def play():
+        try:
+            return await asyncio.gather(*(agent.get_action_async(state, 1)
+                                          for agent, state in zip(agents, states)))
+        finally:
+            for agent in agents:
+                agent.close()  # While the loop that owns their streams still runs
+
+    moves = asyncio.run(play())
+    for move, state in zip(moves, states):
+        assert move in state['p1_moves']
@@ -0,0 +1,70 @@
+# test_chambers.py - Chamber-tree fill against the true longest path
+import random
+import numpy as np
+from maps import map_graph
+from chambers import chamber_fill
+
+
+def longest_path(neighbors, allowed, head):
+    """Most allowed cells a path from head can visit, by trying every path"""
+    visited = [False] * len(allowed)
+
+    def extend(cell):
+        best = 0
+        for nxt in neighbors[cell]:
+            if allowed[nxt] and not visited[nxt]:
+                visited[nxt] = True
+                best = max(best, 1 + extend(nxt))
+                visited[nxt] = False
+        return best
+
+    return extend(head)
+
+
+def reachable(neighbors, allowed, start, removed=None):
+    seen = {start}
+    stack = [start]
+    while stack:
+        cell = stack.pop()
+        for nxt in neighbors[cell]:
+            if allowed[nxt] and nxt != removed and nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return seen
+
+
+def random_positions(count, seed):
+    """(neighbors, parity, allowed, head) for small boards with random trail cells"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        height, width = rng.randint(2, 5), rng.randint(2, 5)
+        board = (np.array([[rng.random() for _ in range(width)] for _ in range(height)]) < 0.25).astype(int)
+        head = (rng.randrange(height), rng.randrange(width))
+        board[head] = 1
+        graph = map_graph(board)
+        allowed = [v == 0 for v in board.ravel()[graph.flat].tolist()]
+        yield graph.neighbors, graph.parity, allowed, int(graph.cell_of[head])
+
+
+def test_fill_never_underestimates():
+    exact = 0
+    for neighbors, parity, allowed, head in random_positions(1500, seed=0):
+        fill = chamber_fill(neighbors, parity, allowed, head)
+        true = longest_path(neighbors, allowed, head)
+        assert fill >= true
+        exact += fill == true
+    assert exact > 1000  # A bound, but a tight one on most boards
+
+
+def test_fill_exact_for_one_chamber():
+    """With no chokepoints the parity count is the longest path on these boards"""
+    checked = 0
+    for neighbors, parity, allowed, head in random_positions(1500, seed=1):
+        region = reachable(neighbors, allowed, head) - {head}
+        if not region:
+            continue
+        # One chamber: no cell of the region cuts any other off from the head
+        if all(len(reachable(neighbors, allowed, head, removed=cell)) == len(region) for cell in region):
+            assert chamber_fill(neighbors, parity, allowed, head) == longest_path(neighbors, allowed, head)
+            checked += 1
+    assert checked > 200
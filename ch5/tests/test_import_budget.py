@@ -0,0 +1,10 @@
+# test_import_budget.py - Each agent module imports quickly and without heavy extras
+import pytest
+from import_budget import BUDGET_MS, MODULES, measure_import
+
+
+@pytest.mark.parametrize('module_name', MODULES)
+def test_import_budget(module_name):
+    ms, heavy = measure_import(module_name)
+    assert heavy == [], f"{module_name} loads {', '.join(heavy)} at import"
+    assert ms <= BUDGET_MS, f"{module_name} took {ms:.1f}ms beyond numpy (budget {BUDGET_MS}ms)"
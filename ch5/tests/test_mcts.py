@@ -0,0 +1,90 @@
+# test_mcts.py - PUCT selection, batched leaf scoring and virtual loss
+import copy
+import random
+import pytest
+from tron_base import TronGame
+from mcts import MCTSAgent, MCTSNode
+
+
+class SkewedPolicy:
+    """Almost all of the prior on RIGHT"""
+
+    def priors(self, state, player):
+        moves = state['p1_moves'] if player == 1 else state['p2_moves']
+        return {move: 0.94 if move == 'RIGHT' else 0.02 for move in moves}
+
+
+def test_puct_does_not_visit_every_move():
+    state = TronGame(10, 10).reset()
+    random.seed(0)
+    agent = MCTSAgent(50, puct=True, policy=SkewedPolicy())
+    assert agent.get_action(state, 1) == 'RIGHT'
+    # UCB-style expansion would give each of the four root moves a visit first
+    assert len(agent.root_visits) < len(state['p1_moves'])
+
+
+def tree_nodes(node):
+    yield node
+    for child in node.children:
+        yield from tree_nodes(child)
+
+
+def iter_path(node):
+    """node and its ancestors up to the root"""
+    while node is not None:
+        yield node
+        node = node.parent
+
+
+def sequential_root_visits(agent, state, player, simulations):
+    """Root visits of a search that scores one leaf per step, without virtual loss"""
+    agent.root_player = player
+    root = MCTSNode(copy.deepcopy(state), player)
+    for _ in range(simulations):
+        node = agent.select(root)
+        result = agent.is_terminal(node.state)
+        if result is None:
+            leaf = node.state
+            value = agent.leaf_evaluator.evaluate(leaf['board'], leaf['p1_pos'], leaf['p2_pos'])
+            result = value if player == 1 else -value
+        agent.backpropagate(node, result)
+    return {child.move: child.visits for child in root.children}
+
+
+@pytest.mark.parametrize('puct', [False, True])
+def test_batch_of_one_matches_sequential_search(puct):
+    state = TronGame(8, 8).reset()
+    random.seed(1)
+    agent = MCTSAgent(60, evaluator='chambers', puct=puct, batch_size=1)
+    agent.get_action(state, 2)
+    random.seed(1)
+    assert agent.root_visits == sequential_root_visits(agent, state, 2, 60)
+    assert agent.batch_fill == 1.0
+
+
+@pytest.mark.parametrize('puct', [False, True])
+def test_batch_fill(puct):
+    state = TronGame(8, 8).reset()
+    random.seed(2)
+    agent = MCTSAgent(64, evaluator='chambers', puct=puct, batch_size=8)
+    assert agent.get_action(state, 1) in state['p1_moves']
+    assert 0 < agent.batch_fill <= 1
+    assert sum(agent.root_visits.values()) <= 64
+
+
+@pytest.mark.parametrize('puct', [False, True])
+def test_virtual_loss_is_undone(puct):
+    state = TronGame(8, 8).reset()
+    random.seed(3)
+    agent = MCTSAgent(40, puct=puct, reuse_tree=True)
+    agent.get_action(state, 1)
+    root = agent.last_root
+    nodes = list(tree_nodes(root))
+    before = [(node.visits, node.value) for node in nodes]
+    leaf = max(nodes, key=lambda node: (len(list(iter_path(node))), node.visits))  # Deepest
+    agent.add_virtual_loss(leaf, 1)
+    for node in iter_path(leaf):
+        assert node.visits == before[nodes.index(node)][0] + 1
+    agent.add_virtual_loss(leaf, -1)
+    # Playout results are whole numbers, so the values come back exactly
+    assert [(node.visits, node.value) for node in nodes] == before
@@ -0,0 +1,83 @@
+# test_minimax.py - PVS, transposition tables, iterative deepening and hashing agree with plain search
+import os
+import random
+import pytest
+from tron_base import TronGame
+from minimax import MinimaxAgent
+from advanced_heuristic import AdvancedMinimaxAgent
+from greedy import GreedyAgent
+from maps import MAP_DIR
+
+PILLARS = os.path.join(MAP_DIR, 'pillars.txt')
+
+
+def game_positions(size=8, seed=0, games=2):
+    """Player 1's positions from short games with random openings"""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        game = TronGame(size, size)
+        state = game.reset()
+        turn = 0
+        while not game.game_over:
+            if state['p1_moves']:
+                positions.append(state)
+            a1 = rng.choice(state['p1_moves']) if turn < 3 and state['p1_moves'] else GreedyAgent().get_action(state, 1)
+            state, reward, done = game.step(a1, GreedyAgent().get_action(state, 2))
+            turn += 1
+    return positions
+
+
+def alpha_beta_values(agent, state, depth):
+    """Plain alpha-beta value of each of player 1's moves"""
+    values = {}
+    for move in state['p1_moves']:
+        child = agent.simulate_move(state, move, None, 1)
+        values[move] = agent.minimax(child, depth - 1, float('-inf'), float('inf'), False)
+        agent.undo_move()
+    return values
+
+
+@pytest.mark.parametrize('cls', [MinimaxAgent, AdvancedMinimaxAgent])
+@pytest.mark.parametrize('options', [
+    {'use_pvs': True},
+    {'use_pvs': True, 'tt_size': 1 << 14},
+    {'use_pvs': True, 'iterative': True, 'tt_size': 1 << 14},
+])
+def test_pvs_matches_alpha_beta(cls, options):
+    depth = 4
+    pvs = cls(depth=depth, **options)  # One agent for the game: tables carry over
+    for state in game_positions():
+        move = pvs.get_action(state, 1)
+        values = alpha_beta_values(cls(depth=depth), state, depth)
+        best = max(values.values())
+        assert values[move] == pytest.approx(best)
+        assert pvs.last_score[1] == pytest.approx(best)
+
+
+@pytest.mark.parametrize('options', [
+    {'cache_size': 10000},
+    {'cache_size': 10000, 'canonical_cache': True},
+    {'use_pvs': True, 'tt_size': 1 << 14},
+])
+def test_hashed_minimax_on_map(options):
+    """Hashing covers WALL cells: hashed agents play a whole game on pillars"""
+    game = TronGame(game_map=PILLARS)
+    state = game.reset()
+    hashed, plain = MinimaxAgent(depth=3, **options), MinimaxAgent(depth=3)
+    while not game.game_over:
+        move = hashed.get_action(state, 1)
+        if 'use_pvs' not in options:
+            assert move == plain.get_action(state, 1)  # Same search, memoized
+        state, reward, done = game.step(move, GreedyAgent().get_action(state, 2))
+    assert game.winner in (0, 1, 2)
+
+
+def test_incremental_hash_on_map():
+    game = TronGame(game_map=PILLARS)
+    state = game.reset()
+    agent = MinimaxAgent(depth=2, cache_size=100)
+    agent.get_action(state, 1)
+    start = dict(state, hash=agent.hasher.hash_board(state['board']))
+    child = agent.simulate_move(start, state['p1_moves'][0], None, 1)
+    assert child['hash'] == agent.hasher.hash_board(child['board'])
@@ -0,0 +1,163 @@
+# test_ollama.py - OllamaClient, ResponseCache and OllamaAgent against ollama_stub
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import socket
+import threading
+import time
+import pytest
+from ollama_stub import start_stub_server
+from ollamatron import OllamaAgent, OllamaClient, ResponseCache, extract_move
+from tron_base import TronGame
+
+MOVES = ['UP', 'LEFT']
+PROMPT = "Your available moves: UP, LEFT\n"
+
+
+@pytest.fixture(scope='module')
+def stub():
+    server, url = start_stub_server(token_delay=0.001)
+    yield server, url
+    server.shutdown()
+
+
+def test_extract_move():
+    assert extract_move("I choose LEFT.", MOVES) == 'LEFT'
+    assert extract_move("Not DOWN, I choose UP", MOVES) == 'UP'
+    assert extract_move("thinking", MOVES) is None
+    # While streaming, a word at the end of the text may still grow ("UP" -> "UPPER")
+    assert extract_move("I choose UP", MOVES, final=False) is None
+    assert extract_move("I choose UP.", MOVES, final=False) == 'UP'
+
+
+def test_stream_stops_at_first_move(stub):
+    server, url = stub
+    client = OllamaClient(url)
+    try:
+        assert client.generate('m', PROMPT, moves=MOVES) in MOVES
+        assert client.early_stops == 1
+        text = client.generate('m', PROMPT)  # No moves: the whole answer
+        assert text.endswith('.') and 'keeps' in text
+    finally:
+        client.close()
+
+
+def test_client_shared_between_threads(stub):
+    server, url = stub
+    client = OllamaClient(url, pool_size=4)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            answers = list(pool.map(lambda i: client.generate('m', PROMPT, moves=MOVES), range(16)))
+        assert all(answer in MOVES for answer in answers)
+        assert client.requests_sent == 16
+    finally:
+        client.close()
+
+
+def test_response_cache_lru():
+    cache = ResponseCache(max_size=2)
+    cache.put('m', 'a', 0.3, 'UP')
+    cache.put('m', 'b', 0.3, 'DOWN')
+    assert cache.get('m', 'a', 0.3) == 'UP'  # Now the most recent
+    cache.put('m', 'c', 0.3, 'LEFT')
+    assert cache.get('m', 'b', 0.3) is None
+    assert cache.get('m', 'a', 0.3) == 'UP'
+    assert cache.get('m', 'a', 0.7) is None  # Temperature is part of the key
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_response_cache_file(tmp_path):
+    path = str(tmp_path / 'answers.json')
+    cache = ResponseCache(path=path, save_every=2)
+    for i in range(5):
+        cache.put('m', f"prompt {i}", 0.3, 'UP')
+    reloaded = ResponseCache(path=path, max_size=3)
+    assert reloaded.get('m', "prompt 3", 0.3) == 'UP'  # Saved after the 4th put
+    assert reloaded.get('m', "prompt 0", 0.3) is None  # Oldest dropped to fit max_size
+    assert reloaded.get('m', "prompt 4", 0.3) is None  # Not saved yet
+    cache.save()
+    assert ResponseCache(path=path).get('m', "prompt 4", 0.3) == 'UP'
+
+
+def test_response_cache_concurrent_saves(tmp_path):
+    path = str(tmp_path / 'answers.json')
+    cache = ResponseCache(path=path, save_every=1)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: cache.put('m', f"prompt {i}", 0.3, 'UP'), range(200)))
+    with open(path) as f:
+        assert len(json.load(f)) == 200
+    assert os.listdir(tmp_path) == ['answers.json']  # No temp files left behind
+
+
+@pytest.fixture
+def silent_url():
+    """A server that takes connections but never answers, like an overloaded model host"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(64)
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}/api/generate"
+    listener.close()
+
+
+class SlowAgent:
+    """Fallback agent that outlasts the deadline and records overlapping calls"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def get_action(self, state, player):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return state['p1_moves'][0]
+
+
+def test_fallback_not_starved_by_timed_out_requests(silent_url):
+    # Each timed-out request keeps its thread waiting for headers; the fallback
+    # must still answer on time once every LLM thread is stuck
+    client = OllamaClient(silent_url, timeout=3)
+    agent = OllamaAgent(url=silent_url, client=client, deadline=0.2, max_workers=2)
+    state = TronGame(width=8, height=8).get_state()
+    for _ in range(5):
+        start = time.time()
+        assert agent.get_action(state, 1) in state['p1_moves']
+        assert time.time() - start < 1.0
+    assert agent.path_counts['fallback'] == 5
+    assert agent.path_counts['first_move'] == 0
+    agent.close()
+    client.close()
+
+
+def test_fallback_agent_never_runs_twice_at_once(silent_url):
+    client = OllamaClient(silent_url, timeout=3)
+    slow = SlowAgent(delay=2.0)
+    agent = OllamaAgent(url=silent_url, client=client, deadline=0.2, fallback=slow)
+    state = TronGame(width=8, height=8).get_state()
+    for _ in range(4):
+        assert agent.get_action(state, 1) in state['p1_moves']
+    # The first search misses the deadline; the moves made while it still runs
+    # are answered greedily instead of starting more searches on the same agent
+    assert slow.most_running == 1
+    assert agent.path_counts['first_move'] == 1
+    assert agent.path_counts['fallback'] == 3
+    agent.close()
+    client.close()
+
+
+def test_agent_answers_from_llm_then_cache(stub, tmp_path):
+    server, url = stub
+    cache = ResponseCache(path=str(tmp_path / 'answers.json'))
+    agent = OllamaAgent(url=url, cache=cache, deadline=5.0)
+    state = TronGame(width=8, height=8).get_state()
+    move = agent.get_action(state, 1)
+    assert move in state['p1_moves']
+    assert agent.get_action(state, 1) == move
+    assert agent.path_counts['llm'] == 1
+    assert agent.path_counts['cache'] == 1
+    agent.close()
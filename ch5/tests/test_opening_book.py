@@ -0,0 +1,48 @@
+# test_opening_book.py - Building and probing an opening book
+import numpy as np
+import pytest
+from tron_base import TronGame
+from greedy import GreedyAgent
+from minimax import MinimaxAgent
+from opening_book import OpeningBook, build_book
+
+
+@pytest.fixture(scope='module')
+def book_file(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('book') / 'book_6x6.npy')
+    return build_book(6, 6, turns=1, depth=2, path=path, agent=MinimaxAgent(depth=2))
+
+
+def test_book_covers_its_turns(book_file):
+    book = OpeningBook(book_file)
+    assert book.max_occupied == 4  # Two heads after one turn
+    game = TronGame(6, 6)
+    state = game.reset()
+    for turn in range(2):
+        for player in (1, 2):
+            moves = state['p1_moves'] if player == 1 else state['p2_moves']
+            assert book.probe(state, player) in moves
+        state, reward, done = game.step(GreedyAgent().get_action(state, 1), GreedyAgent().get_action(state, 2))
+    assert book.hits == 4
+
+
+def test_probe_stops_past_the_book(book_file):
+    book = OpeningBook(book_file)
+    game = TronGame(6, 6)
+    state = game.reset()
+    for turn in range(2):
+        state, reward, done = game.step(state['p1_moves'][0], state['p2_moves'][0])
+    assert book.probe(state, 1) is None
+    assert book.symmetry is None  # Answered without canonicalizing
+    assert book.misses == 0
+
+
+def test_book_without_trailer(book_file, tmp_path):
+    """Books written before the trailer row still load and probe"""
+    old_path = str(tmp_path / 'old_book.npy')
+    np.save(old_path, np.load(book_file)[:-1])
+    book, old = OpeningBook(book_file), OpeningBook(old_path)
+    assert old.max_occupied is None
+    assert len(old.keys) == len(book.keys)
+    state = TronGame(6, 6).reset()
+    assert old.probe(state, 1) == book.probe(state, 1)
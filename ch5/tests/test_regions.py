@@ -0,0 +1,36 @@
+# test_regions.py - RegionTracker against flood fill
+import random
+import numpy as np
+from tron_base import flood_fill
+from regions import RegionTracker
+
+
+def test_region_sizes_match_flood_fill():
+    rng = random.Random(3)
+    board = np.zeros((7, 9), dtype=int)
+    board[3, :6] = 1
+    tracker = RegionTracker(board)
+    cells = [tuple(map(int, c)) for c in np.argwhere(board == 0)]
+    rng.shuffle(cells)
+    for cell in cells[:25]:
+        tracker.occupy(cell)
+        board[cell] = 2
+        for y, x in cells[25:30]:
+            assert tracker.region_size((y, x)) == flood_fill(board, (y, x), 0)
+
+
+def test_region_tracker_undo():
+    rng = random.Random(5)
+    board = np.zeros((7, 9), dtype=int)
+    board[:5, 4] = 1
+    tracker = RegionTracker(board)
+    labels, sizes = list(tracker.labels), dict(tracker.sizes)
+    cells = [tuple(map(int, c)) for c in np.argwhere(board == 0)]
+    rng.shuffle(cells)
+    for cell in cells[:25]:
+        tracker.occupy(cell)
+    for _ in range(25):
+        tracker.undo()
+    # Undo restores the labels and sizes exactly
+    assert tracker.labels == labels
+    assert tracker.sizes == sizes
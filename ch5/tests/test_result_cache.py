@@ -0,0 +1,83 @@
+# test_result_cache.py - Cached tournament games replay and resume exactly
+import functools
+import json
+from greedy import GreedyAgent
+from minimax import MinimaxAgent
+from chambers import ChamberEvaluator
+from htoh import run_round_robin_tournament
+from registry import AGENTS, agent_spec, make_agent
+from result_cache import ResultCache, agent_fingerprint, code_version, param_repr, spec_fingerprint
+
+NAMES = ['Minimax-5', 'Greedy', 'Random']
+
+
+def standings(results):
+    return {name: (s['wins'], s['losses'], s['draws']) for name, s in results.items()}
+
+
+def tournament(cache_path):
+    return standings(run_round_robin_tournament(games_per_matchup=2, board_size=8, max_moves=60,
+                                                cache_path=cache_path, agent_names=NAMES))
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / 'results.json')
+    cache = ResultCache(path)
+    key = cache.game_key('a', 'b', 8, 0, 1, 60)
+    assert cache.get(key) is None
+    cache.put(key, {'winner': 2, 'moves': 17, 'time': 0.5})
+    reloaded = ResultCache(path)
+    assert reloaded.get(key) == {'winner': 2, 'moves': 17, 'time': 0.5}
+    assert (reloaded.hits, cache.misses) == (1, 1)
+    # Player order and time control are part of the key
+    assert cache.game_key('b', 'a', 8, 0, 1, 60) != key
+    assert cache.game_key('a', 'b', 8, 0, 1, 60, (10, 0.1)) != key
+
+
+def test_replay_and_resume(tmp_path, capsys):
+    path = str(tmp_path / 'results.json')
+    played = tournament(None)
+    assert tournament(path) == played
+    assert tournament(path) == played
+    assert "6 games reused, 0 played" in capsys.readouterr().out
+
+    # An interrupted run: only some games made it to the file
+    with open(path) as f:
+        results = json.load(f)
+    kept = dict(list(results.items())[:2])
+    with open(path, 'w') as f:
+        json.dump(kept, f)
+    assert tournament(path) == played
+    assert "2 games reused, 4 played" in capsys.readouterr().out
+
+
+def test_code_version_follows_imports():
+    modules = [name for name, digest in code_version('advanced_heuristic')]
+    for name in ('advanced_heuristic', 'minimax', 'eval_cache', 'transposition', 'chambers', 'tron_base'):
+        assert name in modules
+
+
+def test_param_repr_has_no_addresses():
+    agent = GreedyAgent()
+    for value in (agent, agent.get_action, functools.partial(max, key=len), [agent], {'model': agent}):
+        assert ' at 0x' not in param_repr(value)
+        assert param_repr(value) == param_repr(value)
+    assert param_repr(GreedyAgent().get_action) == param_repr(agent.get_action)
+    assert agent_fingerprint(agent) == agent_fingerprint(GreedyAgent())
+
+
+def test_registry_fingerprints_match_specs():
+    """Every registered agent stores its parameters, so built and unbuilt fingerprints agree"""
+    for name in AGENTS:
+        # OllamaAgent keeps its live client in the client attribute; its games are not replayable anyway
+        if name != 'Ollama':
+            assert agent_fingerprint(make_agent(name)) == spec_fingerprint(*agent_spec(name))
+
+
+def test_object_params_fingerprint():
+    """Objects are fingerprinted by class and parameters, not by address"""
+    make = lambda: MinimaxAgent(depth=3, opponent_model=GreedyAgent(), evaluator=ChamberEvaluator())
+    kwargs = {'depth': 3, 'opponent_model': GreedyAgent(), 'evaluator': ChamberEvaluator()}
+    assert agent_fingerprint(make()) == agent_fingerprint(make())
+    assert agent_fingerprint(make()) == spec_fingerprint(MinimaxAgent, kwargs)
+    assert agent_fingerprint(make()) != agent_fingerprint(MinimaxAgent(depth=3))
@@ -0,0 +1,16 @@
+# test_selfplay.py - Shard records match the games they came from
+import os
+import numpy as np
+from selfplay import play_shard
+
+
+def test_heads_on_large_board(tmp_path):
+    """Head coordinates past 127 survive (an int8 column would wrap them negative)"""
+    size = 130
+    name, entry = play_shard(str(tmp_path), 0, ['Random', 'Random'], size, 5, 2, seed=0)
+    with np.load(os.path.join(tmp_path, name)) as shard:
+        boards, heads, sides = shard['board'], shard['heads'], shard['side']
+    assert entry['records'] == len(sides) > 0
+    assert heads.min() >= 0 and 128 <= heads.max() < size
+    for board, (p1, p2) in zip(boards, heads):
+        assert board[tuple(p1)] == 1 and board[tuple(p2)] == 2
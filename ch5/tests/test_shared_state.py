@@ -0,0 +1,59 @@
+# test_shared_state.py - Replies always answer the state they were computed for
+import multiprocessing
+import time
+import pytest
+from tron_base import TronGame
+from shared_state import SharedState, ProcessAgent
+
+
+class SlowAgent:
+    """First legal move; slow while player 1's head is still in column 1"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def get_action(self, state, player):
+        if state['p1_pos'][1] == 1:
+            time.sleep(self.delay)
+        return state['p1_moves'][0] if state['p1_moves'] else None
+
+
+def late_worker(channel, delay):
+    """Answers the first state late, with UP, and the next one at once, with DOWN"""
+    state, player, seq = channel.wait_state()
+    time.sleep(delay)
+    channel.reply('UP', seq)
+    state, player, seq = channel.wait_state()
+    channel.reply('DOWN', seq)
+
+
+def test_late_reply_is_not_taken_for_the_next_state():
+    state = TronGame(8, 8).reset()
+    channel = SharedState(8, 8)
+    process = multiprocessing.Process(target=late_worker, args=(channel, 0.3))
+    process.start()
+    try:
+        channel.publish(state, 1)
+        with pytest.raises(TimeoutError):
+            channel.wait_reply(timeout=0.05)
+        time.sleep(0.4)  # The late UP is now waiting
+        channel.publish(state, 1)
+        assert channel.wait_reply(timeout=5) == 'DOWN'
+    finally:
+        process.join(timeout=5)
+        channel.close()
+
+
+def test_process_agent_after_timeout():
+    game = TronGame(8, 8)
+    state = game.reset()
+    agent = ProcessAgent(('test_shared_state.SlowAgent', {'delay': 0.5}), timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            agent.get_action(state, 1)
+        state, reward, done = game.step('RIGHT', 'LEFT')
+        assert agent.get_action(state, 1) == state['p1_moves'][0]
+        state, reward, done = game.step('DOWN', 'UP')
+        assert agent.get_action(state, 1) == state['p1_moves'][0]
+    finally:
+        agent.close()
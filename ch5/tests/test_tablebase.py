@@ -0,0 +1,52 @@
+# test_tablebase.py - Table wins and draws hold against every reply
+import copy
+import random
+import pytest
+from tron_base import TronGame
+from tablebase import build_tablebase, EndgameTablebase, WIN, DRAW
+
+
+@pytest.fixture(scope='module')
+def tablebase(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('tb') / 'tablebase_4x4.npy')
+    build_tablebase(4, 4, 6, path=path)
+    return EndgameTablebase(path)
+
+
+def table_result_holds(game, player, table, result):
+    """Playing the table's moves, player reaches result (or better) whatever the opponent does"""
+    if game.game_over:
+        return game.winner == player if result == WIN else game.winner != 3 - player
+    state = game.get_state()
+    found = table.lookup(state, player)
+    mine = state['p1_moves'] if player == 1 else state['p2_moves']
+    move = found[2] if found else (mine[0] if mine else 'UP')
+    theirs = (state['p2_moves'] if player == 1 else state['p1_moves']) or ['UP']
+    for reply in theirs:
+        child = copy.deepcopy(game)
+        child.step(move, reply) if player == 1 else child.step(reply, move)
+        if not table_result_holds(child, player, table, result):
+            return False
+    return True
+
+
+def test_tablebase_results(tablebase):
+    rng = random.Random(0)
+    checked = 0
+    for _ in range(40):
+        game = TronGame(4, 4)
+        state = game.reset()
+        while not game.game_over:
+            for player in (1, 2):
+                found = tablebase.lookup(state, player)
+                if found is not None and found[0] in (WIN, DRAW):
+                    assert table_result_holds(copy.deepcopy(game), player, tablebase, found[0])
+                    checked += 1
+            state, reward, done = game.step(rng.choice(state['p1_moves'] or ['UP']),
+                                            rng.choice(state['p2_moves'] or ['UP']))
+    assert checked > 20
+
+
+def test_lookup_outside_the_table(tablebase):
+    assert tablebase.lookup(TronGame(4, 4).reset(), 1) is None  # 14 free cells > max_free
+    assert tablebase.lookup(TronGame(5, 5).reset(), 1) is None  # Other board size
@@ -0,0 +1,35 @@
+# test_transposition.py - Local and shared-memory transposition tables
+import multiprocessing
+import pytest
+from transposition import SharedTranspositionTable, TranspositionTable, EXACT, LOWER
+
+
+def store_in_child(table):
+    table.store(12345, 6, LOWER, -2.5, 'LEFT')
+
+
+@pytest.mark.parametrize('make', [lambda: TranspositionTable(1 << 10),
+                                  lambda: SharedTranspositionTable(1 << 10)])
+def test_transposition_table(make):
+    table = make()
+    try:
+        assert table.probe(99) is None
+        table.store(99, 5, EXACT, 3.0, 'UP')
+        assert table.probe(99) == (5, EXACT, 3.0, 'UP')
+        table.store(99, 2, LOWER, 1.0, 'DOWN')  # Shallower: the deeper entry stays
+        assert table.probe(99) == (5, EXACT, 3.0, 'UP')
+        assert table.probe(99 + (1 << 10)) is None  # Same slot, other key
+    finally:
+        if hasattr(table, 'close'):
+            table.close()
+
+
+def test_shared_table_across_processes():
+    table = SharedTranspositionTable(1 << 10)
+    try:
+        process = multiprocessing.Process(target=store_in_child, args=(table,))
+        process.start()
+        process.join(timeout=10)
+        assert table.probe(12345) == (6, LOWER, -2.5, 'LEFT')
+    finally:
+        table.close()
@@ -0,0 +1,110 @@
+# transposition.py - Transposition tables for the minimax agents' PVS search
+#
+# An entry stores the search depth, a bound flag, the score (from the point of
+# view of the side to move) and the best move. Both tables share probe/store,
+# so the search does not care whether the table is local or shared.
+import numpy as np
+from multiprocessing import shared_memory
+
+EXACT, LOWER, UPPER = 0, 1, 2
+MOVES = ['UP', 'DOWN', 'LEFT', 'RIGHT']
+MASK64 = (1 << 64) - 1
+
+
+def position_key(state, player):
+    """64-bit key of a search state (board hash, both heads, side to move)"""
+    # hash() of a tuple of ints is not randomized per process, so workers agree
+    return hash((state['hash'], state['p1_pos'], state['p2_pos'], player)) & MASK64
+
+
+class TranspositionTable:
+    """Dict-backed table for a single process"""
+
+    def __init__(self, max_entries=1 << 20):
+        self.max_entries = max_entries
+        self.entries = {}
+
+    def probe(self, key):
+        """Return (depth, flag, score, move) or None"""
+        return self.entries.get(key)
+
+    def store(self, key, depth, flag, score, move):
+        old = self.entries.get(key)
+        if old is not None and old[0] > depth:
+            return  # Keep the deeper result
+        if old is None and len(self.entries) >= self.max_entries:
+            self.entries.clear()  # Crude, but bounded and cheap
+        self.entries[key] = (depth, flag, score, move)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class SharedTranspositionTable:
+    """
+    Fixed-size table in multiprocessing.shared_memory, used without locks.
+    Each slot holds a packed data word and key ^ data; a slot torn by two
+    processes writing at once fails the XOR check and reads as a miss.
+    Pass it to worker processes as an argument: pickling only sends its name.
+    """
+
+    DTYPE = np.dtype([('check', '<u8'), ('data', '<u8')])
+
+    def __init__(self, num_entries=1 << 20, name=None):
+        self.num_entries = num_entries
+        nbytes = num_entries * self.DTYPE.itemsize
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            try:
+                # Python 3.13+: attaching must not register the block for cleanup
+                self.shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self.shm = shared_memory.SharedMemory(name=name)
+        self.slots = np.ndarray((num_entries,), dtype=self.DTYPE, buffer=self.shm.buf)
+        if self.owner:
+            self.slots[:] = 0
+
+    def __getstate__(self):
+        return {'name': self.shm.name, 'num_entries': self.num_entries}
+
+    def __setstate__(self, state):
+        self.__init__(state['num_entries'], name=state['name'])
+
+    @staticmethod
+    def pack(depth, flag, score, move):
+        score_bits = int(np.float32(score).view(np.uint32))
+        move_code = MOVES.index(move) if move in MOVES else 7
+        return score_bits | (min(depth, 255) << 32) | (flag << 40) | (move_code << 48)
+
+    def probe(self, key):
+        slot = self.slots[key % self.num_entries]
+        data = int(slot['data'])
+        if data == 0 or int(slot['check']) ^ data != key:
+            return None
+        score = float(np.uint32(data & 0xFFFFFFFF).view(np.float32))
+        depth = (data >> 32) & 0xFF
+        flag = (data >> 40) & 0xFF
+        move_code = (data >> 48) & 0xFF
+        return depth, flag, score, MOVES[move_code] if move_code < 4 else None
+
+    def store(self, key, depth, flag, score, move):
+        index = key % self.num_entries
+        data = self.pack(depth, flag, score, move)
+        old = self.slots[index]
+        old_data = int(old['data'])
+        if old_data and int(old['check']) ^ old_data == key and ((old_data >> 32) & 0xFF) > depth:
+            return  # Same position already searched deeper
+        self.slots[index]['data'] = data
+        self.slots[index]['check'] = key ^ data
+
+    def clear(self):
+        self.slots[:] = 0
+
+    def close(self):
+        """Detach; the creating process also frees the block"""
+        self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
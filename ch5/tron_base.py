@@ -3,8 +3,20 @@
 import numpy as np
 import random
 from copy import deepcopy
-import pygame
 import time
+from regions import RegionTracker
+from maps import GameMap, WALL
+
+# pygame is slow to import and prints a banner, so it is loaded by the first
+# visualized game; every other use of it is behind self.visualize
+pygame = None
+
+def load_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as module
+        pygame = module
+    return pygame
 
 def flood_fill(board, start_pos, player_id):
     """Count empty cells reachable from start position"""
@@ -33,16 +45,78 @@ def flood_fill(board, start_pos, player_id):
     
     return count
 
+def label_regions(board, player_id, starts=None):
+    """
+    Label connected regions of cells passable for player_id (empty or own trail,
+    the same cells flood_fill walks). Returns (labels, sizes): labels maps each
+    visited cell to a region id and sizes[region_id] is that region's cell count.
+    With starts, only the regions containing those cells are labeled; either
+    way each cell is visited once, however many starts share a region.
+    """
+    labels = {}
+    sizes = []
+    height, width = board.shape
+    
+    if starts is None:
+        starts = [(y, x) for y in range(height) for x in range(width)]
+    
+    for start in starts:
+        y, x = start
+        if start in labels or not (0 <= y < height and 0 <= x < width):
+            continue
+        if board[y, x] != 0 and board[y, x] != player_id:
+            continue
+        
+        region = len(sizes)
+        labels[start] = region
+        stack = [start]
+        count = 0
+        while stack:
+            y, x = stack.pop()
+            count += 1
+            for dy, dx in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+                ny, nx = y + dy, x + dx
+                if (ny, nx) in labels or not (0 <= ny < height and 0 <= nx < width):
+                    continue
+                if board[ny, nx] != 0 and board[ny, nx] != player_id:
+                    continue
+                labels[(ny, nx)] = region
+                stack.append((ny, nx))
+        sizes.append(count)
+    
+    return labels, sizes
+
+def valid_moves(board, pos):
+    """Moves from pos onto empty cells, in TronGame.get_valid_moves order (for states rebuilt from a board)"""
+    height, width = board.shape
+    directions = {'UP': (-1, 0), 'DOWN': (1, 0),
+                  'LEFT': (0, -1), 'RIGHT': (0, 1)}
+    return [action for action, (dy, dx) in directions.items()
+            if 0 <= pos[0] + dy < height and 0 <= pos[1] + dx < width
+            and board[pos[0] + dy, pos[1] + dx] == 0]
+
 class TronGame:
     """Tron Light Cycles game environment"""
     
-    def __init__(self, width=12, height=12, visualize=False, cell_size=40):
+    def __init__(self, width=12, height=12, visualize=False, cell_size=40, track_regions=False,
+                 game_map=None):
+        # With game_map (a GameMap or the path of a map file, see maps.py) the
+        # arena's size, walls and spawn points come from the map
+        if isinstance(game_map, str):
+            game_map = GameMap.load(game_map)
+        if game_map is not None:
+            width, height = game_map.width, game_map.height
+        self.game_map = game_map
         self.width = width
         self.height = height
         self.visualize = visualize
         self.cell_size = cell_size
+        # Keep a RegionTracker of the free space up to date as trails grow
+        self.track_regions = track_regions
+        self.regions = None
         
         if self.visualize:
+            load_pygame()
             pygame.init()
             self.screen = pygame.display.set_mode((width * cell_size, height * cell_size))
             pygame.display.set_caption("Tron AI Battle")
@@ -54,20 +128,28 @@ class TronGame:
             self.P1_COLOR = (0, 191, 255)  # Deep sky blue
             self.P2_COLOR = (255, 69, 0)   # Red-orange
             self.GRID_COLOR = (30, 30, 30)
+            self.WALL_COLOR = (90, 90, 90)
         
         self.reset()
     
     def reset(self):
         """Initialize new game"""
-        self.board = np.zeros((self.height, self.width), dtype=int)
-        # Place players in opposite corners
-        self.p1_pos = (1, 1)
-        self.p2_pos = (self.height - 2, self.width - 2)
-        self.board[self.p1_pos] = 1  # Player 1 trail
-        self.board[self.p2_pos] = 2  # Player 2 trail
+        if self.game_map is not None:
+            self.board = self.game_map.board()
+            self.p1_pos, self.p2_pos = self.game_map.spawns
+        else:
+            self.board = np.zeros((self.height, self.width), dtype=int)
+            # Place players in opposite corners
+            self.p1_pos = (1, 1)
+            self.p2_pos = (self.height - 2, self.width - 2)
+            self.board[self.p1_pos] = 1  # Player 1 trail
+            self.board[self.p2_pos] = 2  # Player 2 trail
         self.game_over = False
         self.winner = None
         
+        if self.track_regions:
+            self.regions = RegionTracker(self.board)
+        
         if self.visualize:
             self.draw()
         
@@ -96,6 +178,10 @@ class TronGame:
                     pygame.draw.rect(self.screen, color, 
                                    (x * self.cell_size + 2, y * self.cell_size + 2, 
                                     self.cell_size - 4, self.cell_size - 4))
+                elif self.board[y, x] == WALL:
+                    pygame.draw.rect(self.screen, self.WALL_COLOR,
+                                   (x * self.cell_size, y * self.cell_size,
+                                    self.cell_size, self.cell_size))
         
         # Draw player heads (larger circles)
         pygame.draw.circle(self.screen, self.WHITE, 
@@ -189,6 +275,10 @@ class TronGame:
         self.p2_pos = new_p2
         self.board[new_p1] = 1
         self.board[new_p2] = 2
+        if self.regions is not None:
+            self.regions.occupy(new_p1)
+            self.regions.occupy(new_p2)
+            self.regions.history.clear()  # Real moves are never undone
         
         if self.visualize:
             self.draw()